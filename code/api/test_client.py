@@ -4,16 +4,25 @@ Permet de tester :
 - /health
 - /predict
 - /predict_batch
+- /predict_url, /predict_urls (page démo servie par un http.server local)
 """
 
 import requests
 import json
+import threading
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 BASE_URL = "http://127.0.0.1:8000"
 HEALTH_URL = f"{BASE_URL}/health"
 PREDICT_URL = f"{BASE_URL}/predict"
 BATCH_URL = f"{BASE_URL}/predict_batch"
+URL_URL = f"{BASE_URL}/predict_url"
+URLS_URL = f"{BASE_URL}/predict_urls"
+
+DEMO_PAGE = Path(__file__).resolve().parents[2] / "demo_toxic_page.html"
 
 
 # ===============================
@@ -79,6 +88,61 @@ def test_batch(csv_path: str):
         print("Erreur batch:", e)
 
 
+# ===============================
+# Test 4 — Predict URL(s) on a local demo server
+# ===============================
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def demo_server():
+    """Serve the folder of demo_toxic_page.html on a free local port."""
+    handler = partial(_QuietHandler, directory=str(DEMO_PAGE.parent))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_predict_urls():
+    print("\n=== TEST /predict_url + /predict_urls ===")
+
+    with demo_server() as base:
+        page = f"{base}/{DEMO_PAGE.name}"
+        try:
+            r = requests.post(URL_URL, json={"url": page}, timeout=30)
+            print("Status /predict_url:", r.status_code)
+            if r.status_code == 200:
+                body = r.json()
+                print(json.dumps(body["aggregate"], indent=4))
+            else:
+                print("Erreur:", r.text)
+
+            # Same page several times + one missing page: fetched concurrently
+            urls = [page] * 3 + [f"{base}/missing.html"]
+            r = requests.post(URLS_URL, json={"urls": urls}, timeout=60)
+            print("Status /predict_urls:", r.status_code)
+            if r.status_code == 200:
+                body = r.json()
+                print(f"{body['n_ok']}/{body['n_urls']} pages analysées")
+                for p in body["pages"]:
+                    summary = p.get("error") or p["aggregate"]["toxicity_rate"]
+                    print(" -", p["url"], "→", summary)
+            else:
+                print("Erreur:", r.text)
+
+        except requests.exceptions.ConnectionError:
+            print(" API non accessible (uvicorn lancé ?)")
+        except Exception as e:
+            print("Erreur predict_url:", e)
+
+
 # ===============================
 # MAIN
 # ===============================
@@ -92,3 +156,6 @@ if __name__ == "__main__":
 
     #  Batch prediction (adapte le chemin si besoin)
     test_batch("data/sample/api_batch_demo.csv")
+
+    #  URL prediction (page démo locale)
+    test_predict_urls()
@@ -1,25 +1,80 @@
 from __future__ import annotations
 
-import re
+import json
+import os
+import string
 import unicodedata
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
 
-import joblib
+import numpy as np
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup, Comment
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 
+from .serving.batcher import MicroBatcher
+from .serving.cache import PredictionCache
+from .serving.extract import PageExtractor, available_parsers, selector_texts
+from .serving.fetch import FetchError, PageFetcher
+from .serving.jobs import JobManager
+from .serving.model import load_serving_model, model_version
+from .serving.pagecache import PageCache
+from .serving.pool import ScoringPool
+from .serving.snapshot import RunningAggregate, diff_texts
+from .serving.streaming import CSVTextStream, RecordTooLarge, UploadStreamingResponse, csv_lines
+from .serving.text import dedup_index, dedup_ratio
+
 # ---------- Config ----------
 LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
-MODEL_PATH = Path("models/best_multilabel_tfidf_logreg.joblib")
+MODEL_PATH = Path(os.getenv("TOXISCAN_MODEL_PATH", "models/best_multilabel_tfidf_logreg.joblib"))
 DEFAULT_THRESHOLD = 0.35
 MIN_TEXT_LEN = 20
 
+# Micro-batching of concurrent /predict calls
+BATCH_MAX_WAIT_MS = float(os.getenv("TOXISCAN_BATCH_MAX_WAIT_MS", "3"))
+BATCH_MAX_SIZE    = int(os.getenv("TOXISCAN_BATCH_MAX_SIZE", "64"))
+
+# Rows scored per batch by /predict_batch/stream
+STREAM_BATCH_SIZE = int(os.getenv("TOXISCAN_STREAM_BATCH_SIZE", "1024"))
+# Longest CSV record it buffers (an unterminated quote would swallow the upload)
+STREAM_MAX_RECORD_CHARS = int(float(os.getenv("TOXISCAN_STREAM_MAX_RECORD_KB", "128")) * 1024)
+
+# Multi-process scoring, opt-in (0 = score inline in the API process): on a
+# single CPU the pool only adds pickling / IPC overhead.
+SCORING_WORKERS = int(os.getenv("TOXISCAN_SCORING_WORKERS", "0"))
+POOL_MIN_BATCH  = int(os.getenv("TOXISCAN_POOL_MIN_BATCH", "2048"))
+
+# Prediction cache (normalized text + model version → probabilities)
+CACHE_MAX_ENTRIES = int(os.getenv("TOXISCAN_CACHE_MAX_ENTRIES", "200000"))
+CACHE_MAX_MB      = float(os.getenv("TOXISCAN_CACHE_MAX_MB", "64"))
+CACHE_TTL_S       = float(os.getenv("TOXISCAN_CACHE_TTL_S", "3600"))
+
+# Background CSV jobs (/jobs)
+JOBS_DIR        = Path(os.getenv("TOXISCAN_JOBS_DIR", "data/jobs"))
+JOBS_CHUNK_SIZE = int(os.getenv("TOXISCAN_JOBS_CHUNK_SIZE", "5000"))
+
+# Page fetching for /predict_url and /predict_urls (pooled async client)
+FETCH_CONNECT_TIMEOUT_S = float(os.getenv("TOXISCAN_FETCH_CONNECT_TIMEOUT_S", "5"))
+FETCH_READ_TIMEOUT_S    = float(os.getenv("TOXISCAN_FETCH_READ_TIMEOUT_S", "12"))
+FETCH_MAX_CONNECTIONS   = int(os.getenv("TOXISCAN_FETCH_MAX_CONNECTIONS", "100"))
+FETCH_PER_HOST          = int(os.getenv("TOXISCAN_FETCH_PER_HOST", "4"))
+FETCH_MAX_BYTES         = int(float(os.getenv("TOXISCAN_FETCH_MAX_MB", "10")) * 1024 * 1024)
+MAX_URLS                = int(os.getenv("TOXISCAN_MAX_URLS", "20"))
+
+# Analysed-page cache for /predict_url(s): conditional GETs + texts/scores per content hash
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("TOXISCAN_PAGE_CACHE_MAX_ENTRIES", "1000"))
+PAGE_CACHE_TTL_S       = float(os.getenv("TOXISCAN_PAGE_CACHE_TTL_S", "3600"))
+
+# HTML extraction backend: "html.parser" (stdlib, default) or "lxml" if installed
+HTML_PARSER = os.getenv("TOXISCAN_HTML_PARSER", "html.parser")
+
+# Serve the fused sparse×dense scorer instead of the sklearn Pipeline
+COMPILED_MODEL = os.getenv("TOXISCAN_COMPILED_MODEL", "1") != "0"
+
 app = FastAPI(
     title="ToxiScan API",
     version="2.1.0",
@@ -35,6 +90,17 @@ app.add_middleware(
 )
 
 model = None
+model_id: Optional[str] = None
+pool  = ScoringPool(SCORING_WORKERS, len(LABELS), POOL_MIN_BATCH)
+cache = PredictionCache(
+    CACHE_MAX_ENTRIES, int(CACHE_MAX_MB * 1024 * 1024), CACHE_TTL_S, len(LABELS)
+)
+jobs: Optional[JobManager] = None
+fetcher = PageFetcher(
+    FETCH_CONNECT_TIMEOUT_S, FETCH_READ_TIMEOUT_S, FETCH_MAX_CONNECTIONS, FETCH_PER_HOST,
+    FETCH_MAX_BYTES,
+)
+page_cache = PageCache(PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_TTL_S)
 
 
 # ═══════════════════════════════════════════════════════
@@ -54,21 +120,46 @@ class URLRequest(BaseModel):
     threshold: float = Field(default=DEFAULT_THRESHOLD, ge=0.0, le=1.0)
     max_texts: int = Field(default=50, ge=1, le=200)
 
+class URLsRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, max_length=MAX_URLS)
+    threshold: float = Field(default=DEFAULT_THRESHOLD, ge=0.0, le=1.0)
+    max_texts: int = Field(default=50, ge=1, le=200)
+
 
 # ═══════════════════════════════════════════════════════
 #  Text utilities
 # ═══════════════════════════════════════════════════════
 
+# Zero-width chars and nbsp → space (one C-level pass instead of a regex)
+_ZERO_WIDTH    = str.maketrans(dict.fromkeys("\u200b\u200c\u200d\ufeff\xa0", " "))
+_ASCII_LETTERS = string.ascii_letters.encode()
+
+
 def _clean(text: str) -> str:
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r"[\u200b\u200c\u200d\ufeff\xa0]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
+    # NFKC is the identity on pure ASCII, which has no zero-width/nbsp either
+    if not text.isascii():
+        text = unicodedata.normalize("NFKC", text).translate(_ZERO_WIDTH)
+    # str.split() uses the same Unicode whitespace set as re's \s
+    return " ".join(text.split())
+
+def _clean_many(texts: Iterable[str]) -> List[str]:
+    """Batched _clean for the CSV / scraping paths."""
+    normalize, zw = unicodedata.normalize, _ZERO_WIDTH
+    return [
+        " ".join((t if t.isascii() else normalize("NFKC", t).translate(zw)).split())
+        for t in texts
+    ]
+
+def _alpha_count(text: str) -> int:
+    if text.isascii():
+        raw = text.encode("ascii")
+        return len(raw) - len(raw.translate(None, _ASCII_LETTERS))
+    return sum(map(str.isalpha, text))
 
 def _valid(text: str) -> bool:
     if len(text) < MIN_TEXT_LEN:
         return False
-    alpha = sum(c.isalpha() for c in text) / max(len(text), 1)
+    alpha = _alpha_count(text) / max(len(text), 1)
     return alpha >= 0.25
 
 def _dedup(texts: List[str]) -> List[str]:
@@ -109,7 +200,10 @@ NOISE_TAGS = {"script", "style", "noscript", "head", "nav", "footer", "aside", "
 
 
 def _scrape(soup: BeautifulSoup) -> List[str]:
-    """Extract and clean text candidates from a BeautifulSoup tree."""
+    """
+    Extract and clean text candidates from a BeautifulSoup tree.
+    Reference implementation of _scrape_html (kept for the extraction benchmark).
+    """
     for tag in soup(NOISE_TAGS):
         tag.decompose()
     for node in soup.find_all(string=lambda s: isinstance(s, Comment)):
@@ -128,82 +222,182 @@ def _scrape(soup: BeautifulSoup) -> List[str]:
     return _dedup(texts)
 
 
+def _scrape_html(html: str) -> List[str]:
+    """
+    Same output as _scrape(BeautifulSoup(html, "html.parser")), from a single
+    parse with every selector evaluated in the same pass and no tree built.
+    """
+    for _, raw in selector_texts(html, SELECTORS, NOISE_TAGS, HTML_PARSER):
+        texts = [t for t in _clean_many(raw) if _valid(t)]
+        if texts:
+            return _dedup(texts)
+    return []
+
+
+def _accept(raw: str) -> Optional[str]:
+    t = _clean(raw)
+    return t if _valid(t) else None
+
+
+def _page_extractor(max_texts: int) -> PageExtractor:
+    """
+    Incremental _scrape_html for a page being downloaded: stops the download
+    once `max_texts` texts of the first selector are in (a lower-priority
+    selector never stops it: a higher one may still match further down).
+    """
+    return PageExtractor(SELECTORS, NOISE_TAGS, _accept, limit=max_texts, parser=HTML_PARSER)
+
+
 # ═══════════════════════════════════════════════════════
 #  Model prediction core
 # ═══════════════════════════════════════════════════════
 
-def _get_probas(texts: List[str]) -> List[List[float]]:
+def _batch_probas(texts: List[str]) -> Tuple[np.ndarray, float]:
     """
-    Extract per-label probabilities from model.predict_proba().
-    MultiOutputClassifier returns a list of N_labels arrays,
-    each of shape (n_samples, 2). Column 1 = P(positive).
+    (n_samples, n_labels) probability matrix from the loaded model, plus the
+    in-batch dedup ratio.
+    Identical texts are scored once and scattered back to their rows; texts
+    already in the prediction cache are not re-scored; the rest are scored
+    in one call (split across the worker processes when large).
     """
-    raw = model.predict_proba(texts)
-
-    # Case A: list of arrays — MultiOutputClassifier
-    if isinstance(raw, list) and len(raw) == len(LABELS):
-        return [
-            [float(raw[j][i, 1]) for j in range(len(LABELS))]
-            for i in range(len(texts))
-        ]
-
-    # Case B: single 2-D array (Pipeline variant)
-    import numpy as np
-    arr = np.array(raw)
-    if arr.ndim == 2 and arr.shape[1] == len(LABELS):
-        return [list(map(float, arr[i])) for i in range(len(texts))]
-
-    raise ValueError(
-        f"predict_proba output inattendu : type={type(raw)}, "
-        f"len={len(raw) if isinstance(raw, list) else 'n/a'}"
-    )
+    unique, inverse = dedup_index(texts)
+    probas, missing = cache.get_many(unique)
+    if missing:
+        todo = [unique[i] for i in missing]
+        fresh = pool.score(todo)
+        probas[missing] = fresh
+        cache.put_many(todo, fresh)
+    return probas[inverse], dedup_ratio(len(texts), len(unique))
 
 
-def _run(texts: List[str], threshold: float) -> List[Dict[str, Any]]:
-    """Run model on texts and return structured results."""
-    probs_matrix = _get_probas(texts)
-    results = []
-    for i, text in enumerate(texts):
-        probs = {LABELS[j]: round(probs_matrix[i][j], 4) for j in range(len(LABELS))}
-        preds = {lab: int(probs[lab] >= threshold) for lab in LABELS}
-        top_label = max(probs, key=probs.get)
-        results.append({
+def _get_probas(texts: List[str]) -> np.ndarray:
+    return _batch_probas(texts)[0]
+
+
+def _score(probas: np.ndarray, threshold: float) -> Dict[str, np.ndarray]:
+    """
+    Vectorized decision step on a (n_samples, n_labels) probability matrix.
+    Returns column arrays; nothing is converted to Python objects here.
+    """
+    probs = np.round(probas, 4)
+    preds = probs >= threshold
+    top   = probs.argmax(axis=1) if len(probs) else np.zeros(0, dtype=int)
+    return {
+        "probabilities": probs,
+        "predictions":   preds,
+        "is_toxic":      preds.any(axis=1),
+        "top_index":     top,
+        "top_prob":      probs[np.arange(len(probs)), top],
+    }
+
+
+def _records(texts: List[str], scores: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Serialization edge: one dict per text (row-oriented JSON)."""
+    probs    = scores["probabilities"].tolist()
+    preds    = scores["predictions"].astype(int).tolist()
+    is_toxic = scores["is_toxic"].tolist()
+    top_lab  = [LABELS[j] for j in scores["top_index"].tolist()]
+    top_prob = scores["top_prob"].tolist()
+    return [
+        {
             "text":          text,
-            "predictions":   preds,
-            "probabilities": probs,
-            "is_toxic":      any(v == 1 for v in preds.values()),
-            "top_label":     top_label,
-            "top_prob":      probs[top_label],
-        })
-    return results
-
-
-def _aggregate(results: List[Dict], threshold: float) -> Dict[str, Any]:
-    n = len(results)
-    n_toxic = sum(1 for r in results if r["is_toxic"])
-    counts  = {lab: sum(r["predictions"][lab] for r in results) for lab in LABELS}
-    means   = {
-        lab: round(sum(r["probabilities"][lab] for r in results) / n, 4)
-        for lab in LABELS
+            "predictions":   dict(zip(LABELS, preds[i])),
+            "probabilities": dict(zip(LABELS, probs[i])),
+            "is_toxic":      is_toxic[i],
+            "top_label":     top_lab[i],
+            "top_prob":      top_prob[i],
+        }
+        for i, text in enumerate(texts)
+    ]
+
+
+def _columns(texts: List[str], scores: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Serialization edge: columnar JSON (one list per field, no per-row dicts)."""
+    return {
+        "labels":        LABELS,
+        "text":          texts,
+        "probabilities": scores["probabilities"].tolist(),
+        "predictions":   scores["predictions"].astype(int).tolist(),
+        "is_toxic":      scores["is_toxic"].tolist(),
+        "top_label":     [LABELS[j] for j in scores["top_index"].tolist()],
+        "top_prob":      scores["top_prob"].tolist(),
     }
+
+
+def _run(texts: List[str], threshold: float) -> List[Dict[str, Any]]:
+    """Run model on texts and return structured results."""
+    return _records(texts, _score(_get_probas(texts), threshold))
+
+
+def _aggregate_dict(
+    n: int, n_toxic: int, counts: List[int], means: List[float], threshold: float
+) -> Dict[str, Any]:
     return {
         "total_texts":              n,
         "toxic_count":              n_toxic,
         "toxicity_rate":            round(n_toxic / n, 4) if n else 0,
         "threshold_used":           threshold,
-        "label_hit_counts":         counts,
-        "label_mean_probabilities": means,
+        "label_hit_counts":         dict(zip(LABELS, counts)),
+        "label_mean_probabilities": dict(zip(LABELS, means)),
     }
 
 
+def _aggregate(scores: Dict[str, np.ndarray], threshold: float) -> Dict[str, Any]:
+    n       = len(scores["is_toxic"])
+    n_toxic = int(scores["is_toxic"].sum())
+    counts  = scores["predictions"].sum(axis=0).tolist()
+    means   = (
+        np.round(scores["probabilities"].mean(axis=0), 4).tolist()
+        if n else [0.0] * len(LABELS)
+    )
+    return _aggregate_dict(n, n_toxic, counts, means, threshold)
+
+
+batcher = MicroBatcher(_get_probas, BATCH_MAX_WAIT_MS, BATCH_MAX_SIZE)
+
+
 # ═══════════════════════════════════════════════════════
 #  Startup
 # ═══════════════════════════════════════════════════════
 
 @app.on_event("startup")
 def load_model() -> None:
-    global model
-    model = joblib.load(MODEL_PATH) if MODEL_PATH.exists() else None
+    global model, model_id
+    model = load_serving_model(MODEL_PATH, COMPILED_MODEL) if MODEL_PATH.exists() else None
+    if model is not None:
+        model_id = model_version(MODEL_PATH)
+        cache.set_version(model_id)
+        page_cache.set_version(model_id)
+        pool.start(model, MODEL_PATH, COMPILED_MODEL)
+
+
+@app.on_event("startup")
+def start_jobs() -> None:
+    """Start the job dispatcher; unfinished jobs resume from their last chunk."""
+    global jobs
+    if model is None or jobs is not None:
+        return
+    jobs = JobManager(JOBS_DIR, LABELS, pool, _clean_many, chunk_size=JOBS_CHUNK_SIZE)
+    jobs.start()
+
+
+@app.on_event("shutdown")
+async def stop_batcher() -> None:
+    await batcher.stop()
+
+
+@app.on_event("shutdown")
+async def stop_fetcher() -> None:
+    await fetcher.aclose()
+
+
+@app.on_event("shutdown")
+def stop_jobs() -> None:
+    global jobs
+    if jobs is not None:
+        jobs.shutdown()
+        jobs = None
+    pool.shutdown()
 
 
 # ═══════════════════════════════════════════════════════
@@ -213,30 +407,49 @@ def load_model() -> None:
 @app.get("/health")
 def health() -> Dict[str, Any]:
     return {
-        "status":       "ok" if model is not None else "error",
-        "model_loaded": model is not None,
-        "model_path":   str(MODEL_PATH),
-        "labels":       LABELS,
+        "status":        "ok" if model is not None else "error",
+        "model_loaded":  model is not None,
+        "model_path":    str(MODEL_PATH),
+        "model_type":    type(model).__name__ if model is not None else None,
+        "model_version": model_id,
+        "labels":        LABELS,
+        "cache":         cache.stats(),
+        "html_parser":   HTML_PARSER if HTML_PARSER in available_parsers() else "html.parser",
+    }
+
+
+@app.get("/metrics")
+def metrics() -> Dict[str, Any]:
+    return {
+        "batcher":      batcher.stats(),
+        "scoring_pool": pool.stats(),
+        "cache":        cache.stats(),
+        "fetcher":      fetcher.stats(),
+        "page_cache":   page_cache.stats(),
     }
 
 
 # ── /predict ────────────────────────────────────────────
 @app.post("/predict", response_model=PredictResponse)
-def predict(payload: PredictRequest) -> PredictResponse:
+async def predict(payload: PredictRequest) -> PredictResponse:
     if model is None:
         raise HTTPException(500, "Model not loaded")
     text = _clean(payload.text)
     if not text:
         raise HTTPException(422, "Texte vide après nettoyage")
-    probs_matrix = _get_probas([text])
-    probs = {LABELS[j]: round(probs_matrix[0][j], 4) for j in range(len(LABELS))}
+    # Concurrent calls are scored together (see MicroBatcher)
+    row   = await batcher.submit(text)
+    probs = dict(zip(LABELS, np.round(row, 4).tolist()))
     preds = {lab: int(probs[lab] >= DEFAULT_THRESHOLD) for lab in LABELS}
     return PredictResponse(text=text, predictions=preds, probabilities=probs)
 
 
 # ── /predict_batch ───────────────────────────────────────
 @app.post("/predict_batch")
-async def predict_batch(file: UploadFile = File(...)) -> Dict[str, Any]:
+async def predict_batch(
+    file: UploadFile = File(...),
+    format: str = Query("records", pattern="^(records|columnar)$"),
+) -> Dict[str, Any]:
     if model is None:
         raise HTTPException(500, "Model not loaded")
     if not file.filename.lower().endswith(".csv"):
@@ -249,76 +462,307 @@ async def predict_batch(file: UploadFile = File(...)) -> Dict[str, Any]:
     text_col = next((c for c in ["comment_text", "text"] if c in df.columns), None)
     if text_col is None:
         raise HTTPException(400, "Le CSV doit contenir une colonne 'comment_text' ou 'text'")
-    texts = [_clean(t) for t in df[text_col].fillna("").astype(str)]
+    texts = _clean_many(df[text_col].fillna("").astype(str))
     texts = [t for t in texts if t]
-    results = _run(texts, DEFAULT_THRESHOLD)
-    return {"n_rows": len(results), "results": results}
+    probas, ratio = _batch_probas(texts)
+    scores = _score(probas, DEFAULT_THRESHOLD)
+    meta   = {"n_rows": len(texts), "dedup_ratio": ratio}
+    if format == "columnar":
+        return {**meta, "columns": _columns(texts, scores)}
+    return {**meta, "results": _records(texts, scores)}
+
+
+# ── /predict_batch/stream ────────────────────────────────
+def _stream_chunk(rows: List[int], raw: List[str], fmt: str) -> str:
+    """Clean, score and serialize one batch of CSV rows (NDJSON or CSV)."""
+    texts = _clean_many(raw)
+    keep  = [i for i, t in enumerate(texts) if t]
+    if not keep:
+        return ""
+    rows   = [rows[i] for i in keep]
+    texts  = [texts[i] for i in keep]
+    scores = _score(_get_probas(texts), DEFAULT_THRESHOLD)
+    if fmt == "csv":
+        cols = _columns(texts, scores)
+        return csv_lines(
+            [r, t, *p, int(tox), lab, prob]
+            for r, t, p, tox, lab, prob in zip(
+                rows, texts, cols["probabilities"], cols["is_toxic"],
+                cols["top_label"], cols["top_prob"],
+            )
+        )
+    return "".join(
+        json.dumps({"row": r, **rec}, ensure_ascii=False) + "\n"
+        for r, rec in zip(rows, _records(texts, scores))
+    )
 
 
-# ── /predict_url ─────────────────────────────────────────
-@app.post("/predict_url")
-def predict_url(payload: URLRequest) -> Dict[str, Any]:
+@app.post("/predict_batch/stream")
+async def predict_batch_stream(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
     """
-    Récupère une page web et analyse sa toxicité.
+    Variante streaming de /predict_batch pour les très gros CSV.
 
-    ✅ Test avec la page démo locale :
-       1. cd dossier/contenant/demo_toxic_page.html
-       2. python -m http.server 9000
-       3. url = "http://localhost:9000/demo_toxic_page.html"
+    Le corps de la requête est le CSV brut (pas de multipart) ; il est lu par
+    morceaux, scoré par lots de STREAM_BATCH_SIZE lignes et les résultats
+    sont renvoyés au fil de l'eau (NDJSON ou CSV). La mémoire reste bornée :
+    un enregistrement plus long que STREAM_MAX_RECORD_CHARS (guillemet non
+    fermé...) donne un 413 s'il survient avant la réponse, sinon une ligne
+    {"error": ..., "status": 413} en NDJSON (la réponse CSV est coupée).
+
+       curl -X POST --data-binary @export.csv -H "Content-Type: text/csv" \\
+            "http://localhost:8000/predict_batch/stream?format=ndjson"
     """
     if model is None:
         raise HTTPException(500, "Model not loaded")
 
-    url = payload.url.strip()
-
+    stream = CSVTextStream(request.stream(), STREAM_BATCH_SIZE, max_record_chars=STREAM_MAX_RECORD_CHARS)
     try:
-        r = requests.get(
-            url,
-            timeout=12,
-            headers={"User-Agent": "Mozilla/5.0 (ToxiScan/2.1)"},
-            allow_redirects=True,
-        )
-        r.raise_for_status()
-        if r.encoding and r.encoding.lower() not in ("utf-8", "utf8"):
-            r.encoding = r.apparent_encoding
-    except requests.exceptions.Timeout:
-        raise HTTPException(408, "Timeout : la page met trop de temps à répondre")
-    except requests.exceptions.HTTPError as e:
-        raise HTTPException(400, f"Erreur HTTP {e.response.status_code}")
-    except requests.exceptions.ConnectionError:
-        raise HTTPException(
-            400,
-            "Connexion refusée. Assurez-vous que 'python -m http.server 9000' est démarré."
-        )
-    except Exception as e:
-        raise HTTPException(400, f"Erreur de chargement : {e}")
+        await stream.read_header()
+    except RecordTooLarge as e:
+        raise HTTPException(413, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    async def body():
+        if format == "csv":
+            yield csv_lines([["row", "text", *LABELS, "is_toxic", "top_label", "top_prob"]])
+        try:
+            async for rows, raw in stream.batches():
+                chunk = await run_in_threadpool(_stream_chunk, rows, raw, format)
+                if chunk:
+                    yield chunk
+        except RecordTooLarge as e:
+            if format == "csv":
+                raise  # no room for an error row in the CSV: the connection is cut
+            yield json.dumps({"error": str(e), "status": 413}, ensure_ascii=False) + "\n"
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return UploadStreamingResponse(body(), media_type=media_type)
+
+
+# ── /jobs ────────────────────────────────────────────────
+@app.post("/jobs", status_code=202)
+async def create_job(file: UploadFile = File(...)) -> Dict[str, Any]:
+    """Soumet un CSV volumineux ; le scoring tourne en arrière-plan."""
+    if model is None or jobs is None:
+        raise HTTPException(500, "Model not loaded")
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(400, "Veuillez uploader un fichier .csv")
+    job_id = await run_in_threadpool(jobs.submit, file.file, file.filename)
+    return {"job_id": job_id, "status": "queued"}
+
+
+def _job_or_404(job_id: str) -> Dict[str, Any]:
+    job = jobs.status(job_id) if jobs is not None else None
+    if job is None:
+        raise HTTPException(404, f"Job inconnu : {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str) -> Dict[str, Any]:
+    return _job_or_404(job_id)
+
+
+@app.get("/jobs/{job_id}/results")
+def get_job_results(
+    job_id: str,
+    after: int = Query(-1, ge=-1, description="Dernier n° de ligne déjà reçu"),
+    limit: int = Query(1000, ge=1, le=10000),
+    format: str = Query("records", pattern="^(records|columnar)$"),
+) -> Dict[str, Any]:
+    job  = _job_or_404(job_id)
+    page = jobs.results(job_id, after, limit)
+    rows, texts = page["rows"], page["texts"]
+    scores = _score(page["probas"], DEFAULT_THRESHOLD)
+    if format == "columnar":
+        body: Dict[str, Any] = {"columns": {"row": rows, **_columns(texts, scores)}}
+    else:
+        body = {"results": [{"row": r, **rec} for r, rec in zip(rows, _records(texts, scores))]}
+    return {
+        "job_id":     job_id,
+        "status":     job["status"],
+        "n_rows":     len(rows),
+        "next_after": rows[-1] if len(rows) == limit else None,
+        **body,
+    }
 
-    soup  = BeautifulSoup(r.text, "html.parser")
-    texts = _scrape(soup)
 
-    if not texts:
-        raise HTTPException(
-            404,
-            "Aucun texte trouvé. Balises reconnues : "
-            "<div class='comment-body'>, <p>, <span class='commtext'>, ..."
-        )
+# ── /predict_url, /predict_urls ──────────────────────────
+NO_TEXT_DETAIL = (
+    "Aucun texte trouvé. Balises reconnues : "
+    "<div class='comment-body'>, <p>, <span class='commtext'>, ..."
+)
+
+Page = Dict[str, Any]
+
+
+async def _analyze_pages(urls: List[str], max_texts: int) -> List[Union[Page, FetchError]]:
+    """
+    Fetch, extract and score pages concurrently. Per URL, the FetchError or
+    a page dict: fetch `info`, `texts`, `probas` of texts[:max_texts], the
+    `running` aggregate, and the `delta` against the previous snapshot.
+
+    Pages already in the page cache are revalidated (conditional GET, then
+    body hash); unchanged ones reuse their cached texts and rows. Changed
+    ones are diffed against that snapshot: only new or edited texts are
+    scored (in one call for all pages) and the running aggregate is updated
+    with the added and removed rows.
+    """
+    previous   = [page_cache.get(url, max_texts) for url in urls]
+    extractors = [_page_extractor(max_texts) for _ in urls]
+    infos      = await fetcher.fetch_many(urls, extractors, previous)
+
+    # Rows reused from the previous snapshot; texts still to score
+    plans: Dict[int, Tuple[List[str], Dict[str, np.ndarray]]] = {}
+    batch: List[str] = []
+    for i, info in enumerate(infos):
+        if isinstance(info, FetchError) or info["status"] != "fetched":
+            continue
+        texts = extractors[i].texts()
+        prev  = previous[i]
+        known = dict(zip(prev["texts"], prev["probas"])) if prev else {}
+        plans[i] = (texts, known)
+        batch.extend(t for t in texts[:max_texts] if t not in known)
+    fresh = dict(zip(batch, await run_in_threadpool(_get_probas, batch))) if batch else {}
+
+    out: List[Union[Page, FetchError]] = []
+    for i, (url, info) in enumerate(zip(urls, infos)):
+        prev = previous[i]
+        if isinstance(info, FetchError):
+            out.append(info)
+            continue
+        if prev is not None:
+            page_cache.record(hit=i not in plans)
+        if i not in plans:
+            page = {"texts": prev["texts"], "probas": prev["probas"], "running": prev["running"]}
+            n_kept = len(prev["probas"])
+            page["delta"] = {"n_new": 0, "n_removed": 0, "n_unchanged": n_kept, "new_index": []}
+        else:
+            texts, known = plans[i]
+            analyzed = texts[:max_texts]
+            probas = np.array(
+                [known[t] if t in known else fresh[t] for t in analyzed], dtype=float
+            ).reshape(len(analyzed), len(LABELS))
+            if prev is None:
+                running, delta = RunningAggregate.from_rows(np.round(probas, 4)), None
+            else:
+                added, removed = diff_texts(prev["texts"][: len(prev["probas"])], analyzed)
+                running = prev["running"].copy()
+                running.update(np.round(probas[added], 4), np.round(prev["probas"][removed], 4))
+                delta = {
+                    "n_new":       len(added),
+                    "n_removed":   len(removed),
+                    "n_unchanged": len(analyzed) - len(added),
+                    "new_index":   added,
+                }
+            page = {"texts": texts, "probas": probas, "running": running, "delta": delta}
+        page["info"] = info
+        page["previous"] = prev
+        # Also refreshes validators and age after a successful revalidation
+        page_cache.put(url, max_texts, info, page["texts"], page["probas"], page["running"])
+        out.append(page)
+    return out
+
+
+def _page_delta(page: Page, scores: Dict[str, np.ndarray], results: List[Dict[str, Any]],
+                n_toxic: int, threshold: float) -> Optional[Dict[str, Any]]:
+    """Changes since the previous snapshot of this page (None on a first visit)."""
+    delta, prev = page["delta"], page["previous"]
+    if delta is None:
+        return None
+    prev_toxic, _ = prev["running"].counts(threshold, np.round(prev["probas"], 4))
+    new_index = delta["new_index"]
+    return {
+        "n_new":              delta["n_new"],
+        "n_removed":          delta["n_removed"],
+        "n_unchanged":        delta["n_unchanged"],
+        "toxic_count_change": n_toxic - prev_toxic,
+        "new_toxic_texts":    [results[i] for i in new_index if scores["is_toxic"][i]],
+    }
 
-    n_scraped        = len(texts)
-    texts_to_analyze = texts[: payload.max_texts]
-    results          = _run(texts_to_analyze, payload.threshold)
-    agg              = _aggregate(results, payload.threshold)
-    toxic_only       = sorted(
-        [r for r in results if r["is_toxic"]],
-        key=lambda r: r["top_prob"],
-        reverse=True,
+
+def _page_result(url: str, page: Page, threshold: float, max_texts: int) -> Dict[str, Any]:
+    """Response body for one scraped page; the aggregate comes from the running totals."""
+    texts, probas, running = page["texts"], page["probas"], page["running"]
+    texts_to_analyze = texts[:max_texts]
+    scores           = _score(probas, threshold)
+    results          = _records(texts_to_analyze, scores)
+    n_toxic, counts  = running.counts(threshold, scores["probabilities"])
+    agg              = _aggregate_dict(
+        running.n, n_toxic, counts.tolist(), np.round(running.means(), 4).tolist(), threshold
     )
+    toxic_idx        = np.flatnonzero(scores["is_toxic"])
+    toxic_idx        = toxic_idx[np.argsort(-scores["top_prob"][toxic_idx], kind="stable")]
+    toxic_only       = [results[i] for i in toxic_idx]
+    fetch_info       = {
+        k: v for k, v in page["info"].items() if k not in ("texts", "probas", "running")
+    }
 
     return {
         "url":              url,
-        "n_texts_scraped":  n_scraped,
+        "n_texts_scraped":  len(texts),
         "n_texts_analyzed": len(results),
-        "threshold_used":   payload.threshold,
+        "threshold_used":   threshold,
         "aggregate":        agg,
+        "delta":            _page_delta(page, scores, results, n_toxic, threshold),
         "toxic_texts":      toxic_only,
         "results":          results,
-    }
\ No newline at end of file
+        "fetch":            fetch_info,
+    }
+
+
+@app.post("/predict_url")
+async def predict_url(payload: URLRequest) -> Dict[str, Any]:
+    """
+    Récupère une page web et analyse sa toxicité.
+
+    ✅ Test avec la page démo locale :
+       1. cd dossier/contenant/demo_toxic_page.html
+       2. python -m http.server 9000
+       3. url = "http://localhost:9000/demo_toxic_page.html"
+    """
+    if model is None:
+        raise HTTPException(500, "Model not loaded")
+
+    url     = payload.url.strip()
+    [page]  = await _analyze_pages([url], payload.max_texts)
+    if isinstance(page, FetchError):
+        raise HTTPException(page.status_code, page.detail)
+    if not page["texts"]:
+        raise HTTPException(404, NO_TEXT_DETAIL)
+
+    return _page_result(url, page, payload.threshold, payload.max_texts)
+
+
+@app.post("/predict_urls")
+async def predict_urls(payload: URLsRequest) -> Dict[str, Any]:
+    """
+    Récupère plusieurs pages en parallèle et les analyse en un seul batch.
+    Une page en échec n'interrompt pas les autres : elle est renvoyée avec
+    son `error` (status_code + detail).
+    """
+    if model is None:
+        raise HTTPException(500, "Model not loaded")
+
+    urls  = [u.strip() for u in payload.urls]
+    pages = await _analyze_pages(urls, payload.max_texts)
+
+    out = []
+    for url, page in zip(urls, pages):
+        if isinstance(page, FetchError):
+            out.append({"url": url, "error": {"status_code": page.status_code, "detail": page.detail}})
+        elif not page["texts"]:
+            out.append({"url": url, "error": {"status_code": 404, "detail": NO_TEXT_DETAIL}})
+        else:
+            out.append(_page_result(url, page, payload.threshold, payload.max_texts))
+
+    return {
+        "n_urls":         len(urls),
+        "n_ok":           sum("error" not in p for p in out),
+        "threshold_used": payload.threshold,
+        "pages":          out,
+    }
@@ -0,0 +1,2 @@
+# code/bench/
+# Benchmarks de performance (à lancer depuis la racine : python -m code.bench.<script>).
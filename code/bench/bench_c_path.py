@@ -0,0 +1,99 @@
+"""
+Benchmark — per-label regularization path vs independent fits.
+
+On the TF-IDF features of the training split (BEST_PARAMS vectorizer), each
+label's LogisticRegression is fitted for every C of PATH_CS:
+- independently (cold start, what a grid over C does),
+- along the warm-started path (code/ml/tuning.py),
+and compared to a single cold fit at the global C. Test F1 per label of the
+global-C model and of the per-label-C model (C from the 3-fold CV path, with
+the global C on the path and kept where nothing beats it on the folds) is
+reported as well, with the path's own best C.
+
+Usage (from the repository root):
+    python -m code.bench.bench_c_path
+"""
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+
+from code.ml.dataset import LABELS, train_test
+from code.ml.tuning import PATH_CS, per_label_ovr, regularization_path
+
+GLOBAL_C = 2.0
+
+
+def estimator(C=1.0):
+    return LogisticRegression(max_iter=2000, class_weight="balanced", C=C)
+
+
+def vectorizer():
+    return TfidfVectorizer(max_features=30000, min_df=2, ngram_range=(1, 2), max_df=0.9)
+
+
+def fit_time(est, X, y):
+    t0 = time.perf_counter()
+    est.fit(X, y)
+    return time.perf_counter() - t0, int(np.max(est.n_iter_))
+
+
+def main():
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+    vec = vectorizer()
+    X_tr = vec.fit_transform(X_train)
+    X_te = vec.transform(X_test)
+    Y_tr, Y_te = np.asarray(Y_train), np.asarray(Y_test)
+    print(f"=== Benchmark: regularization path ({X_tr.shape[0]} rows, {X_tr.shape[1]} features, "
+          f"{len(PATH_CS)} C values) ===")
+
+    rows = []
+    for j, lab in enumerate(LABELS):
+        single_s, single_it = fit_time(estimator(GLOBAL_C), X_tr, Y_tr[:, j])
+        cold = [fit_time(estimator(C), X_tr, Y_tr[:, j]) for C in PATH_CS]
+        warm_est = estimator().set_params(warm_start=True)
+        warm = [fit_time(warm_est.set_params(C=C), X_tr, Y_tr[:, j]) for C in PATH_CS]
+        rows.append({
+            "label":       lab,
+            "one_fit_s":   single_s,
+            "grid_cold_s": sum(t for t, _ in cold),
+            "path_warm_s": sum(t for t, _ in warm),
+            "cold_iter":   sum(i for _, i in cold),
+            "warm_iter":   sum(i for _, i in warm),
+        })
+    df = pd.DataFrame(rows)
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"total: one fit {df.one_fit_s.sum():.2f}s, cold grid {df.grid_cold_s.sum():.2f}s, "
+          f"warm path {df.path_warm_s.sum():.2f}s")
+
+    path = regularization_path(vectorizer(), X_train, Y_train, PATH_CS, estimator(),
+                               labels=LABELS, default_C=GLOBAL_C)
+    Cs = [path["labels"][lab]["best_C"] for lab in LABELS]
+    per_label = per_label_ovr(estimator(), X_tr, Y_tr, Cs).predict(X_te)
+    global_pred = np.column_stack([
+        clone(estimator(GLOBAL_C)).fit(X_tr, Y_tr[:, j]).predict(X_te) for j in range(len(LABELS))
+    ])
+    f1 = pd.DataFrame({
+        "label":        LABELS,
+        "positives":    Y_te.sum(axis=0),
+        "path_C":       [path["labels"][lab]["path_C"] for lab in LABELS],
+        "cv_f1_path":   [path["labels"][lab]["path_f1"] for lab in LABELS],
+        "cv_f1_global": [path["labels"][lab]["default_f1"] for lab in LABELS],
+        "C":            Cs,
+        "f1_global_C":  f1_score(Y_te, global_pred, average=None, zero_division=0),
+        "f1_per_label": f1_score(Y_te, per_label, average=None, zero_division=0),
+    })
+    print(f"\nCV path (3 folds shared by all labels, {len(path['Cs'])} C values with C={GLOBAL_C}): "
+          f"features {path['features_s']:.2f}s, path {path['path_s']:.2f}s "
+          f"({path['path_s'] / df.one_fit_s.sum():.1f}x one fit)")
+    print(f1.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"F1 macro: global C={GLOBAL_C} {f1.f1_global_C.mean():.4f}, "
+          f"per-label C {f1.f1_per_label.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
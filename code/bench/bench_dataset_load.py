@@ -0,0 +1,115 @@
+"""
+Benchmark — dataset loading for the training scripts.
+
+Compares what every training script used to do (pd.read_csv of the whole
+Jigsaw CSV + dropna + train_test_split) with the columnar store from
+code/ml/dataset.py (memory-mapped int8 labels, text blob + offsets, cached
+split indices). The one-off CSV -> store conversion is timed separately.
+Splits must be identical.
+
+Without argument the local data/raw_hf/jigsaw_full.csv is used (or the
+5000-row sample). With n_rows, the source is tiled to n_rows in a temporary
+directory (160000 ~ size of the full dataset).
+
+Usage (from the repository root):
+    python -m code.bench.bench_dataset_load [n_rows]
+"""
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from code.ml.dataset import (
+    DATA_PATH, LABELS, build_store, load_labels, load_texts, split_indices, store_path, train_test,
+)
+
+SAMPLE_PATH = Path("data/sample/jigsaw_sample.csv")
+REPEAT = 3
+
+
+def timed(fn):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def csv_split(path, labels, stratify=None):
+    df = pd.read_csv(path).dropna(subset=["comment_text"])
+    X = df["comment_text"].astype(str)
+    Y = df[labels].astype(int)
+    return train_test_split(
+        X, Y, test_size=0.2, random_state=42, stratify=df[stratify] if stratify else None
+    )
+
+
+def dir_size_mb(path):
+    return sum(p.stat().st_size for p in Path(path).iterdir()) / 1e6
+
+
+def main():
+    src = DATA_PATH if DATA_PATH.exists() else SAMPLE_PATH
+    tmp = None
+    if len(sys.argv) > 1:
+        n_rows = int(sys.argv[1])
+        tmp = Path(tempfile.mkdtemp(prefix="toxiscan_dataset_"))
+        df = pd.read_csv(src)
+        df = pd.concat([df] * (n_rows // len(df) + 1), ignore_index=True).iloc[:n_rows]
+        src = tmp / "jigsaw_full.csv"
+        df.to_csv(src, index=False)
+
+    try:
+        print(f"=== Benchmark: dataset loading ({src}) ===")
+        t0 = time.perf_counter()
+        store = build_store(src, force=True)
+        t_build = time.perf_counter() - t0
+        print(f"conversion CSV -> store (one-off): {t_build:.2f} s  "
+              f"CSV {src.stat().st_size / 1e6:.1f} MB, store {dir_size_mb(store):.1f} MB")
+
+        # First split is computed then cached; timings below use the cache.
+        t0 = time.perf_counter()
+        split_indices(csv_path=src)
+        print(f"split indices (first call, then cached): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        cases = [
+            ("multi-label split", lambda: csv_split(src, LABELS),
+             lambda: train_test(LABELS, csv_path=src)),
+            ("toxic split (stratified)", lambda: csv_split(src, "toxic", "toxic"),
+             lambda: train_test("toxic", stratify="toxic", csv_path=src)),
+            ("texts only", lambda: pd.read_csv(src, usecols=["comment_text"])["comment_text"].dropna().tolist(),
+             lambda: load_texts(csv_path=src)),
+            ("labels only", lambda: pd.read_csv(src, usecols=LABELS).to_numpy(),
+             lambda: load_labels(LABELS, csv_path=src)),
+        ]
+        rows = []
+        for name, ref_fn, new_fn in cases:
+            ref, t_ref = timed(ref_fn)
+            out, t_new = timed(new_fn)
+            if isinstance(out, tuple):
+                for a, b in zip(ref, out):
+                    assert list(a.index) == list(b.index), f"{name}: split differs"
+                    assert (np.asarray(a) == np.asarray(b)).all(), f"{name}: values differ"
+            rows.append({
+                "load":     name,
+                "csv_ms":   t_ref * 1000,
+                "store_ms": t_new * 1000,
+                "speedup":  t_ref / t_new,
+            })
+        print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+        print("Splits identical to read_csv + train_test_split.")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+        elif src != DATA_PATH:
+            shutil.rmtree(store_path(src), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
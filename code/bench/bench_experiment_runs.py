@@ -0,0 +1,110 @@
+"""
+Benchmark — experiment runs with shared feature stages (train_mlflow_runs.py).
+
+Fits the candidate models of the MLflow comparison (TF-IDF + LogReg,
+TF-IDF -> SVD -> RandomForest; XGBoost is left out, lighter RF) without MLflow:
+- "per run": each run fits its own TF-IDF (and SVD), one run after the other
+  (what the script did before code/ml/features.py),
+- "shared, cold": TF-IDF / SVD fitted once into an empty cache, runs sequential,
+- "shared, warm": same stages loaded from the cache,
+- "shared, warm, pool": runs in a process pool, one worker per run.
+The F1 macro of each run must not depend on the mode.
+
+Usage (from the repository root):
+    python -m code.bench.bench_experiment_runs [rf_n_estimators]
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import multiprocessing as mp
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import TruncatedSVD
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.multiclass import OneVsRestClassifier
+
+from code.ml.dataset import LABELS, train_test
+from code.ml.features import FeatureStage, svd_features, tfidf_features
+
+TFIDF_PARAMS = {"max_features": 30000, "min_df": 2, "ngram_range": (1, 2), "max_df": 0.9}
+SVD_DIM = 200
+RF_N_ESTIMATORS = 30
+
+
+def classifier(run, rf_n_estimators):
+    if run == "logreg":
+        return OneVsRestClassifier(LogisticRegression(max_iter=2000, class_weight="balanced", C=2.0))
+    return OneVsRestClassifier(RandomForestClassifier(n_estimators=rf_n_estimators, random_state=42, n_jobs=1))
+
+
+def fit_on_stage(run, stage_path, Y_train, Y_test, rf_n_estimators):
+    stage = FeatureStage(Path(stage_path), cached=True)
+    Y_pred = classifier(run, rf_n_estimators).fit(stage.train, Y_train).predict(stage.test)
+    return f1_score(Y_test, Y_pred, average="macro")
+
+
+def per_run(X_train, X_test, Y_train, Y_test, rf_n_estimators):
+    scores = {}
+    for run in ("logreg", "rf"):
+        vec = TfidfVectorizer(**TFIDF_PARAMS)
+        X_tr, X_te = vec.fit_transform(X_train), vec.transform(X_test)
+        if run == "rf":
+            svd = TruncatedSVD(n_components=SVD_DIM, random_state=42)
+            X_tr, X_te = svd.fit_transform(X_tr), svd.transform(X_te)
+        Y_pred = classifier(run, rf_n_estimators).fit(X_tr, Y_train).predict(X_te)
+        scores[run] = f1_score(Y_test, Y_pred, average="macro")
+    return scores
+
+
+def shared(X_train, X_test, Y_train, Y_test, rf_n_estimators, cache_dir, workers):
+    tfidf = tfidf_features(X_train, X_test, TFIDF_PARAMS, cache_dir)
+    paths = {"logreg": str(tfidf.path), "rf": str(svd_features(tfidf, SVD_DIM, cache_dir=cache_dir).path)}
+    if workers == 0:
+        return {run: fit_on_stage(run, p, Y_train, Y_test, rf_n_estimators) for run, p in paths.items()}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork")) as pool:
+        futures = {run: pool.submit(fit_on_stage, run, p, Y_train, Y_test, rf_n_estimators)
+                   for run, p in paths.items()}
+        return {run: fut.result() for run, fut in futures.items()}
+
+
+def main():
+    rf_n_estimators = int(sys.argv[1]) if len(sys.argv) > 1 else RF_N_ESTIMATORS
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+    Y_train, Y_test = Y_train.to_numpy(), Y_test.to_numpy()
+    print(f"=== Benchmark: experiment runs ({len(X_train)} train rows, RF {rf_n_estimators} trees, "
+          f"{mp.cpu_count()} CPU) ===")
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="toxiscan_features_"))
+    modes = [
+        ("per run", lambda: per_run(X_train, X_test, Y_train, Y_test, rf_n_estimators)),
+        ("shared, cold", lambda: shared(X_train, X_test, Y_train, Y_test, rf_n_estimators, cache_dir, 0)),
+        ("shared, warm", lambda: shared(X_train, X_test, Y_train, Y_test, rf_n_estimators, cache_dir, 0)),
+        ("shared, warm, pool", lambda: shared(X_train, X_test, Y_train, Y_test, rf_n_estimators, cache_dir, 2)),
+    ]
+    rows = []
+    try:
+        for name, run in modes:
+            t0 = time.perf_counter()
+            scores = run()
+            rows.append({"mode": name, "seconds": time.perf_counter() - t0,
+                         **{f"f1_{k}": v for k, v in scores.items()}})
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    df = pd.DataFrame(rows)
+    df["speedup"] = df.seconds[0] / df.seconds
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    for col in ("f1_logreg", "f1_rf"):
+        np.testing.assert_allclose(df[col], df[col][0], rtol=0, atol=1e-9)
+    print("F1 identical across modes")
+
+
+if __name__ == "__main__":
+    main()
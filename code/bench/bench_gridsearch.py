@@ -0,0 +1,82 @@
+"""
+Benchmark — multi-label grid search (train_gridsearch_multilabel.py).
+
+Runs sklearn GridSearchCV on the TF-IDF + OneVsRest(LogReg) pipeline and
+FeatureGridSearch (code/ml/tuning.py) on the same training split and grid,
+first with an empty count cache, then with the cache filled by the first run.
+Best params must be the same and the CV scores equal (to float precision).
+
+Usage (from the repository root):
+    python -m code.bench.bench_gridsearch [n_train_rows] [n_jobs]
+"""
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import GridSearchCV
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import Pipeline
+
+from code.ml.dataset import LABELS, train_test
+from code.ml.tuning import FeatureGridSearch
+
+PARAM_GRID = {
+    "tfidf__max_features": [20000, 30000],
+    "tfidf__ngram_range": [(1, 1), (1, 2)],
+    "tfidf__min_df": [2, 3],
+    "clf__estimator__C": [0.5, 1.0, 2.0],
+}
+
+
+def estimator():
+    return LogisticRegression(max_iter=2000, class_weight="balanced")
+
+
+def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    n_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else -1
+    X, _, Y, _ = train_test(LABELS)
+    X, Y = X.iloc[:n_rows], Y.iloc[:n_rows]
+    print(f"=== Benchmark: grid search ({len(X)} rows, 24 candidates x 3 folds, n_jobs={n_jobs}) ===")
+
+    runs = []
+    t0 = time.perf_counter()
+    ref = GridSearchCV(
+        Pipeline([("tfidf", TfidfVectorizer()), ("clf", OneVsRestClassifier(estimator()))]),
+        param_grid=PARAM_GRID, cv=3, scoring="f1_macro", n_jobs=n_jobs,
+    ).fit(X, Y)
+    runs.append(("GridSearchCV", time.perf_counter() - t0, ref))
+
+    cache_dir = Path(tempfile.mkdtemp(prefix="toxiscan_tuning_"))
+    try:
+        for name in ("cached, cold", "cached, warm"):
+            t0 = time.perf_counter()
+            grid = FeatureGridSearch(PARAM_GRID, estimator(), cv=3, n_jobs=n_jobs,
+                                     cache_dir=cache_dir, verbose=0).fit(X, Y)
+            runs.append((name, time.perf_counter() - t0, grid))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    rows = []
+    for name, seconds, grid in runs:
+        assert grid.best_params_ == ref.best_params_, f"{name}: {grid.best_params_} != {ref.best_params_}"
+        np.testing.assert_allclose(
+            grid.cv_results_["mean_test_score"], ref.cv_results_["mean_test_score"], rtol=0, atol=1e-9)
+        rows.append({
+            "search":     name,
+            "seconds":    seconds,
+            "speedup":    runs[0][1] / seconds,
+            "best_score": grid.best_score_,
+        })
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print("Best params (identical):", ref.best_params_)
+
+
+if __name__ == "__main__":
+    main()
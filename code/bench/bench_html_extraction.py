@@ -0,0 +1,167 @@
+"""
+Benchmark — HTML text extraction for /predict_url.
+
+Compares the single-pass extractor (_scrape_html) with the reference
+BeautifulSoup implementation (_scrape) on the demo page, on Hacker News
+style thread pages built from the HN sample, and on pages without any
+comment markup (worst case for the reference: one find_all per selector).
+Outputs must be identical; a set of malformed snippets is checked as well.
+The incremental extractor (_page_extractor, fed in chunks with an early
+stop) must give the first max_texts texts of the reference, including on a
+page whose fallback <p> texts come before the comment nodes.
+
+Usage (from the repository root):
+    python -m code.bench.bench_html_extraction [n_comments]
+"""
+from html import escape
+from pathlib import Path
+import sys
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from code.app import _page_extractor, _scrape, _scrape_html
+
+DEMO_PAGE = Path("demo_toxic_page.html")
+HN_SAMPLE = Path("data/sample/hn_scraped_sample.csv")
+N_COMMENTS = 2_000
+REPEAT = 3
+MAX_TEXTS = 50
+CHUNK = 4096
+
+# Malformed / tricky markup: unclosed tags, stray end tags, entities,
+# comments and CDATA inside matches, nested matches, noise inside matches.
+EDGE_CASES = [
+    "<div class='comment-body'>Unclosed <b>bold text that goes on for a while<div class='comment-body'>nested comment body here</div>",
+    "<p>first paragraph long enough to count<p>second paragraph also long enough</p></span></p>",
+    "<span class='commtext c00'>AT&amp;T and &lt;tags&gt; &#x27;quoted&#39; &nbsp; &copy text here ok</span>",
+    "<div class='md'>before comment <!-- hidden --> after comment text here</div>",
+    "<div class='comment'>visible text in the comment <script>var x = 1;</script><style>.a{}</style> tail words</div>",
+    "<div class='comment'>text <nav>navigation links are noise</nav> more text in the comment here</div>",
+    "<article>Article with <br> line <br/> breaks and <img src=x> images inside it</article></br>",
+    "<div data-testid='comment'>data-testid comment with enough letters</div><div class='md extra'>md too</div>",
+    "<div class='comment-text'><template>template text</template>after the template text, long</div>",
+    "<p>CDATA <![CDATA[inside cdata text]]> and more text after it</p>",
+    "<head><p>paragraph inside head is removed with it</p></head><p>paragraph in body long enough</p>",
+    "<div class=' comment-body '>class with surrounding spaces and more words</div>",
+    "<footer><div class='comment-body'>comment in footer is noise</div></footer><p>just a paragraph of text here</p>",
+    "<p>dup text repeated for dedup check</p><p>dup text repeated for dedup check</p>",
+    "<div class='comment-content'>" + "x" * 30 + "</div><p>fallback paragraph with real words</p>",
+    "<p>zero​width\xa0and ｆｕｌｌｗｉｄｔｈ characters in paragraph</p>",
+    "<table><tr><td><span class='commtext'>inside a table cell comment text</td></tr></table>",
+    "<!DOCTYPE html><?xml-stylesheet href='a'?><p>references &#128;&#x80; &#0; &#x110000; &#150 &#x9d; &#65abc &#xZZ; &ampx; &notit; text</p>",
+    "<div class='x' class='comment-body'>duplicate class attribute, the last one wins</div>",
+    "<p>void end tags <br></br> and <hr/></hr> stray </img> inside a paragraph</p>",
+    "<div class=comment>unquoted attribute <![if !IE]> conditional declaration <![endif]> text</div>",
+    "",
+    "<p>",
+]
+
+
+def hn_page(texts):
+    rows = "".join(
+        f'<tr class="athing comtr" id="{i}"><td><table><tr><td class="ind"></td>'
+        f'<td class="default"><div class="comhead"><a class="hnuser">user{i}</a></div>'
+        f'<div class="comment"><span class="commtext c00">{t}</span></div>'
+        f'<div class="reply"><p><font size="1"><u><a href="reply?id={i}">reply</a></u></font></p></div>'
+        f'</td></tr></table></td></tr>'
+        for i, t in enumerate(texts)
+    )
+    return (
+        "<html><head><title>HN</title><script>var a=1;</script></head><body>"
+        '<table id="hnmain"><tr><td><table class="comment-tree">'
+        f"{rows}</table></td></tr></table><footer>footer</footer></body></html>"
+    )
+
+
+def plain_page(texts):
+    body = "".join(f"<section><h3>Item {i}</h3><p>{escape(t)}</p></section>" for i, t in enumerate(texts))
+    return f"<html><head><title>plain</title></head><body><nav>menu</nav>{body}</body></html>"
+
+
+def demo_page(n_copies):
+    html = DEMO_PAGE.read_text(encoding="utf-8")
+    start, end = html.index("<body"), html.rindex("</body>")
+    body = html[html.index(">", start) + 1:end]
+    return html[:end] + body * (n_copies - 1) + html[end:]
+
+
+def paragraphs_then_comments(n_paragraphs, n_comments):
+    """Many fallback <p> before the comment bodies: stopping on <p> would miss them."""
+    paras = "".join(f"<p>intro paragraph number {i} with enough words</p>" for i in range(n_paragraphs))
+    comments = "".join(f"<div class='comment-body'>comment body number {i} here</div>"
+                       for i in range(n_comments))
+    return f"<html><body>{paras}{comments}</body></html>"
+
+
+def streamed(html, max_texts=MAX_TEXTS):
+    extractor = _page_extractor(max_texts)
+    for i in range(0, len(html), CHUNK):
+        if extractor.feed(html[i:i + CHUNK]):
+            break
+    extractor.close()
+    return extractor.texts()[:max_texts], extractor.stopped_early
+
+
+def reference(html):
+    return _scrape(BeautifulSoup(html, "html.parser"))
+
+
+def timed(fn, html):
+    best = float("inf")
+    for _ in range(REPEAT):
+        t0 = time.perf_counter()
+        out = fn(html)
+        best = min(best, time.perf_counter() - t0)
+    return out, best
+
+
+def main():
+    n_comments = int(sys.argv[1]) if len(sys.argv) > 1 else N_COMMENTS
+    print(f"=== Benchmark: HTML extraction ({n_comments} comments per large page) ===")
+
+    for i, html in enumerate(EDGE_CASES):
+        assert _scrape_html(html) == reference(html), f"edge case {i} differs"
+    print(f"{len(EDGE_CASES)} edge cases: identical output")
+
+    hn_texts = pd.read_csv(HN_SAMPLE)["text"].dropna().astype(str).tolist()
+    hn_texts = (hn_texts * (n_comments // len(hn_texts) + 1))[:n_comments]
+    pages = {
+        "demo page":            DEMO_PAGE.read_text(encoding="utf-8"),
+        "HN fixture (sample)":  hn_page(hn_texts[:30]),
+        "demo page x100":       demo_page(100),
+        "HN thread (large)":    hn_page(hn_texts),
+        "plain <p> (large)":    plain_page(hn_texts),
+    }
+
+    pages["<p> before comments"] = paragraphs_then_comments(400, 5)
+    pages["comment bodies (large)"] = paragraphs_then_comments(20, n_comments)
+
+    stream_rows = []
+    for name, html in pages.items():
+        out, stopped = streamed(html)
+        assert out == reference(html)[:MAX_TEXTS], f"{name}: streamed output differs from _scrape"
+        stream_rows.append({"page": name, "texts": len(out), "stopped_early": stopped})
+    print(f"streamed extraction (max_texts={MAX_TEXTS}): identical to _scrape")
+    print(pd.DataFrame(stream_rows).to_string(index=False))
+
+    rows = []
+    for name, html in pages.items():
+        ref, t_ref = timed(reference, html)
+        out, t_new = timed(_scrape_html, html)
+        assert out == ref, f"{name}: output differs from _scrape"
+        rows.append({
+            "page":      name,
+            "size_kb":   len(html.encode()) / 1024,
+            "texts":     len(out),
+            "bs4_ms":    t_ref * 1000,
+            "single_ms": t_new * 1000,
+            "speedup":   t_ref / t_new,
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
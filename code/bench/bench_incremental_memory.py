@@ -0,0 +1,96 @@
+"""
+Benchmark — peak memory of out-of-core vs in-memory training.
+
+The Jigsaw CSV (or the local sample) is tiled to 1x and FACTOR x its size in
+a temporary directory; for each size, in a fresh process:
+- out-of-core: code/ml/train_incremental_multilabel.py (chunks from the
+  memory-mapped store, partial_fit, checkpoint per chunk),
+- in-memory: the same Hashing + IDF features built on the whole training
+  split at once, then OneVsRest(LogReg) as in train_best_multilabel.py
+  --variant hashing.
+Peak RSS (VmHWM) and wall time are reported; the columnar stores are
+built beforehand (one-off conversion, chunked as well).
+
+Usage (from the repository root):
+    python -m code.bench.bench_incremental_memory [base_rows] [factor] [chunk_size]
+
+The chunk size must stay below the 1x training split, otherwise the 1x run
+uses smaller chunks than the FACTOR x run.
+"""
+from pathlib import Path
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from code.ml.dataset import DATA_PATH, build_store
+
+SAMPLE_PATH = Path("data/sample/jigsaw_sample.csv")
+SCRIPT = Path("code/ml/train_incremental_multilabel.py").resolve()
+ML_DIR = SCRIPT.parent
+
+IN_MEMORY = """
+import sys
+sys.path.insert(0, {ml_dir!r})
+from dataset import LABELS, train_test
+from train_incremental_multilabel import peak_rss_mb
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.linear_model import LogisticRegression
+X_train, X_test, Y_train, Y_test = train_test(LABELS, csv_path={csv!r})
+Pipeline([
+    ("hash", HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False, norm=None)),
+    ("idf", TfidfTransformer()),
+    ("clf", OneVsRestClassifier(LogisticRegression(max_iter=2000, class_weight="balanced", C=2.0))),
+]).fit(X_train, Y_train)
+print(peak_rss_mb())
+"""
+
+
+def run(cmd, cwd):
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return out, time.perf_counter() - t0
+
+
+def main():
+    src = DATA_PATH if DATA_PATH.exists() else SAMPLE_PATH
+    base = pd.read_csv(src)
+    if len(sys.argv) > 1:
+        base = base.iloc[:int(sys.argv[1])]
+    factor = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    chunk_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    tmp = Path(tempfile.mkdtemp(prefix="toxiscan_ooc_"))
+    rows = []
+    try:
+        for mult in (1, factor):
+            csv = tmp / f"jigsaw_x{mult}.csv"
+            pd.concat([base] * mult, ignore_index=True).to_csv(csv, index=False)
+            build_store(csv)  # one-off conversion, timed by bench_dataset_load
+
+            _, t_ooc = run([sys.executable, str(SCRIPT), "--data", str(csv), "--epochs", "1",
+                              "--chunk-size", str(chunk_size)], tmp)
+            metrics = json.loads((tmp / "reports" / "incremental_model_metrics.json").read_text())
+            out, t_mem = run([sys.executable, "-c", IN_MEMORY.format(ml_dir=str(ML_DIR), csv=str(csv))], tmp)
+            rows.append({
+                "rows":             len(base) * mult,
+                "ooc_peak_mb":      metrics["peak_rss_mb"],
+                "ooc_s":            t_ooc,
+                "in_memory_peak_mb": float(out.strip().splitlines()[-1]),
+                "in_memory_s":      t_mem,
+            })
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"=== Benchmark: training peak memory ({src}, x1 vs x{factor}, chunks of {chunk_size}) ===")
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
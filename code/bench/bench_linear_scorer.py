@@ -0,0 +1,90 @@
+"""
+Benchmark — sklearn Pipeline vs CompiledLinearModel.
+
+Compares the current serving path (pipeline.predict_proba + per-label /
+per-sample Python loops) with the fused sparse×dense scorer, at several
+batch sizes, and checks that both outputs agree within 1e-6.
+
+Usage (from the repository root):
+    python -m code.bench.bench_linear_scorer
+"""
+from pathlib import Path
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from code.serving.linear import CompiledLinearModel
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+MODEL_PATH = Path("models/best_multilabel_tfidf_logreg.joblib")
+SAMPLE_PATH = Path("data/sample/jigsaw_sample.csv")
+BATCH_SIZES = [1, 32, 1_000, 100_000]
+TOLERANCE = 1e-6
+
+
+def legacy_probas(pipe, texts):
+    """Previous app.py path: predict_proba then Python loops."""
+    arr = np.array(pipe.predict_proba(texts))
+    return [list(map(float, arr[i])) for i in range(len(texts))]
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    print("=== Benchmark: sklearn Pipeline vs CompiledLinearModel ===")
+    if not MODEL_PATH.exists():
+        raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
+
+    pipe = joblib.load(MODEL_PATH)
+    compiled = CompiledLinearModel.from_pipeline(pipe)
+    print(f"Compiled: n_features={compiled.n_features}, n_labels={compiled.n_labels}")
+
+    pool = pd.read_csv(SAMPLE_PATH)["comment_text"].dropna().astype(str).tolist()
+
+    rows = []
+    for n in BATCH_SIZES:
+        texts = (pool * (n // len(pool) + 1))[:n]
+        repeat = 20 if n <= 32 else (5 if n <= 1_000 else 1)
+
+        ref = np.array(legacy_probas(pipe, texts))
+        new = compiled.predict_proba(texts)
+        max_diff = float(np.abs(ref - new).max())
+        assert max_diff <= TOLERANCE, f"batch={n}: max |diff| = {max_diff:.2e}"
+
+        # Feature extraction is shared; time it separately to isolate scoring.
+        X = compiled.transform(texts)
+        t_feat = timeit(lambda: compiled.transform(texts), repeat)
+        t_legacy = timeit(lambda: legacy_probas(pipe, texts), repeat)
+        t_compiled = timeit(lambda: compiled.predict_proba(texts), repeat)
+        t_clf_legacy = timeit(lambda: np.array(pipe[-1].predict_proba(X)), repeat)
+        t_clf_compiled = timeit(
+            lambda: 1.0 / (1.0 + np.exp(-(X @ compiled.coef + compiled.intercept))), repeat
+        )
+
+        rows.append({
+            "batch":            n,
+            "legacy_ms":        t_legacy * 1e3,
+            "compiled_ms":      t_compiled * 1e3,
+            "speedup":          t_legacy / t_compiled,
+            "tfidf_ms":         t_feat * 1e3,
+            "clf_legacy_ms":    t_clf_legacy * 1e3,
+            "clf_compiled_ms":  t_clf_compiled * 1e3,
+            "max_abs_diff":     max_diff,
+        })
+
+    df = pd.DataFrame(rows)
+    pd.set_option("display.width", 140)
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
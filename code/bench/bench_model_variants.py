@@ -0,0 +1,118 @@
+"""
+Benchmark — serving cost of the model variants.
+
+For each saved artifact: load time, resident memory after load and scoring
+throughput, each measured in a fresh Python process, plus the F1 scores
+reported by the training script. Flat artifacts are memory-mapped, so their
+pages show up as file-backed RSS (shared between processes) rather than
+anonymous memory; both are reported.
+
+Usage (from the repository root, after training both variants):
+    python code/ml/train_best_multilabel.py
+    python code/ml/train_best_multilabel.py --variant hashing
+    python -m code.ml.export_model_flat
+    python -m code.ml.export_model_flat models/best_multilabel_hashing_logreg.joblib
+    python -m code.bench.bench_model_variants
+"""
+from pathlib import Path
+import json
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+SAMPLE_PATH = Path("data/sample/jigsaw_sample.csv")
+
+VARIANTS = {
+    "tfidf": (
+        Path("models/best_multilabel_tfidf_logreg.joblib"),
+        Path("reports/best_model_metrics.json"),
+    ),
+    "hashing": (
+        Path("models/best_multilabel_hashing_logreg.joblib"),
+        Path("reports/best_model_hashing_metrics.json"),
+    ),
+    "tfidf_flat": (
+        Path("models/best_multilabel_tfidf_logreg.flat"),
+        Path("reports/best_model_metrics.json"),
+    ),
+    "hashing_flat": (
+        Path("models/best_multilabel_hashing_logreg.flat"),
+        Path("reports/best_model_hashing_metrics.json"),
+    ),
+}
+
+
+def rss_mb(field: str = "VmRSS") -> float:
+    """Current resident set size (Linux /proc), in MB. `RssAnon` = private memory only."""
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(model_path: str) -> None:
+    """Runs in a fresh interpreter: measure one artifact, print JSON."""
+    from code.serving.model import load_serving_model, probas_matrix
+
+    texts = pd.read_csv(SAMPLE_PATH)["comment_text"].dropna().astype(str).tolist()
+    rss_before, anon_before = rss_mb(), rss_mb("RssAnon")
+
+    t0 = time.perf_counter()
+    model = load_serving_model(Path(model_path))
+    load_s = time.perf_counter() - t0
+    rss_after, anon_after = rss_mb(), rss_mb("RssAnon")
+
+    probas_matrix(model, texts[:100], len(LABELS))  # warm-up
+    t0 = time.perf_counter()
+    probas_matrix(model, texts, len(LABELS))
+    score_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "model_type":   type(model).__name__,
+        "load_s":       load_s,
+        "rss_model_mb": rss_after - rss_before,
+        "anon_model_mb": anon_after - anon_before,
+        "rss_total_mb": rss_after,
+        "texts_per_s":  len(texts) / score_s,
+    }))
+
+
+def main():
+    print("=== Benchmark: model variants (load time / RSS / throughput / F1) ===")
+    rows = []
+    for name, (model_path, metrics_path) in VARIANTS.items():
+        if not model_path.exists():
+            print(f"skip {name}: {model_path} not found")
+            continue
+        out = subprocess.run(
+            [sys.executable, "-m", "code.bench.bench_model_variants", "--child", str(model_path)],
+            check=True, capture_output=True, text=True,
+        )
+        row = {"variant": name, "file_mb": model_path.stat().st_size / 2**20}
+        row.update(json.loads(out.stdout.strip().splitlines()[-1]))
+        if metrics_path.exists():
+            metrics = json.loads(metrics_path.read_text(encoding="utf-8"))
+            row["f1_macro"] = metrics.get("f1_macro")
+            row["f1_weighted"] = metrics.get("f1_weighted")
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    if "f1_macro" in df and "tfidf" in df["variant"].values:
+        ref = df.loc[df["variant"] == "tfidf", "f1_macro"].iloc[0]
+        df["f1_macro_delta"] = df["f1_macro"] - ref
+    pd.set_option("display.width", 160)
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+    else:
+        main()
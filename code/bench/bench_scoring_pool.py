@@ -0,0 +1,63 @@
+"""
+Benchmark — ScoringPool throughput from 1 to N worker processes.
+
+Scores the same large batch (Jigsaw sample texts, repeated) with an inline
+scorer and with pools of 1..N workers, and reports texts/second.
+
+Usage (from the repository root):
+    python -m code.bench.bench_scoring_pool [n_texts]
+"""
+from pathlib import Path
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from code.serving.model import load_serving_model
+from code.serving.pool import ScoringPool
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+MODEL_PATH = Path("models/best_multilabel_tfidf_logreg.joblib")
+SAMPLE_PATH = Path("data/sample/jigsaw_sample.csv")
+N_TEXTS = 50_000
+
+
+def main():
+    n_texts = int(sys.argv[1]) if len(sys.argv) > 1 else N_TEXTS
+    n_cpu = os.cpu_count() or 1
+    print(f"=== Benchmark: ScoringPool scaling ({n_texts} texts, {n_cpu} CPUs) ===")
+
+    model = load_serving_model(MODEL_PATH)
+    pool_texts = pd.read_csv(SAMPLE_PATH)["comment_text"].dropna().astype(str).tolist()
+    texts = (pool_texts * (n_texts // len(pool_texts) + 1))[:n_texts]
+
+    inline = ScoringPool(0, len(LABELS))
+    inline.start(model, MODEL_PATH)
+    t0 = time.perf_counter()
+    ref = inline.score(texts)
+    base = time.perf_counter() - t0
+
+    rows = [{"workers": 0, "seconds": base, "texts_per_s": n_texts / base, "speedup": 1.0}]
+    for n in range(1, n_cpu + 1):
+        pool = ScoringPool(n, len(LABELS), min_batch=1)
+        pool.start(model, MODEL_PATH)
+        t0 = time.perf_counter()
+        out = pool.score(texts)
+        elapsed = time.perf_counter() - t0
+        pool.shutdown()
+        assert np.allclose(out, ref), f"{n} workers: output differs from inline scoring"
+        rows.append({
+            "workers":     n,
+            "seconds":     elapsed,
+            "texts_per_s": n_texts / elapsed,
+            "speedup":     base / elapsed,
+        })
+
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print("(workers=0 → inline scoring in the calling process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark — SMOTE on sparse TF-IDF features.
+
+Same features and classifier as train_smote.py (TfidfVectorizer(max_features=
+20000), LogisticRegression(max_iter=1000)), trained per label with:
+- imblearn SMOTE on `toxic` (the current train_smote.py pipeline; skipped if
+  imbalanced-learn is not installed),
+- MultiLabelSMOTE (code/ml/rebalance.py) on the six labels, neighbours in the
+  full TF-IDF space (SMOTE's algorithm), after TruncatedSVD and after a sparse
+  random projection, at the default SMOTE ratio (1:1) and at 0.25,
+- no oversampling.
+Time and peak traced memory cover oversampling + training, `synthetic` is the
+number of synthetic rows (summed over labels); F1 is measured on the test
+split. `factor` tiles the training rows to look at scaling (time and
+memory only: duplicated rows skew the neighbours).
+
+Usage (from the repository root):
+    python -m code.bench.bench_smote [factor]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.multiclass import OneVsRestClassifier
+
+from code.ml.dataset import LABELS, train_test
+from code.ml.rebalance import MultiLabelSMOTE, resampled_ovr
+
+try:
+    from imblearn.over_sampling import SMOTE
+    HAS_IMBLEARN = True
+except ImportError:
+    HAS_IMBLEARN = False
+
+
+def estimator():
+    return LogisticRegression(max_iter=1000)
+
+
+def imblearn_toxic(X, Y):
+    j = LABELS.index("toxic")
+    X_res, y_res = SMOTE(random_state=42).fit_resample(X, Y[:, j])
+    clf = estimator().fit(X_res, y_res)
+    predict = lambda X_test: np.column_stack(
+        [clf.predict(X_test) if k == j else np.full(X_test.shape[0], -1) for k in range(len(LABELS))])
+    return predict, X_res.shape[0] - X.shape[0]
+
+
+def multilabel(reducer, ratio=1.0):
+    def fit(X, Y):
+        sampler = MultiLabelSMOTE(sampling_strategy=ratio, reducer=reducer)
+        clf = resampled_ovr(estimator(), X, Y, sampler)
+        return clf.predict, sum(r["added"] for r in sampler.report_.values())
+    return fit
+
+
+def no_resampling(X, Y):
+    return OneVsRestClassifier(estimator()).fit(X, Y).predict, 0
+
+
+def measure(fit, X, Y):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    predict, synthetic = fit(X, Y)
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return predict, synthetic, seconds, peak
+
+
+def main():
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+    vec = TfidfVectorizer(max_features=20000)
+    X_tr, X_te = vec.fit_transform(X_train), vec.transform(X_test)
+    Y_tr, Y_te = Y_train.to_numpy(), Y_test.to_numpy()
+    X_tr, Y_tr = sp.vstack([X_tr] * factor, format="csr"), np.vstack([Y_tr] * factor)
+    print(f"=== Benchmark: SMOTE ({X_tr.shape[0]} train rows, {X_tr.shape[1]} features, "
+          f"positives {dict(zip(LABELS, Y_tr.sum(axis=0).tolist()))}) ===")
+
+    modes = [("imblearn SMOTE (toxic)", imblearn_toxic)] if HAS_IMBLEARN else []
+    if not HAS_IMBLEARN:
+        print("imbalanced-learn not installed -> skip imblearn SMOTE (pip install imbalanced-learn)")
+    modes += [
+        ("full space", multilabel(None)),
+        ("svd 100", multilabel("svd")),
+        ("random projection 100", multilabel("random_projection")),
+        ("full space, 0.25", multilabel(None, 0.25)),
+        ("random projection 100, 0.25", multilabel("random_projection", 0.25)),
+        ("no oversampling", no_resampling),
+    ]
+
+    rows = []
+    for name, fit in modes:
+        predict, synthetic, seconds, peak = measure(fit, X_tr, Y_tr)
+        Y_pred = predict(X_te)
+        f1 = [f1_score(Y_te[:, j], Y_pred[:, j], zero_division=0) if Y_pred[0, j] >= 0 else np.nan
+              for j in range(len(LABELS))]
+        rows.append({"mode": name, "synthetic": synthetic, "seconds": seconds, "peak_mb": peak,
+                     **dict(zip(LABELS, f1)), "f1_macro": np.nanmean(f1)})
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+
+if __name__ == "__main__":
+    main()
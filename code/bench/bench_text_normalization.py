@@ -0,0 +1,89 @@
+"""
+Benchmark — text normalization (_clean / _clean_many / _valid).
+
+Compares the current implementation in code/app.py with the previous
+regex-based one on the Jigsaw and Hacker News samples, and checks that
+the outputs are identical.
+
+Usage (from the repository root):
+    python -m code.bench.bench_text_normalization
+"""
+from pathlib import Path
+import re
+import time
+import unicodedata
+
+import pandas as pd
+
+from code.app import MIN_TEXT_LEN, _clean, _clean_many, _valid
+
+SAMPLES = {
+    "jigsaw": (Path("data/sample/jigsaw_sample.csv"), "comment_text"),
+    "hn":     (Path("data/sample/hn_scraped_sample.csv"), "text"),
+}
+REPEAT = 5
+
+
+# Previous implementation (reference)
+def clean_regex(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    text = re.sub(r"[\u200b\u200c\u200d\ufeff\xa0]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
+
+
+def valid_generator(text: str) -> bool:
+    if len(text) < MIN_TEXT_LEN:
+        return False
+    alpha = sum(c.isalpha() for c in text) / max(len(text), 1)
+    return alpha >= 0.25
+
+
+def best_of(fn, repeat=REPEAT):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    print("=== Benchmark: text normalization ===")
+    rows = []
+    for name, (path, col) in SAMPLES.items():
+        texts = pd.read_csv(path)[col].fillna("").astype(str).tolist()
+        # Exercise the non-ASCII path too (nbsp / zero-width / fullwidth chars)
+        texts += [t.replace(" ", "\xa0", 3) + "\u200b\uff21" for t in texts[:500]]
+
+        ref_clean = [clean_regex(t) for t in texts]
+        assert [_clean(t) for t in texts] == ref_clean, f"{name}: _clean differs"
+        assert _clean_many(texts) == ref_clean, f"{name}: _clean_many differs"
+        assert [_valid(t) for t in ref_clean] == [valid_generator(t) for t in ref_clean], \
+            f"{name}: _valid differs"
+
+        t_old_clean = best_of(lambda: [clean_regex(t) for t in texts])
+        t_new_clean = best_of(lambda: _clean_many(texts))
+        t_old_valid = best_of(lambda: [valid_generator(t) for t in ref_clean])
+        t_new_valid = best_of(lambda: [_valid(t) for t in ref_clean])
+        n_ascii = sum(t.isascii() for t in texts)
+
+        rows.append({
+            "sample":        name,
+            "n_texts":       len(texts),
+            "ascii_share":   n_ascii / len(texts),
+            "clean_old_ms":  t_old_clean * 1e3,
+            "clean_new_ms":  t_new_clean * 1e3,
+            "clean_speedup": t_old_clean / t_new_clean,
+            "valid_old_ms":  t_old_valid * 1e3,
+            "valid_new_ms":  t_new_valid * 1e3,
+            "valid_speedup": t_old_valid / t_new_valid,
+        })
+
+    pd.set_option("display.width", 160)
+    print(pd.DataFrame(rows).to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+    print("Outputs identical to the regex implementation: OK")
+
+
+if __name__ == "__main__":
+    main()
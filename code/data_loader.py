@@ -2,6 +2,8 @@ from pathlib import Path
 import pandas as pd
 from datasets import load_dataset
 
+from ml.dataset import build_store
+
 RAW_DIR = Path("data/raw_hf")
 SAMPLE_DIR = Path("data/sample")
 RAW_DIR.mkdir(parents=True, exist_ok=True)
@@ -19,6 +21,10 @@ print("Columns:", list(df.columns))
 # Full (local only)
 df.to_csv(RAW_DIR / "jigsaw_full.csv", index=False)
 
+# Columnar store used by the training scripts (typed labels, cached splits)
+store = build_store(RAW_DIR / "jigsaw_full.csv")
+print("Store:", store)
+
 # Sample (GitHub)
 df.sample(n=5000, random_state=42).to_csv(SAMPLE_DIR / "jigsaw_sample.csv", index=False)
 
@@ -0,0 +1,242 @@
+# code/ml/dataset.py
+
+"""
+Jigsaw dataset store shared by the training scripts.
+
+The 160k-row CSV is parsed once and converted to a columnar store next to it
+(`jigsaw_full.columns/`): one `.npy` file per label (int8) and, for each text
+column, a UTF-8 blob plus an offsets array. Columns are memory-mapped and only
+the requested ones are read. Train/test split indices are computed once per
+(test_size, random_state, stratify) and cached in the store; they are the same
+indices `train_test_split(X, Y, ...)` picks on the full frame.
+
+The store is rebuilt automatically when the CSV changes (size / mtime).
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+TEXT_COLUMNS = ["id", "comment_text"]
+DATA_PATH = Path("data/raw_hf/jigsaw_full.csv")
+STORE_SUFFIX = ".columns"
+FORMAT_VERSION = 2
+CONVERT_CHUNK = 50_000
+
+
+def store_path(csv_path: Path = DATA_PATH) -> Path:
+    return Path(csv_path).with_suffix(STORE_SUFFIX)
+
+
+def _source_info(csv_path: Path) -> Dict[str, int]:
+    st = csv_path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_meta(store: Path) -> Optional[Dict]:
+    try:
+        return json.loads((store / "meta.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+# ═══════════════════════════════════════════════════════
+#  Build
+# ═══════════════════════════════════════════════════════
+
+def build_store(csv_path: Path = DATA_PATH, force: bool = False) -> Path:
+    """
+    Convert `csv_path` to its columnar store (no-op when it is up to date).
+    The CSV is read in chunks of CONVERT_CHUNK rows, so conversion memory does
+    not grow with the file (only the offsets and int8 labels are kept).
+    """
+    csv_path = Path(csv_path)
+    store = store_path(csv_path)
+    meta = _read_meta(store)
+    if (
+        not force and meta is not None
+        and meta.get("version") == FORMAT_VERSION
+        and meta.get("source") == _source_info(csv_path)
+    ):
+        return store
+
+    tmp = store.with_name(store.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    n_raw = 0
+    text_columns: List[str] = []
+    blobs: Dict[str, Any] = {}
+    lengths: Dict[str, List[np.ndarray]] = {}
+    labels: Dict[str, List[np.ndarray]] = {lab: [] for lab in LABELS}
+    reader = pd.read_csv(csv_path, dtype={c: str for c in TEXT_COLUMNS}, chunksize=CONVERT_CHUNK)
+    try:
+        for chunk in reader:
+            if not blobs:
+                text_columns = [c for c in TEXT_COLUMNS if c in chunk.columns]
+                blobs = {c: open(tmp / f"{c}.txt", "wb") for c in text_columns}
+                lengths = {c: [] for c in text_columns}
+            n_raw += len(chunk)
+            chunk = chunk.dropna(subset=["comment_text"])
+            for c in text_columns:
+                # UTF-8 blob + int64 byte offsets (row i = blob[off[i]:off[i+1]])
+                encoded = [v.encode("utf-8") for v in chunk[c].fillna("").astype(str)]
+                blobs[c].write(b"".join(encoded))
+                lengths[c].append(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+            for lab in LABELS:
+                labels[lab].append(chunk[lab].to_numpy(dtype=np.int8))
+    finally:
+        for f in blobs.values():
+            f.close()
+
+    n_rows = 0
+    for c in text_columns:
+        offsets = np.concatenate([[0], np.cumsum(np.concatenate(lengths[c]))]).astype(np.int64)
+        np.save(tmp / f"{c}.offsets.npy", offsets)
+        n_rows = len(offsets) - 1
+    for lab in LABELS:
+        np.save(tmp / f"{lab}.npy", np.concatenate(labels[lab]))
+    meta = {
+        "version":      FORMAT_VERSION,
+        "source":       _source_info(csv_path),
+        "source_path":  str(csv_path),
+        "n_rows":       n_rows,
+        "dropped_rows": n_raw - n_rows,
+        "text_columns": text_columns,
+        "labels":       LABELS,
+    }
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    shutil.rmtree(store, ignore_errors=True)
+    os.replace(tmp, store)
+    return store
+
+
+def open_store(csv_path: Path = DATA_PATH) -> Path:
+    """Store for `csv_path`, built or refreshed if needed (the CSV may be absent once converted)."""
+    csv_path = Path(csv_path)
+    if csv_path.exists():
+        return build_store(csv_path)
+    store = store_path(csv_path)
+    if _read_meta(store) is None:
+        raise FileNotFoundError(f"Dataset not found: {csv_path}")
+    return store
+
+
+# ═══════════════════════════════════════════════════════
+#  Load
+# ═══════════════════════════════════════════════════════
+
+def load_texts(
+    column: str = "comment_text", rows: Optional[np.ndarray] = None, csv_path: Path = DATA_PATH
+) -> List[str]:
+    """
+    Text column. All rows: the blob is memory-mapped and decoded row by row.
+    A subset of rows (e.g. a training chunk): only those byte ranges are read,
+    so memory does not depend on the size of the blob.
+    """
+    store = open_store(csv_path)
+    off = np.load(store / f"{column}.offsets.npy", mmap_mode="r")
+    with open(store / f"{column}.txt", "rb") as f:
+        if rows is not None:
+            rows = np.asarray(rows)
+            out = []
+            for a, b in zip(off[rows].tolist(), off[rows + 1].tolist()):
+                f.seek(a)
+                out.append(f.read(b - a).decode("utf-8"))
+            return out
+        if f.seek(0, os.SEEK_END) == 0:
+            return [""] * (len(off) - 1)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            blob = memoryview(mm)
+            try:
+                return [str(blob[a:b], "utf-8") for a, b in zip(off[:-1].tolist(), off[1:].tolist())]
+            finally:
+                blob.release()
+
+
+def load_labels(
+    labels: Union[str, Sequence[str]] = LABELS, rows: Optional[np.ndarray] = None,
+    csv_path: Path = DATA_PATH,
+) -> np.ndarray:
+    """int8 label matrix (n, k), or a memory-mapped vector for a single label name."""
+    store = open_store(csv_path)
+    if isinstance(labels, str):
+        col = np.load(store / f"{labels}.npy", mmap_mode="r")
+        return col if rows is None else col[rows]
+    cols = [np.load(store / f"{lab}.npy", mmap_mode="r") for lab in labels]
+    out = np.empty((len(cols[0]) if rows is None else len(rows), len(cols)), dtype=np.int8)
+    for j, col in enumerate(cols):
+        out[:, j] = col if rows is None else col[rows]
+    return out
+
+
+def load_frame(
+    columns: Optional[Sequence[str]] = None, rows: Optional[np.ndarray] = None,
+    csv_path: Path = DATA_PATH,
+) -> pd.DataFrame:
+    """DataFrame with only `columns` (default: comment_text + labels), labels as int8."""
+    columns = list(columns or ["comment_text", *LABELS])
+    data = {}
+    for c in columns:
+        if c in LABELS:
+            data[c] = load_labels(c, rows, csv_path)
+        else:
+            data[c] = load_texts(c, rows, csv_path)
+    return pd.DataFrame(data)
+
+
+# ═══════════════════════════════════════════════════════
+#  Split
+# ═══════════════════════════════════════════════════════
+
+def split_indices(
+    test_size: float = 0.2, random_state: int = 42, stratify: Optional[str] = None,
+    csv_path: Path = DATA_PATH,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (train_idx, test_idx) row positions, cached in the store. Same rows as
+    train_test_split(X, Y, test_size=..., random_state=..., stratify=Y[stratify]).
+    """
+    store = open_store(csv_path)
+    key = f"split_{test_size:g}_{random_state}" + (f"_{stratify}" if stratify else "")
+    path = store / f"{key}.npz"
+    if path.exists():
+        with np.load(path) as z:
+            return z["train"], z["test"]
+    n = _read_meta(store)["n_rows"]
+    y = load_labels(stratify, csv_path=csv_path) if stratify else None
+    train, test = train_test_split(
+        np.arange(n), test_size=test_size, random_state=random_state, stratify=y
+    )
+    np.savez(path, train=train, test=test)
+    return train, test
+
+
+def train_test(
+    labels: Union[str, Sequence[str]] = LABELS, test_size: float = 0.2, random_state: int = 42,
+    stratify: Optional[str] = None, csv_path: Path = DATA_PATH,
+) -> Tuple[pd.Series, pd.Series, Union[pd.Series, pd.DataFrame], Union[pd.Series, pd.DataFrame]]:
+    """
+    X_train, X_test, Y_train, Y_test as the training scripts used to get them
+    from read_csv + train_test_split (same rows, same order, same index).
+    `labels` is a label name (Series) or a list of labels (DataFrame, int8).
+    """
+    train, test = split_indices(test_size, random_state, stratify, csv_path)
+    texts = load_texts("comment_text", csv_path=csv_path)
+    X = pd.Series(texts, name="comment_text")
+    if isinstance(labels, str):
+        Y = pd.Series(load_labels(labels, csv_path=csv_path), name=labels)
+    else:
+        Y = pd.DataFrame(load_labels(labels, csv_path=csv_path), columns=list(labels))
+    return X.iloc[train], X.iloc[test], Y.iloc[train], Y.iloc[test]
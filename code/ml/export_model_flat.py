@@ -0,0 +1,23 @@
+"""
+Export a trained linear pipeline to the flat, memory-mapped artifact format
+(see code/serving/flat.py). The API loads `.flat` files without unpickling.
+
+Usage (from the repository root):
+    python -m code.ml.export_model_flat
+    python -m code.ml.export_model_flat models/best_multilabel_hashing_logreg.joblib
+"""
+from pathlib import Path
+import sys
+
+import joblib
+
+from code.serving.flat import write_flat_model
+
+LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+
+INP = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("models/best_multilabel_tfidf_logreg.joblib")
+OUT = INP.with_suffix(".flat")
+
+model = joblib.load(INP)
+header = write_flat_model(model, OUT, LABELS)
+print("Saved ->", OUT, f"({OUT.stat().st_size / 2**20:.1f} MB, featurizer={header['featurizer']['kind']})")
@@ -0,0 +1,147 @@
+# code/ml/features.py
+
+"""
+Shared feature stages for the experiment scripts.
+
+The MLflow runs all start from the same TF-IDF of the training split, and the
+tree models from the same TruncatedSVD of it. Each stage is fitted once per
+(training texts, parameters) and cached under data/cache/features/<key>/:
+the fitted transformer (joblib), the train/test matrices and the fit time of
+the stage. Matrices are plain .npy files opened memory-mapped, so worker
+processes reading the same stage share the pages: the dense SVD output as
+one array, the sparse TF-IDF as its CSR data / indices / indptr arrays (shape
+in meta.json). The stage lives on disk (workers open it by path), so there is
+always a cache directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Sequence
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+CACHE_DIR = Path("data/cache/features")
+CSR_ARRAYS = ("data", "indices", "indptr")
+CACHE_FORMAT = 2  # part of the key: stages written by an older layout are rebuilt
+
+
+def texts_digest(texts: Sequence[str]) -> str:
+    h = hashlib.sha1()
+    for t in texts:
+        h.update(str(t).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _key(*parts: Any) -> str:
+    raw = json.dumps([*parts, sklearn.__version__, CACHE_FORMAT], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+class FeatureStage:
+    """
+    A cached stage: `train` / `test` matrices, the fitted `transformer`,
+    `fit_s` (time of the original fit + transform) and `cached` (loaded from disk).
+    `path` identifies the stage for the stages built on top of it.
+    """
+
+    def __init__(self, path: Path, cached: bool) -> None:
+        self.path = path
+        self.cached = cached
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self.kind: str = meta["kind"]
+        self.params: Dict[str, Any] = meta["params"]
+        self.fit_s: float = meta["fit_s"]
+        self.shapes: Dict[str, Sequence[int]] = meta.get("shapes", {})
+
+    @property
+    def key(self) -> str:
+        return self.path.name
+
+    @property
+    def train(self):
+        return self._load("train")
+
+    @property
+    def test(self):
+        return self._load("test")
+
+    @property
+    def transformer(self):
+        return joblib.load(self.path / "transformer.joblib")
+
+    def _load(self, part: str):
+        if self.kind == "tfidf":
+            data, indices, indptr = (np.load(self.path / f"{part}.{name}.npy", mmap_mode="r")
+                                     for name in CSR_ARRAYS)
+            return sp.csr_matrix((data, indices, indptr), shape=tuple(self.shapes[part]), copy=False)
+        return np.load(self.path / f"{part}.npy", mmap_mode="r")
+
+
+def _save_csr(path: Path, part: str, X) -> None:
+    X = sp.csr_matrix(X)
+    X.sort_indices()
+    for name in CSR_ARRAYS:
+        np.save(path / f"{part}.{name}.npy", getattr(X, name))
+
+
+def _build(path: Path, kind: str, params: Dict[str, Any], fit_fn) -> FeatureStage:
+    if (path / "meta.json").exists():
+        return FeatureStage(path, cached=True)
+    tmp = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    t0 = time.perf_counter()
+    transformer, train, test = fit_fn()
+    fit_s = time.perf_counter() - t0
+    for part, X in (("train", train), ("test", test)):
+        if kind == "tfidf":
+            _save_csr(tmp, part, X)
+        else:
+            np.save(tmp / f"{part}.npy", X)
+    joblib.dump(transformer, tmp / "transformer.joblib")
+    meta = {"kind": kind, "params": params, "fit_s": fit_s,
+            "shapes": {"train": list(train.shape), "test": list(test.shape)}}
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2, default=str), encoding="utf-8")
+    shutil.rmtree(path, ignore_errors=True)
+    tmp.replace(path)
+    return FeatureStage(path, cached=False)
+
+
+def tfidf_features(
+    X_train, X_test, params: Dict[str, Any], cache_dir: Path = CACHE_DIR
+) -> FeatureStage:
+    """TfidfVectorizer(**params) fitted on X_train, cached by texts + params."""
+    X_train, X_test = [str(t) for t in X_train], [str(t) for t in X_test]
+    path = Path(cache_dir) / _key("tfidf", texts_digest(X_train), texts_digest(X_test), params)
+
+    def fit():
+        vec = TfidfVectorizer(**params)
+        return vec, vec.fit_transform(X_train).tocsr(), vec.transform(X_test).tocsr()
+
+    return _build(path, "tfidf", params, fit)
+
+
+def svd_features(
+    tfidf: FeatureStage, n_components: int, random_state: int = 42,
+    cache_dir: Path = CACHE_DIR,
+) -> FeatureStage:
+    """TruncatedSVD on top of a cached TF-IDF stage."""
+    params = {"n_components": n_components, "random_state": random_state}
+    path = Path(cache_dir) / _key("svd", tfidf.key, params)
+
+    def fit():
+        svd = TruncatedSVD(**params)
+        return svd, svd.fit_transform(tfidf.train), svd.transform(tfidf.test)
+
+    return _build(path, "svd", params, fit)
@@ -0,0 +1,168 @@
+# code/ml/rebalance.py
+
+"""
+Label-aware SMOTE for sparse multi-label TF-IDF features.
+
+imblearn's SMOTE searches neighbours in the full TF-IDF space (tens of
+thousands of sparse columns) and handles a single binary target. Here:
+
+- neighbours are searched in a reduced dense space (TruncatedSVD or a sparse
+  random projection, fitted once on the whole matrix), only among the
+  positives of each label;
+- synthetic rows are interpolated in the original sparse space
+  (x_a + gap * (x_b - x_a)), so they stay sparse and in the feature space the
+  classifier is trained on;
+- oversampling is done per label: the j-th binary classifier of a OneVsRest
+  model is trained on the original rows plus the synthetic positives of label
+  j only (resampled_ovr). Frequent labels are not pushed past their target by
+  the rows generated for the rare ones, and only one label's synthetic rows
+  are in memory at a time;
+- the default target is SMOTE's 1:1; a lower ratio (sampling_strategy=0.25,
+  or a dict for the rare labels only) adds fewer synthetic rows, at a cost in
+  F1 on the rare labels.
+
+reducer=None keeps the neighbour search in the full space (same algorithm as
+SMOTE, for comparison).
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional, Union
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
+from sklearn.decomposition import TruncatedSVD
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.neighbors import NearestNeighbors
+from sklearn.random_projection import SparseRandomProjection
+
+try:
+    from .tuning import assemble_ovr, fit_binary
+except ImportError:  # imported from a script in code/ml (sibling modules)
+    from tuning import assemble_ovr, fit_binary
+
+REDUCERS = ("svd", "random_projection")
+
+
+class MultiLabelSMOTE(BaseEstimator):
+    """
+    fit(X, Y) reduces X and finds the k nearest positives of every positive,
+    per label; resample_label(X, Y, j) then returns the rows for label j's
+    classifier (original rows first, synthetic positives after).
+    fit_resample(X, y) does both for a single binary target (drop-in for
+    imblearn's SMOTE). After fit, `report_` gives per label the positives,
+    negatives and synthetic rows to add, `timings_` the reduction / neighbour
+    search times.
+
+    sampling_strategy: target positives / negatives ratio, one float for every
+    label or a {label index: ratio} dict (labels absent from it are left as is);
+    labels already above the target get no synthetic rows.
+    """
+
+    def __init__(
+        self,
+        sampling_strategy: Union[float, Dict[int, float]] = 1.0,
+        k_neighbors: int = 5,
+        reducer: Optional[str] = "random_projection",
+        n_components: int = 100,
+        random_state: Optional[int] = 42,
+    ) -> None:
+        self.sampling_strategy = sampling_strategy
+        self.k_neighbors = k_neighbors
+        self.reducer = reducer
+        self.n_components = n_components
+        self.random_state = random_state
+
+    def _reduce(self, X):
+        if self.reducer is None:
+            return X
+        if self.reducer == "svd":
+            model = TruncatedSVD(n_components=self.n_components, random_state=self.random_state)
+        elif self.reducer == "random_projection":
+            model = SparseRandomProjection(
+                n_components=self.n_components, dense_output=True, random_state=self.random_state)
+        else:
+            raise ValueError(f"reducer must be one of {REDUCERS} or None, got {self.reducer!r}")
+        return model.fit_transform(X).astype(np.float32, copy=False)
+
+    def _n_new(self, j: int, positives: int, negatives: int) -> int:
+        if isinstance(self.sampling_strategy, dict):
+            ratio = self.sampling_strategy.get(j)
+            if ratio is None:
+                return 0
+        else:
+            ratio = self.sampling_strategy
+        return max(0, int(np.ceil(ratio * negatives)) - positives)
+
+    def fit(self, X, Y) -> "MultiLabelSMOTE":
+        Y = np.asarray(Y)
+        Y = Y.reshape(-1, 1) if Y.ndim == 1 else Y
+        self.timings_ = {"reduce_s": 0.0, "neighbors_s": 0.0}
+
+        t0 = time.perf_counter()
+        Z = self._reduce(sp.csr_matrix(X))
+        self.timings_["reduce_s"] = time.perf_counter() - t0
+
+        self.neighbors_, self.report_ = {}, {}
+        for j in range(Y.shape[1]):
+            pos = np.flatnonzero(Y[:, j])
+            n_new = self._n_new(j, len(pos), len(Y) - len(pos)) if len(pos) >= 2 else 0
+            self.report_[j] = {"positives": int(len(pos)), "negatives": int(len(Y) - len(pos)),
+                               "added": int(n_new), "neighbors_s": 0.0}
+            if n_new == 0:
+                continue
+            t0 = time.perf_counter()
+            k = min(self.k_neighbors, len(pos) - 1)
+            nn = NearestNeighbors(n_neighbors=k + 1).fit(Z[pos])
+            self.neighbors_[j] = (pos, nn.kneighbors(Z[pos], return_distance=False)[:, 1:])
+            self.report_[j]["neighbors_s"] = time.perf_counter() - t0
+            self.timings_["neighbors_s"] += self.report_[j]["neighbors_s"]
+        return self
+
+    def sample(self, X, j: int):
+        """Synthetic positives of label j (sparse, report_[j]["added"] rows)."""
+        X = sp.csr_matrix(X)
+        if j not in self.neighbors_:
+            return X[:0]
+        pos, neighbors = self.neighbors_[j]
+        n_new = self.report_[j]["added"]
+        rng = np.random.default_rng(None if self.random_state is None else [self.random_state, j])
+        anchor = rng.integers(len(pos), size=n_new)
+        a = pos[anchor]
+        b = pos[neighbors[anchor, rng.integers(neighbors.shape[1], size=n_new)]]
+        gap = rng.random(n_new)
+        # x_a + gap * (x_b - x_a), as row-scaled sparse sums
+        return (sp.diags(1.0 - gap) @ X[a] + sp.diags(gap) @ X[b]).astype(X.dtype, copy=False)
+
+    def resample_label(self, X, Y, j: int):
+        Y = np.asarray(Y)
+        y = Y[:, j] if Y.ndim == 2 else Y
+        X_new = self.sample(X, j)
+        X_res = sp.vstack([sp.csr_matrix(X), X_new], format="csr")
+        return X_res, np.concatenate([y, np.ones(X_new.shape[0], dtype=y.dtype)])
+
+    def fit_resample(self, X, y):
+        return self.fit(X, y).resample_label(X, y, 0)
+
+
+def _fit_label(estimator, sampler, X, Y, j):
+    X_j, y_j = sampler.resample_label(X, Y, j)
+    return fit_binary(estimator, X_j, y_j)
+
+
+def resampled_ovr(estimator, X, Y, sampler: MultiLabelSMOTE, n_jobs: Optional[int] = 1) -> OneVsRestClassifier:
+    """
+    OneVsRestClassifier whose j-th estimator is fitted on X plus the synthetic
+    positives of label j. Labels run in threads: X is shared and each thread
+    holds one label's synthetic rows.
+    """
+    X = sp.csr_matrix(X)
+    Y = np.asarray(Y)
+    sampler.fit(X, Y)
+    estimators = Parallel(n_jobs=n_jobs, prefer="threads")(
+        delayed(_fit_label)(clone(estimator), sampler, X, Y, j) for j in range(Y.shape[1])
+    )
+    return assemble_ovr(estimator, Y, estimators, n_jobs=n_jobs)
@@ -1,23 +1,18 @@
 # code/train_baseline.py
 
-import pandas as pd
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
-from preprocessing import build_text_pipeline, split_data
+from preprocessing import build_text_pipeline
+from dataset import train_test
 
 
 def main():
 
     print("=== Baseline Model ===")
 
-    df = pd.read_csv("data/raw_hf/jigsaw_full.csv")
-
-    X = df["comment_text"]
-    y = df["toxic"]
-
     pipeline = build_text_pipeline()
 
-    X_train, X_test, y_train, y_test = split_data(X, y)
+    X_train, X_test, y_train, y_test = train_test("toxic", stratify="toxic")
 
     X_train_vec = pipeline.fit_transform(X_train)
     X_test_vec = pipeline.transform(X_test)
@@ -1,28 +1,16 @@
-import pandas as pd
-
-from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, f1_score
 
-
-LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+from dataset import LABELS, train_test
 
 
 def main():
     print("=== Baseline MULTI-LABEL (TF-IDF + OneVsRest(LogReg)) ===")
 
-    df = pd.read_csv("data/raw_hf/jigsaw_full.csv")
-    df = df.dropna(subset=["comment_text"])
-
-    X = df["comment_text"].astype(str)
-    Y = df[LABELS].astype(int)
-
-    X_train, X_test, Y_train, Y_test = train_test_split(
-        X, Y, test_size=0.2, random_state=42
-    )
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
 
     clf = OneVsRestClassifier(
         LogisticRegression(max_iter=2000, class_weight="balanced")
@@ -1,18 +1,21 @@
 from pathlib import Path
+import argparse
 import json
 
-import pandas as pd
 import joblib
 
-from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import (
+    HashingVectorizer,
+    TfidfTransformer,
+    TfidfVectorizer,
+)
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import f1_score, classification_report
 
-
-LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+from dataset import DATA_PATH, LABELS, train_test
+from tuning import PATH_CS, per_label_ovr, regularization_path
 
 #  Best params from your GridSearch output
 BEST_PARAMS = {
@@ -22,44 +25,97 @@ BEST_PARAMS = {
     "clf__estimator__C": 2.0,
 }
 
-DATA_PATH = Path("data/raw_hf/jigsaw_full.csv")
+# Variante "hashing" : pas de vocabulaire (HashingVectorizer sans état),
+# seuls les poids IDF appris sont stockés (tableau plat idf_).
+HASHING_PARAMS = {
+    "hash__n_features": 2 ** 18,
+    "hash__ngram_range": (1, 2),
+    "clf__estimator__C": 2.0,
+}
+
 MODELS_DIR = Path("models")
 REPORTS_DIR = Path("reports")
 
 
-def main():
-    print("=== Train BEST Multi-label Model (TF-IDF + OneVsRest(LogReg)) ===")
+def build_estimator(C=1.0):
+    return LogisticRegression(
+        max_iter=2000,
+        class_weight="balanced",
+        C=C,
+    )
+
 
-    if not DATA_PATH.exists():
-        raise FileNotFoundError(f"Dataset not found: {DATA_PATH}")
+def build_classifier(C):
+    return OneVsRestClassifier(build_estimator(C))
 
-    df = pd.read_csv(DATA_PATH).dropna(subset=["comment_text"])
-    X = df["comment_text"].astype(str)
-    Y = df[LABELS].astype(int)
 
-    # Split (same as before for comparability)
-    X_train, X_test, Y_train, Y_test = train_test_split(
-        X, Y, test_size=0.2, random_state=42
-    )
+def build_pipeline(variant="tfidf"):
+    if variant == "hashing":
+        return Pipeline([
+            ("hash", HashingVectorizer(
+                n_features=HASHING_PARAMS["hash__n_features"],
+                ngram_range=HASHING_PARAMS["hash__ngram_range"],
+                alternate_sign=False,
+                norm=None,
+            )),
+            ("idf", TfidfTransformer()),
+            ("clf", build_classifier(HASHING_PARAMS["clf__estimator__C"])),
+        ])
 
-    # Build best pipeline
-    pipe = Pipeline([
+    return Pipeline([
         ("tfidf", TfidfVectorizer(
             max_features=BEST_PARAMS["tfidf__max_features"],
             min_df=BEST_PARAMS["tfidf__min_df"],
             ngram_range=BEST_PARAMS["tfidf__ngram_range"],
             max_df=0.9,
         )),
-        ("clf", OneVsRestClassifier(
-            LogisticRegression(
-                max_iter=2000,
-                class_weight="balanced",
-                C=BEST_PARAMS["clf__estimator__C"],
-            )
-        ))
+        ("clf", build_classifier(BEST_PARAMS["clf__estimator__C"])),
     ])
 
-    pipe.fit(X_train, Y_train)
+
+def fit_c_path(pipe, X_train, Y_train, variant):
+    """
+    Per-label C from a warm-started regularization path (3 folds of the train
+    split, shared by all labels). A label keeps the pipeline's global C
+    unless its best path C scores strictly higher on the same folds.
+    """
+    features = pipe[:-1]
+    global_C = pipe[-1].estimator.C
+    path = regularization_path(features, X_train, Y_train, PATH_CS, build_estimator(),
+                               labels=LABELS, default_C=global_C)
+    Cs = [path["labels"][lab]["best_C"] for lab in LABELS]
+    print(f"\n Regularization path ({len(path['Cs'])} C values, {path['path_s']:.1f}s, global C={global_C:g})")
+    for lab, C in zip(LABELS, Cs):
+        r = path["labels"][lab]
+        note = " (global C kept)" if r["fallback"] else ""
+        print(f"{lab:<14} C={C:<8.3g} CV F1 path={r['path_f1']:.3f} global={r['default_f1']:.3f}{note}")
+
+    X_vec = features.fit_transform(X_train)
+    pipe.steps[-1] = ("clf", per_label_ovr(build_estimator(), X_vec, Y_train, Cs))
+
+    REPORTS_DIR.mkdir(exist_ok=True)
+    path_path = REPORTS_DIR / f"c_path_{variant}.json"
+    path_path.write_text(json.dumps(path, indent=2), encoding="utf-8")
+    print(f"Saved path -> {path_path}")
+    return dict(zip(LABELS, Cs)), path, path_path
+
+
+def main(variant="tfidf", c_path=False):
+    if variant == "hashing":
+        print("=== Train BEST Multi-label Model (Hashing + IDF + OneVsRest(LogReg)) ===")
+    else:
+        print("=== Train BEST Multi-label Model (TF-IDF + OneVsRest(LogReg)) ===")
+
+    # Split (same as before for comparability, indices cached in the store)
+    X_train, X_test, Y_train, Y_test = train_test(LABELS, csv_path=DATA_PATH)
+
+    # Build best pipeline
+    pipe = build_pipeline(variant)
+
+    if c_path:
+        per_label_C, path, path_path = fit_c_path(pipe, X_train, Y_train, variant)
+    else:
+        pipe.fit(X_train, Y_train)
     Y_pred = pipe.predict(X_test)
 
     f1_macro = f1_score(Y_test, Y_pred, average="macro")
@@ -79,20 +135,46 @@ def main():
     MODELS_DIR.mkdir(exist_ok=True)
     REPORTS_DIR.mkdir(exist_ok=True)
 
-    model_path = MODELS_DIR / "best_multilabel_tfidf_logreg.joblib"
+    model_path = MODELS_DIR / f"best_multilabel_{variant}_logreg.joblib"
     joblib.dump(pipe, model_path)
     print(f"\nSaved model -> {model_path}")
 
     metrics = {
         "f1_macro": float(f1_macro),
         "f1_weighted": float(f1_weighted),
-        "best_params": BEST_PARAMS,
+        "f1_per_label": dict(zip(LABELS, f1_score(Y_test, Y_pred, average=None).tolist())),
+        "best_params": HASHING_PARAMS if variant == "hashing" else BEST_PARAMS,
         "labels": LABELS,
     }
+    if c_path:
+        metrics["per_label_C"] = per_label_C
+        metrics["per_label_C_fallback"] = [lab for lab, r in path["labels"].items() if r["fallback"]]
+        metrics["c_path"] = str(path_path)
     metrics_path = REPORTS_DIR / "best_model_metrics.json"
+
+    if variant == "hashing":
+        # Delta vs the TF-IDF model (same split, same classifier settings)
+        if metrics_path.exists():
+            ref = json.loads(metrics_path.read_text(encoding="utf-8"))
+            metrics["f1_macro_delta_vs_tfidf"] = float(f1_macro) - ref["f1_macro"]
+            metrics["f1_weighted_delta_vs_tfidf"] = float(f1_weighted) - ref["f1_weighted"]
+            print("F1 macro delta vs TF-IDF   :", metrics["f1_macro_delta_vs_tfidf"])
+            print("F1 weighted delta vs TF-IDF:", metrics["f1_weighted_delta_vs_tfidf"])
+        metrics_path = REPORTS_DIR / "best_model_hashing_metrics.json"
     metrics_path.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
     print(f"Saved metrics -> {metrics_path}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--variant", choices=["tfidf", "hashing"], default="tfidf",
+        help="tfidf (vocabulaire appris, défaut) ou hashing (HashingVectorizer + IDF)",
+    )
+    parser.add_argument(
+        "--c-path", action="store_true",
+        help="un C par label, choisi sur un chemin de régularisation (warm start, CV 3 folds) ; "
+             "le C global est gardé si le chemin ne fait pas mieux",
+    )
+    args = parser.parse_args()
+    main(args.variant, args.c_path)
@@ -3,20 +3,13 @@ from imblearn.over_sampling import SMOTE
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import GridSearchCV
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
-import pandas as pd
 
+from dataset import train_test
 
-def main():
-
-    df = pd.read_csv("data/raw_hf/jigsaw_full.csv")
 
-    X = df["comment_text"]
-    y = df["toxic"]
+def main():
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    X_train, X_test, y_train, y_test = train_test("toxic", stratify="toxic")
 
     pipeline = Pipeline([
         ("tfidf", TfidfVectorizer()),
@@ -1,50 +1,63 @@
-import pandas as pd
+import argparse
+import time
 
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import GridSearchCV
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.linear_model import LogisticRegression
 
-LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
+from dataset import LABELS, train_test
+from tuning import FeatureGridSearch
 
+PARAM_GRID = {
+    "tfidf__max_features": [20000, 30000],
+    "tfidf__ngram_range": [(1,1), (1,2)],
+    "tfidf__min_df": [2, 3],
+    "clf__estimator__C": [0.5, 1.0, 2.0],
+}
 
-def main():
-    print("=== GridSearch MULTI-LABEL ===")
 
-    df = pd.read_csv("data/raw_hf/jigsaw_full.csv").dropna(subset=["comment_text"])
-    X = df["comment_text"].astype(str)
-    Y = df[LABELS].astype(int)
-
-    X_train, X_test, Y_train, Y_test = train_test_split(
-        X, Y, test_size=0.2, random_state=42
-    )
-
-    pipe = Pipeline([
-        ("tfidf", TfidfVectorizer()),
-        ("clf", OneVsRestClassifier(LogisticRegression(max_iter=2000, class_weight="balanced")))
-    ])
-
-    param_grid = {
-        "tfidf__max_features": [20000, 30000],
-        "tfidf__ngram_range": [(1,1), (1,2)],
-        "tfidf__min_df": [2, 3],
-        "clf__estimator__C": [0.5, 1.0, 2.0],
-    }
-
-    grid = GridSearchCV(
-        pipe,
-        param_grid=param_grid,
-        cv=3,
-        scoring="f1_macro",
-        n_jobs=-1,
-        verbose=1
-    )
+def main(reference=False):
+    print("=== GridSearch MULTI-LABEL ===")
 
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+
+    if reference:
+        # Plain GridSearchCV: refits the TF-IDF for every candidate
+        pipe = Pipeline([
+            ("tfidf", TfidfVectorizer()),
+            ("clf", OneVsRestClassifier(LogisticRegression(max_iter=2000, class_weight="balanced")))
+        ])
+        grid = GridSearchCV(
+            pipe,
+            param_grid=PARAM_GRID,
+            cv=3,
+            scoring="f1_macro",
+            n_jobs=-1,
+            verbose=1
+        )
+    else:
+        # Same folds / scores, TF-IDF features built once per fold and cached
+        grid = FeatureGridSearch(
+            PARAM_GRID,
+            estimator=LogisticRegression(max_iter=2000, class_weight="balanced"),
+            cv=3,
+            average="macro",
+            n_jobs=-1,
+            verbose=1
+        )
+
+    t0 = time.perf_counter()
     grid.fit(X_train, Y_train)
-    print("\nBest params:", grid.best_params_)
+    print(f"\nSearch time: {time.perf_counter() - t0:.1f}s")
+    print("Best params:", grid.best_params_)
     print("Best CV f1_macro:", grid.best_score_)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reference", action="store_true",
+                        help="run sklearn GridSearchCV instead of the cached-feature search")
+    args = parser.parse_args()
+    main(reference=args.reference)
@@ -0,0 +1,304 @@
+"""
+Out-of-core multi-label training: Hashing + IDF + one SGD(log_loss) per label.
+
+Nothing grows with the corpus except the number of chunks:
+- texts and labels are streamed in chunks from the columnar store
+  (code/ml/dataset.py, memory-mapped) and from optional extra labelled CSVs
+  (read with pd.read_csv(chunksize=...)); extra CSVs need comment_text + the
+  six label columns;
+- the vectorizer is stateless (HashingVectorizer); a first pass over the
+  chunks counts document frequencies (one int64 array of n_features) for the
+  IDF weights and label frequencies for the per-label class weights;
+- a second pass trains each label's SGDClassifier with partial_fit; the state
+  (estimators, IDF, position in the stream) is checkpointed after every chunk
+  and --resume continues from the last one.
+
+The saved artifact is a regular Pipeline (hash → idf → OneVsRestClassifier),
+assembled by tuning.assemble_idf / assemble_ovr and checked against a regular
+fit on a small sample before training; app.py loads it (TOXISCAN_MODEL_PATH)
+and export_model_flat.py exports it.
+
+Usage (from the repository root):
+    python code/ml/train_incremental_multilabel.py
+    python code/ml/train_incremental_multilabel.py --extra data/labelled/hn_labelled.csv
+    python code/ml/train_incremental_multilabel.py --resume
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import SGDClassifier
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.metrics import f1_score
+
+from dataset import DATA_PATH, LABELS, load_labels, load_texts, split_indices
+from tuning import assemble_idf, assemble_ovr, fit_binary
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PARAMS = {
+    "hash__n_features": 2 ** 18,
+    "hash__ngram_range": (1, 2),
+    "clf__alpha": 1e-5,
+    "chunk_size": 10_000,
+    "epochs": 3,
+}
+
+MODELS_DIR = Path("models")
+REPORTS_DIR = Path("reports")
+MODEL_PATH = MODELS_DIR / "incremental_multilabel_hashing_sgd.joblib"
+CHECKPOINT_PATH = MODELS_DIR / "incremental_multilabel_hashing_sgd.ckpt.joblib"
+METRICS_PATH = REPORTS_DIR / "incremental_model_metrics.json"
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (VmHWM; ru_maxrss survives fork+exec)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def build_vectorizer(params):
+    return HashingVectorizer(
+        n_features=params["hash__n_features"],
+        ngram_range=tuple(params["hash__ngram_range"]),
+        alternate_sign=False,
+        norm=None,
+    )
+
+
+def build_estimator(params, class_weight=None):
+    return SGDClassifier(
+        loss="log_loss",
+        alpha=params["clf__alpha"],
+        average=True,
+        class_weight=class_weight,
+        random_state=42,
+    )
+
+
+# =========================
+# Streaming
+# =========================
+def iter_chunks(data_path, rows, chunk_size, extra):
+    """
+    Lazy chunks: (key, load) where load() -> (texts, Y int8). Loading is
+    deferred so that --resume skips chunks without reading them.
+    """
+    for k, start in enumerate(range(0, len(rows), chunk_size)):
+        idx = np.sort(rows[start:start + chunk_size])
+        yield f"jigsaw:{k}", (lambda idx=idx: (
+            load_texts(rows=idx, csv_path=data_path),
+            load_labels(LABELS, idx, csv_path=data_path),
+        ))
+    for path in extra:
+        reader = pd.read_csv(path, chunksize=chunk_size, usecols=["comment_text", *LABELS])
+        for k, df in enumerate(reader):
+            df = df.dropna(subset=["comment_text"])
+            yield f"{path}:{k}", (lambda df=df: (
+                df["comment_text"].astype(str).tolist(),
+                df[LABELS].to_numpy(dtype=np.int8),
+            ))
+
+
+def count_pass(vec, chunks, n_features):
+    """Document frequencies (IDF) and positives per label, one chunk at a time."""
+    df = np.zeros(n_features, dtype=np.int64)
+    positives = np.zeros(len(LABELS), dtype=np.int64)
+    n_docs = 0
+    for _, load in chunks:
+        texts, Y = load()
+        X = vec.transform(texts)
+        df += np.bincount(X.indices, minlength=n_features)
+        positives += Y.sum(axis=0, dtype=np.int64)
+        n_docs += len(texts)
+    return df, positives, n_docs
+
+
+def balanced_weights(positives, n_docs):
+    """Per-label class_weight dicts, same formula as class_weight="balanced"."""
+    weights = []
+    for pos in positives.tolist():
+        neg = n_docs - pos
+        weights.append({0: n_docs / (2.0 * max(neg, 1)), 1: n_docs / (2.0 * max(pos, 1))})
+    return weights
+
+
+def as_pipeline(vec, idf, estimators, params):
+    # assemble_ovr only looks at the label columns of Y
+    clf = assemble_ovr(build_estimator(params), np.eye(len(LABELS), dtype=np.int8), estimators)
+    return Pipeline([("hash", vec), ("idf", idf), ("clf", clf)])
+
+
+def check_assembly(texts, Y, params, atol=1e-10):
+    """
+    Same estimators, fitted on `texts`, once through a regular
+    Pipeline.fit (TfidfTransformer + OneVsRestClassifier) and once assembled
+    like the trained model (count_pass -> assemble_idf, per-label fits ->
+    as_pipeline): predict_proba must agree.
+    """
+    vec, est = build_vectorizer(params), build_estimator(params)
+    reference = Pipeline([("hash", vec), ("idf", TfidfTransformer()), ("clf", OneVsRestClassifier(est))])
+    reference.fit(texts, Y)
+    df, _, n_docs = count_pass(vec, [("check", lambda: (texts, Y))], params["hash__n_features"])
+    idf = assemble_idf(df, n_docs)
+    X = idf.transform(vec.transform(texts))
+    assembled = as_pipeline(vec, idf, [fit_binary(clone(est), X, Y[:, j]) for j in range(Y.shape[1])], params)
+    diff = np.abs(assembled.predict_proba(texts) - reference.predict_proba(texts)).max()
+    if diff > atol:
+        raise RuntimeError(f"assembled pipeline differs from a regular fit (max |dp| = {diff:.2e})")
+    return diff
+
+
+def _partial_fit(est, X, y):
+    return est.partial_fit(X, y, classes=[0, 1])
+
+
+def save_checkpoint(state, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+
+# =========================
+# Train / evaluate
+# =========================
+def evaluate(pipe, data_path, test_rows, chunk_size):
+    preds, truth = [], []
+    for _, load in iter_chunks(data_path, test_rows, chunk_size, []):
+        texts, Y = load()
+        preds.append(pipe.predict(texts))
+        truth.append(Y)
+    Y_true, Y_pred = np.vstack(truth), np.vstack(preds)
+    per_label = f1_score(Y_true, Y_pred, average=None, zero_division=0)
+    return {
+        "f1_macro":     float(f1_score(Y_true, Y_pred, average="macro", zero_division=0)),
+        "f1_weighted":  float(f1_score(Y_true, Y_pred, average="weighted", zero_division=0)),
+        "f1_per_label": dict(zip(LABELS, per_label.tolist())),
+    }
+
+
+def main(data_path=DATA_PATH, extra=(), resume=False, out=MODEL_PATH, checkpoint=CHECKPOINT_PATH,
+         n_jobs=-1, **overrides):
+    print("=== Train Multi-label Model OUT-OF-CORE (Hashing + IDF + SGD log_loss par label) ===")
+    t_start = time.perf_counter()
+    extra = [str(p) for p in extra]
+    params = {**PARAMS, **{k: v for k, v in overrides.items() if v is not None}}
+    train_rows, test_rows = split_indices(csv_path=data_path)
+    vec = build_vectorizer(params)
+    chunks = lambda: iter_chunks(data_path, train_rows, params["chunk_size"], extra)
+
+    _, load_first = next(chunks())
+    texts, Y = load_first()
+    print(f"Assembly check (predict_proba vs regular fit, {min(len(texts), 500)} rows): "
+          f"max diff {check_assembly(texts[:500], Y[:500], params):.1e}")
+
+    state = joblib.load(checkpoint) if resume and checkpoint.exists() else None
+    if state is not None and (state["params"], state["extra"]) != (params, extra):
+        print(f"Checkpoint {checkpoint} : paramètres ou sources différents, nouveau départ")
+        state = None
+    if state is None:
+        t0 = time.perf_counter()
+        df, positives, n_docs = count_pass(vec, chunks(), params["hash__n_features"])
+        print(f"Pass 1 (IDF + label counts): {n_docs} docs in {time.perf_counter() - t0:.1f}s")
+        weights = balanced_weights(positives, n_docs)
+        state = {
+            "params":     params,
+            "extra":      extra,
+            "idf":        assemble_idf(df, n_docs),
+            "n_docs":     n_docs,
+            "positives":  dict(zip(LABELS, positives.tolist())),
+            "estimators": [build_estimator(params, w) for w in weights],
+            "epoch":      0,
+            "done":       0,
+            "rows_seen":  0,
+            "chunk_s":    [],
+        }
+    else:
+        print(f"Resuming from {checkpoint}: epoch {state['epoch'] + 1}, {state['done']} chunks done")
+
+    with Parallel(n_jobs=n_jobs, prefer="threads") as parallel:
+        while state["epoch"] < params["epochs"]:
+            for i, (key, load) in enumerate(chunks()):
+                if i < state["done"]:
+                    continue
+                t0 = time.perf_counter()
+                texts, Y = load()
+                X = state["idf"].transform(vec.transform(texts))
+                state["estimators"] = parallel(
+                    delayed(_partial_fit)(est, X, Y[:, j]) for j, est in enumerate(state["estimators"])
+                )
+                state["done"] = i + 1
+                state["rows_seen"] += len(texts)
+                state["chunk_s"].append(time.perf_counter() - t0)
+                save_checkpoint(state, checkpoint)
+                print(f"epoch {state['epoch'] + 1} chunk {key}: {len(texts)} rows, "
+                      f"{state['chunk_s'][-1]:.2f}s, peak RSS {peak_rss_mb() or 0:.0f} MB")
+            state["epoch"] += 1
+            state["done"] = 0
+            save_checkpoint(state, checkpoint)
+
+    pipe = as_pipeline(vec, state["idf"], state["estimators"], params)
+    metrics = evaluate(pipe, data_path, test_rows, params["chunk_size"])
+    print("\n Global metrics")
+    print("F1 macro   :", metrics["f1_macro"])
+    print("F1 weighted:", metrics["f1_weighted"])
+    for lab, f1 in metrics["f1_per_label"].items():
+        print(f"{lab:<14} F1={f1:.3f}")
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(pipe, out)
+    print(f"\nSaved model -> {out}")
+
+    REPORTS_DIR.mkdir(exist_ok=True)
+    metrics.update({
+        "params":       {**params, "hash__ngram_range": list(params["hash__ngram_range"])},
+        "labels":       LABELS,
+        "sources":      [str(data_path), *extra],
+        "rows_seen":    state["rows_seen"],
+        "positives":    state["positives"],
+        "chunks":       len(state["chunk_s"]),
+        "mean_chunk_s": float(np.mean(state["chunk_s"])) if state["chunk_s"] else 0.0,
+        "total_s":      time.perf_counter() - t_start,
+        "peak_rss_mb":  peak_rss_mb(),
+    })
+    METRICS_PATH.write_text(json.dumps(metrics, indent=2), encoding="utf-8")
+    print(f"Saved metrics -> {METRICS_PATH}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="CSV Jigsaw (converti en store colonne)")
+    parser.add_argument("--extra", type=Path, action="append", default=[],
+                        help="CSV labellisé supplémentaire (comment_text + 6 labels), répétable")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--alpha", type=float, default=None, dest="clf__alpha")
+    parser.add_argument("--resume", action="store_true", help="reprend depuis le dernier checkpoint")
+    parser.add_argument("--out", type=Path, default=MODEL_PATH)
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    args = parser.parse_args()
+    main(args.data, args.extra, args.resume, args.out, args.checkpoint,
+         chunk_size=args.chunk_size, epochs=args.epochs, clf__alpha=args.clf__alpha)
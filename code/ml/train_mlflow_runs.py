@@ -1,13 +1,34 @@
-import pandas as pd
+"""
+MLflow comparison runs: TF-IDF + LogReg, TF-IDF -> SVD -> RandomForest,
+TF-IDF -> SVD -> XGBoost (all OneVsRest).
+
+The three pipelines share the same TfidfVectorizer and the tree models the
+same TruncatedSVD: both stages are fitted once and cached on disk
+(code/ml/features.py), then the candidate models are fitted concurrently in a
+process pool (fork on Linux, spawn elsewhere; --workers 0 runs them inline).
+Each run is logged to the local MLflow file store (mlruns/) with its params,
+F1 scores, per-stage timings as metrics and the full pipeline as model.
+
+Usage (from the repository root):
+    python code/ml/train_mlflow_runs.py
+    python code/ml/train_mlflow_runs.py --workers 0
+    mlflow ui --backend-store-uri mlruns
+"""
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import gc
+import multiprocessing as mp
+import os
+import sys
+import time
+
 import mlflow
 import mlflow.sklearn
 
-from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.multiclass import OneVsRestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.decomposition import TruncatedSVD
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import f1_score
 
@@ -17,9 +38,11 @@ try:
 except Exception:
     HAS_XGB = False
 
+from dataset import LABELS, train_test
+from features import CACHE_DIR, FeatureStage, svd_features, tfidf_features
 
-LABELS = ["toxic", "severe_toxic", "obscene", "threat", "insult", "identity_hate"]
-DATA_PATH = "data/raw_hf/jigsaw_full.csv"
+EXPERIMENT = "ToxiScan_Phase2_Week3"
+MLRUNS_DIR = Path("mlruns")
 
 # Best params trouvés par votre GridSearch (LogReg)
 BEST_LOGREG_PARAMS = {
@@ -29,6 +52,68 @@ BEST_LOGREG_PARAMS = {
     "clf__estimator__C": 2.0,
 }
 
+# TF-IDF commun aux trois runs
+TFIDF_PARAMS = {
+    "max_features": BEST_LOGREG_PARAMS["tfidf__max_features"],
+    "min_df": BEST_LOGREG_PARAMS["tfidf__min_df"],
+    "ngram_range": BEST_LOGREG_PARAMS["tfidf__ngram_range"],
+    "max_df": 0.9,
+}
+
+# (on garde “light” pour éviter blocage/temps énorme)
+SVD_DIM = 200
+RF_N_ESTIMATORS = 120
+XGB_N_ESTIMATORS = 150
+
+
+def build_logreg(n_jobs):
+    return OneVsRestClassifier(
+        LogisticRegression(
+            max_iter=2000,
+            class_weight="balanced",
+            C=BEST_LOGREG_PARAMS["clf__estimator__C"]
+        ),
+        n_jobs=n_jobs
+    )
+
+
+def build_rf(n_jobs):
+    return OneVsRestClassifier(
+        RandomForestClassifier(
+            n_estimators=RF_N_ESTIMATORS,
+            random_state=42,
+            n_jobs=1
+        ),
+        n_jobs=n_jobs
+    )
+
+
+def build_xgb(n_jobs):
+    return OneVsRestClassifier(
+        XGBClassifier(
+            n_estimators=XGB_N_ESTIMATORS,
+            max_depth=6,
+            learning_rate=0.1,
+            subsample=0.8,
+            colsample_bytree=0.8,
+            reg_lambda=1.0,
+            objective="binary:logistic",
+            eval_metric="logloss",
+            tree_method="hist",
+            random_state=42,
+            n_jobs=1
+        ),
+        n_jobs=n_jobs
+    )
+
+
+# run name -> (feature stage, classifier builder, params logged)
+RUNS = {
+    "Best_TFIDF_LogReg_OVR": ("tfidf", build_logreg, BEST_LOGREG_PARAMS),
+    "RF_SVD_OVR": ("svd", build_rf, {"svd_n_components": SVD_DIM, "rf_n_estimators": RF_N_ESTIMATORS}),
+    "XGB_SVD_OVR": ("svd", build_xgb, {"svd_n_components": SVD_DIM, "xgb_n_estimators": XGB_N_ESTIMATORS}),
+}
+
 
 def safe_log_model(model, model_name="model"):
     """
@@ -41,135 +126,102 @@ def safe_log_model(model, model_name="model"):
         mlflow.sklearn.log_model(model, artifact_path=model_name)
 
 
-def eval_and_log(run_name, pipe, params, X_train, X_test, Y_train, Y_test):
-    with mlflow.start_run(run_name=run_name):
-        # Log params
-        for k, v in params.items():
-            mlflow.log_param(k, v)
-
-        # Fit + Predict
-        pipe.fit(X_train, Y_train)
-        Y_pred = pipe.predict(X_test)
-
-        # Metrics
-        f1_macro = f1_score(Y_test, Y_pred, average="macro")
-        f1_weighted = f1_score(Y_test, Y_pred, average="weighted")
+def fit_candidate(run_name, stage_path, Y_train, Y_test, n_jobs):
+    """Worker: fit one classifier on the cached features, predict the test split."""
+    stage = FeatureStage(Path(stage_path), cached=True)
+    t0 = time.perf_counter()
+    X_train, X_test = stage.train, stage.test
+    t1 = time.perf_counter()
+    clf = RUNS[run_name][1](n_jobs).fit(X_train, Y_train)
+    t2 = time.perf_counter()
+    Y_pred = clf.predict(X_test)
+    t3 = time.perf_counter()
+    return {
+        "clf": clf,
+        "Y_pred": Y_pred,
+        "time_load_features_s": t1 - t0,
+        "time_fit_s": t2 - t1,
+        "time_predict_s": t3 - t2,
+    }
+
+
+def log_run(run_name, result, stages, stage_timings, Y_test):
+    feature_stage, _, params = RUNS[run_name]
+    f1_macro = f1_score(Y_test, result["Y_pred"], average="macro")
+    f1_weighted = f1_score(Y_test, result["Y_pred"], average="weighted")
+
+    steps = [("tfidf", stages["tfidf"].transformer)]
+    if feature_stage == "svd":
+        steps.append(("svd", stages["svd"].transformer))
+    steps.append(("clf", result["clf"]))
 
+    with mlflow.start_run(run_name=run_name):
+        mlflow.log_params(params)
+        mlflow.log_params({f"{k}_cached": stages[k].cached for k in stages if k == "tfidf" or k == feature_stage})
         mlflow.log_metric("f1_macro", float(f1_macro))
         mlflow.log_metric("f1_weighted", float(f1_weighted))
 
-        # Log model artifact
-        safe_log_model(pipe, model_name="model")
+        # Per-stage timings (shared stages: time spent in this invocation, ~0 when cached)
+        metrics = {"time_load_data_s": stage_timings["load_data"], "time_tfidf_s": stage_timings["tfidf"]}
+        if feature_stage == "svd":
+            metrics["time_svd_s"] = stage_timings["svd"]
+        metrics.update({k: v for k, v in result.items() if k.startswith("time_")})
+        mlflow.log_metrics(metrics)
 
-        print(f"[{run_name}] f1_macro={f1_macro:.4f} | f1_weighted={f1_weighted:.4f}")
+        safe_log_model(Pipeline(steps), model_name="model")
 
+    print(f"[{run_name}] f1_macro={f1_macro:.4f} | f1_weighted={f1_weighted:.4f} | "
+          f"fit {result['time_fit_s']:.1f}s")
 
-def main():
-    mlflow.set_experiment("ToxiScan_Phase2_Week3")
 
-    df = pd.read_csv(DATA_PATH).dropna(subset=["comment_text"])
-    X = df["comment_text"].astype(str)
-    Y = df[LABELS].astype(int)
+def main(workers=None, cache_dir=CACHE_DIR):
+    mlflow.set_tracking_uri(MLRUNS_DIR.resolve().as_uri())
+    mlflow.set_experiment(EXPERIMENT)
 
-    X_train, X_test, Y_train, Y_test = train_test_split(
-        X, Y, test_size=0.2, random_state=42
-    )
-
-    # -------------------------
-    # RUN 1: Best TF-IDF + LogReg (OVR)
-    # -------------------------
-    best_logreg = Pipeline([
-        ("tfidf", TfidfVectorizer(
-            max_features=BEST_LOGREG_PARAMS["tfidf__max_features"],
-            min_df=BEST_LOGREG_PARAMS["tfidf__min_df"],
-            ngram_range=BEST_LOGREG_PARAMS["tfidf__ngram_range"],
-            max_df=0.9
-        )),
-        ("clf", OneVsRestClassifier(
-            LogisticRegression(
-                max_iter=2000,
-                class_weight="balanced",
-                C=BEST_LOGREG_PARAMS["clf__estimator__C"]
-            ),
-            n_jobs=1  # stable sur Windows
-        ))
-    ])
-
-    eval_and_log(
-        "Best_TFIDF_LogReg_OVR",
-        best_logreg,
-        BEST_LOGREG_PARAMS,
-        X_train, X_test, Y_train, Y_test
-    )
-
-    # -------------------------
-    # RUN 2: RandomForest (OVR) avec TF-IDF -> SVD -> RF
-    # (on garde “light” pour éviter blocage/temps énorme)
-    # -------------------------
-    svd_dim = 200
-    rf_n_estimators = 120
-
-    rf_pipe = Pipeline([
-        ("tfidf", TfidfVectorizer(
-            max_features=30000, ngram_range=(1, 2), min_df=2, max_df=0.9
-        )),
-        ("svd", TruncatedSVD(n_components=svd_dim, random_state=42)),
-        ("clf", OneVsRestClassifier(
-            RandomForestClassifier(
-                n_estimators=rf_n_estimators,
-                random_state=42,
-                n_jobs=1
-            ),
-            n_jobs=1  # IMPORTANT Windows
-        ))
-    ])
-
-    eval_and_log(
-        "RF_SVD_OVR",
-        rf_pipe,
-        {"svd_n_components": svd_dim, "rf_n_estimators": rf_n_estimators},
-        X_train, X_test, Y_train, Y_test
-    )
+    runs = [name for name in RUNS if name != "XGB_SVD_OVR" or HAS_XGB]
+    if not HAS_XGB:
+        print("XGBoost not installed -> skip XGB run (pip install xgboost)")
 
-    # -------------------------
-    # RUN 3: XGBoost (OVR) avec TF-IDF -> SVD -> XGB
-    # (light pour finir vite et logger MLflow)
-    # -------------------------
-    if HAS_XGB:
-        xgb_n_estimators = 150
-
-        xgb_pipe = Pipeline([
-            ("tfidf", TfidfVectorizer(
-                max_features=30000, ngram_range=(1, 2), min_df=2, max_df=0.9
-            )),
-            ("svd", TruncatedSVD(n_components=svd_dim, random_state=42)),
-            ("clf", OneVsRestClassifier(
-                XGBClassifier(
-                    n_estimators=xgb_n_estimators,
-                    max_depth=6,
-                    learning_rate=0.1,
-                    subsample=0.8,
-                    colsample_bytree=0.8,
-                    reg_lambda=1.0,
-                    objective="binary:logistic",
-                    eval_metric="logloss",
-                    tree_method="hist",
-                    random_state=42,
-                    n_jobs=1
-                ),
-                n_jobs=1
-            ))
-        ])
-
-        eval_and_log(
-            "XGB_SVD_OVR",
-            xgb_pipe,
-            {"svd_n_components": svd_dim, "xgb_n_estimators": xgb_n_estimators},
-            X_train, X_test, Y_train, Y_test
-        )
+    t0 = time.perf_counter()
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+    Y_train, Y_test = Y_train.to_numpy(), Y_test.to_numpy()
+    t1 = time.perf_counter()
+    stages = {"tfidf": tfidf_features(X_train, X_test, TFIDF_PARAMS, cache_dir)}
+    t2 = time.perf_counter()
+    if any(RUNS[name][0] == "svd" for name in runs):
+        stages["svd"] = svd_features(stages["tfidf"], SVD_DIM, cache_dir=cache_dir)
+    t3 = time.perf_counter()
+    stage_timings = {"load_data": t1 - t0, "tfidf": t2 - t1, "svd": t3 - t2}
+    for name, stage in stages.items():
+        print(f"{name}: {'cache' if stage.cached else 'fitted'} in {stage_timings[name]:.1f}s ({stage.path})")
+    del X_train, X_test
+
+    workers = len(runs) if workers is None else workers
+    inner_jobs = max(1, (os.cpu_count() or 1) // max(workers, 1))
+    if workers == 0:
+        for name in runs:
+            result = fit_candidate(name, str(stages[RUNS[name][0]].path), Y_train, Y_test, inner_jobs)
+            log_run(name, result, stages, stage_timings, Y_test)
     else:
-        print("XGBoost not installed -> skip XGB run (pip install xgboost)")
+        if "fork" in mp.get_all_start_methods() and sys.platform.startswith("linux"):
+            ctx = mp.get_context("fork")
+            gc.freeze()
+        else:
+            ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {
+                pool.submit(fit_candidate, name, str(stages[RUNS[name][0]].path), Y_train, Y_test, inner_jobs): name
+                for name in runs
+            }
+            # Logged from the parent as each run finishes (single writer for the file store)
+            for fut in as_completed(futures):
+                log_run(futures[fut], fut.result(), stages, stage_timings, Y_test)
+    print(f"Total: {time.perf_counter() - t0:.1f}s")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processus parallèles (défaut : un par modèle, 0 = séquentiel)")
+    args = parser.parse_args()
+    main(args.workers)
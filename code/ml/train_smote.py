@@ -1,24 +1,26 @@
-from imblearn.pipeline import Pipeline
-from imblearn.over_sampling import SMOTE
+import argparse
+
+import numpy as np
 from sklearn.linear_model import LogisticRegression
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-import pandas as pd
 
+try:
+    from imblearn.pipeline import Pipeline
+    from imblearn.over_sampling import SMOTE
+    HAS_IMBLEARN = True
+except ImportError:
+    HAS_IMBLEARN = False
 
-def main():
+from dataset import LABELS, train_test
+from rebalance import MultiLabelSMOTE, resampled_ovr
 
-    print("=== Logistic + SMOTE ===")
 
-    df = pd.read_csv("data/raw_hf/jigsaw_full.csv")
+def main():
 
-    X = df["comment_text"]
-    y = df["toxic"]
+    print("=== Logistic + SMOTE ===")
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    X_train, X_test, y_train, y_test = train_test("toxic", stratify="toxic")
 
     pipeline = Pipeline([
         ("tfidf", TfidfVectorizer(max_features=20000)),
@@ -33,5 +35,38 @@ def main():
     print(classification_report(y_test, y_pred))
 
 
+def main_multilabel(reducer="random_projection", ratio=1.0):
+
+    print(f"=== Logistic + SMOTE multi-label (voisins : {reducer or 'espace complet'}) ===")
+
+    X_train, X_test, Y_train, Y_test = train_test(LABELS)
+
+    vec = TfidfVectorizer(max_features=20000)
+    X_tr = vec.fit_transform(X_train)
+
+    sampler = MultiLabelSMOTE(sampling_strategy=ratio, reducer=reducer)
+    clf = resampled_ovr(LogisticRegression(max_iter=1000), X_tr, Y_train, sampler)
+    for j, lab in enumerate(LABELS):
+        r = sampler.report_[j]
+        print(f"{lab:<14} positives {r['positives']:>6} + {r['added']:>6} synthétiques")
+
+    Y_pred = clf.predict(vec.transform(X_test))
+
+    print(classification_report(np.asarray(Y_test), Y_pred, target_names=LABELS, zero_division=0))
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--multilabel", action="store_true",
+                        help="6 labels, SMOTE par label avec voisins en espace réduit (rebalance.py)")
+    parser.add_argument("--reducer", choices=["random_projection", "svd", "none"], default="random_projection")
+    parser.add_argument("--ratio", type=float, default=1.0,
+                        help="positifs visés par négatif, par label (défaut 1.0 = équilibre complet comme "
+                             "SMOTE ; 0.25 = moins de lignes synthétiques)")
+    args = parser.parse_args()
+    if args.multilabel:
+        main_multilabel(None if args.reducer == "none" else args.reducer, args.ratio)
+    elif not HAS_IMBLEARN:
+        raise SystemExit("imbalanced-learn not installed (pip install imbalanced-learn) ; voir --multilabel")
+    else:
+        main()
@@ -0,0 +1,406 @@
+# code/ml/tuning.py
+
+"""
+Grid search for TF-IDF + OneVsRest(LogisticRegression) with a feature cache.
+
+GridSearchCV refits the whole pipeline for every candidate, so every fold is
+re-tokenized for each (max_features, min_df, C) combination. Here:
+
+- each CV fold is tokenized once per tokenization setting (ngram_range, ...)
+  with a CountVectorizer keeping every term; count matrices are cached on disk
+  (scipy .npz) and reused across runs;
+- min_df / max_df / max_features are column masks over these counts, chosen
+  exactly like TfidfVectorizer does (same document / term frequencies, same
+  ordering), then TfidfTransformer gives the same matrices;
+- one TF-IDF matrix serves every C value, and the (C, label) logistic
+  regressions are fitted in parallel (joblib).
+
+Folds (KFold, as GridSearchCV uses for multi-label targets), scores, best
+params and best score are those of GridSearchCV with scoring="f1_<average>".
+
+regularization_path() picks one C per label along a warm-started path (falling
+back to the global C when the path does not beat it), and per_label_ovr()
+builds the matching OneVsRestClassifier.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+import sklearn
+from joblib import Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import KFold, ParameterGrid, StratifiedKFold
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelBinarizer
+
+CACHE_DIR = Path("data/cache/tuning")
+
+# TfidfVectorizer params applied after tokenization (no re-tokenization needed)
+SELECT_PARAMS = ("min_df", "max_df", "max_features")
+TRANSFORM_PARAMS = ("norm", "use_idf", "smooth_idf", "sublinear_tf")
+
+
+def _split_params(params: Dict[str, Any]) -> Tuple[Dict, Dict, Dict, Dict]:
+    """Pipeline-style params -> (tokenize, select, transform, estimator)."""
+    tok, sel, tfm, est = {}, {}, {}, {}
+    for key, value in params.items():
+        if key.startswith("tfidf__"):
+            name = key[len("tfidf__"):]
+            target = sel if name in SELECT_PARAMS else tfm if name in TRANSFORM_PARAMS else tok
+            target[name] = value
+        elif key.startswith("clf__estimator__"):
+            est[key[len("clf__estimator__"):]] = value
+        else:
+            raise ValueError(f"Unsupported parameter: {key}")
+    return tok, sel, tfm, est
+
+
+def _texts_digest(texts: Sequence[str]) -> str:
+    h = hashlib.sha1()
+    for t in texts:
+        h.update(t.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# ═══════════════════════════════════════════════════════
+#  Count cache
+# ═══════════════════════════════════════════════════════
+
+class CountCache:
+    """
+    Count matrices (float64, full sorted vocabulary) per fold and tokenization
+    setting, in memory and on disk under `cache_dir` (None = memory only).
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = CACHE_DIR) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.memory: Dict[str, Tuple[sp.csr_matrix, sp.csr_matrix]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def counts(
+        self, fold_key: str, train: Sequence[str], val: Sequence[str], tokenize: Dict[str, Any]
+    ) -> Tuple[sp.csr_matrix, sp.csr_matrix]:
+        params = json.dumps(tokenize, sort_keys=True, default=str)
+        key = hashlib.sha1(f"{fold_key}|{params}|{sklearn.__version__}".encode()).hexdigest()[:20]
+        if key in self.memory:
+            return self.memory[key]
+
+        path = self.cache_dir / key if self.cache_dir is not None else None
+        if path is not None and (path / "val.npz").exists():
+            self.hits += 1
+            pair = sp.load_npz(path / "train.npz").tocsr(), sp.load_npz(path / "val.npz").tocsr()
+        else:
+            self.misses += 1
+            # min_df=1 / max_df=1.0 / no max_features: every term, alphabetical order,
+            # float64 counts like inside TfidfVectorizer.
+            vec = CountVectorizer(dtype=np.float64, **tokenize)
+            pair = vec.fit_transform(train).tocsr(), vec.transform(val).tocsr()
+            if path is not None:
+                tmp = path.with_name(path.name + ".tmp")
+                tmp.mkdir(parents=True, exist_ok=True)
+                sp.save_npz(tmp / "train.npz", pair[0])
+                sp.save_npz(tmp / "val.npz", pair[1])
+                (tmp / "params.json").write_text(params, encoding="utf-8")
+                tmp.replace(path)
+        self.memory[key] = pair
+        return pair
+
+
+def select_features(
+    counts: sp.csr_matrix, min_df=1, max_df=1.0, max_features: Optional[int] = None
+) -> np.ndarray:
+    """Kept column indices — same rule as CountVectorizer._limit_features."""
+    n_doc = counts.shape[0]
+    high = max_df if isinstance(max_df, (int, np.integer)) else max_df * n_doc
+    low = min_df if isinstance(min_df, (int, np.integer)) else min_df * n_doc
+    dfs = np.bincount(counts.indices, minlength=counts.shape[1])
+    mask = (dfs <= high) & (dfs >= low)
+    if max_features is not None and mask.sum() > max_features:
+        tfs = np.asarray(counts.sum(axis=0)).ravel()
+        mask_inds = (-tfs[mask]).argsort()[:max_features]
+        new_mask = np.zeros(len(dfs), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+    kept = np.where(mask)[0]
+    if len(kept) == 0:
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+    return kept
+
+
+# ═══════════════════════════════════════════════════════
+#  Per-label fits
+# ═══════════════════════════════════════════════════════
+
+def _fit_predict_label(estimator, X_train, y, X_val) -> np.ndarray:
+    """One OneVsRest column: constant predictor when the fold has a single class."""
+    classes = np.unique(y)
+    if len(classes) == 1:
+        return np.full(X_val.shape[0], classes[0], dtype=int)
+    return estimator.fit(X_train, y).predict(X_val).astype(int)
+
+
+class FeatureGridSearch:
+    """
+    GridSearchCV replacement for Pipeline([("tfidf", TfidfVectorizer()),
+    ("clf", OneVsRestClassifier(estimator))]) with the same `param_grid` keys
+    (tfidf__*, clf__estimator__*) and the same attributes after fit:
+    cv_results_, best_params_, best_score_, best_index_, best_estimator_.
+    """
+
+    def __init__(
+        self,
+        param_grid: Dict[str, List[Any]],
+        estimator=None,
+        cv: int = 3,
+        average: str = "macro",
+        n_jobs: Optional[int] = -1,
+        cache_dir: Optional[Path] = CACHE_DIR,
+        refit: bool = True,
+        verbose: int = 1,
+    ) -> None:
+        self.param_grid = param_grid
+        self.estimator = estimator if estimator is not None else LogisticRegression(
+            max_iter=2000, class_weight="balanced")
+        self.cv = cv
+        self.average = average
+        self.n_jobs = n_jobs
+        self.cache = CountCache(cache_dir)
+        self.refit = refit
+        self.verbose = verbose
+
+    def fit(self, X, Y) -> "FeatureGridSearch":
+        texts = [str(t) for t in X]
+        Y = np.asarray(Y)
+        candidates = list(ParameterGrid(self.param_grid))
+        folds = list(KFold(n_splits=self.cv).split(texts))
+        scores = np.full((len(candidates), len(folds)), np.nan)
+        timings = {"count_s": 0.0, "tfidf_s": 0.0, "fit_s": 0.0}
+        if self.verbose:
+            print(f"Fitting {len(folds)} folds for each of {len(candidates)} candidates, "
+                  f"totalling {len(folds) * len(candidates)} fits")
+
+        split = [_split_params(p) for p in candidates]
+        features_key = lambda i: json.dumps(split[i][:3], sort_keys=True, default=str)
+        order = sorted(range(len(candidates)), key=features_key)
+
+        with Parallel(n_jobs=self.n_jobs) as parallel:
+            for f, (tr, va) in enumerate(folds):
+                train, val = [texts[i] for i in tr], [texts[i] for i in va]
+                fold_key = _texts_digest(train) + _texts_digest(val)
+                # Candidates whose pruning keeps the same columns (e.g. max_features
+                # above the vocabulary size) share their features, fits and score.
+                seen: Dict[str, float] = {}
+                for _, group in groupby(order, key=features_key):
+                    group = list(group)
+                    tok, sel, tfm, _ = split[group[0]]
+
+                    t0 = time.perf_counter()
+                    c_train, c_val = self.cache.counts(fold_key, train, val, tok)
+                    t1 = time.perf_counter()
+                    kept = select_features(c_train, **sel)
+                    digest = hashlib.sha1(kept.tobytes()).hexdigest() + json.dumps(
+                        [tok, tfm], sort_keys=True, default=str)
+                    fit_key = lambda i: digest + json.dumps(split[i][3], sort_keys=True, default=str)
+                    todo = [i for i in group if fit_key(i) not in seen]
+                    if todo:
+                        tfidf = TfidfTransformer(**tfm)
+                        X_train = tfidf.fit_transform(c_train[:, kept])
+                        X_val = tfidf.transform(c_val[:, kept])
+                    t2 = time.perf_counter()
+
+                    preds = parallel(
+                        delayed(_fit_predict_label)(
+                            clone(self.estimator).set_params(**split[i][3]), X_train, Y[tr, j], X_val)
+                        for i in todo for j in range(Y.shape[1])
+                    )
+                    for k, i in enumerate(todo):
+                        P = np.column_stack(preds[k * Y.shape[1]:(k + 1) * Y.shape[1]])
+                        seen[fit_key(i)] = f1_score(Y[va], P, average=self.average)
+                    for i in group:
+                        scores[i, f] = seen[fit_key(i)]
+                    timings["count_s"] += t1 - t0
+                    timings["tfidf_s"] += t2 - t1
+                    timings["fit_s"] += time.perf_counter() - t2
+
+        mean = scores.mean(axis=1)
+        rank = rankdata(-mean, method="min").astype(np.int32)
+        self.cv_results_ = {
+            "params":          candidates,
+            "mean_test_score": mean,
+            "std_test_score":  scores.std(axis=1),
+            "rank_test_score": rank,
+            **{f"split{f}_test_score": scores[:, f] for f in range(len(folds))},
+        }
+        self.best_index_ = int(np.argmax(mean))
+        self.best_params_ = candidates[self.best_index_]
+        self.best_score_ = float(mean[self.best_index_])
+        self.timings_ = {**timings, "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
+
+        if self.refit:
+            tok, sel, tfm, est = _split_params(self.best_params_)
+            self.best_estimator_ = Pipeline([
+                ("tfidf", TfidfVectorizer(**tok, **sel, **tfm)),
+                ("clf", OneVsRestClassifier(clone(self.estimator).set_params(**est), n_jobs=self.n_jobs)),
+            ]).fit(texts, Y)
+        return self
+
+
+# ═══════════════════════════════════════════════════════
+#  Regularization path (per-label C)
+# ═══════════════════════════════════════════════════════
+
+PATH_CS = np.logspace(-2, 2, 17)
+
+
+def _label_path(estimator, X_train, y, X_val, y_val, Cs) -> Tuple[List[float], List[int]]:
+    """F1 on (X_val, y_val) and lbfgs iterations along increasing Cs, each fit warm-started."""
+    if len(np.unique(y)) == 1:
+        f1 = f1_score(y_val, np.full(len(y_val), y[0]), zero_division=0)
+        return [float(f1)] * len(Cs), [0] * len(Cs)
+    est = clone(estimator).set_params(warm_start=True)
+    f1s, iters = [], []
+    for C in Cs:
+        est.set_params(C=float(C)).fit(X_train, y)
+        f1s.append(float(f1_score(y_val, est.predict(X_val), zero_division=0)))
+        iters.append(int(np.max(est.n_iter_)))
+    return f1s, iters
+
+
+def _rarest_label(Y: np.ndarray) -> np.ndarray:
+    """Per row, 1 + index of its rarest positive label (0 if none): the key the folds are stratified on."""
+    order = np.argsort(Y.sum(axis=0), kind="stable")
+    key = np.zeros(len(Y), dtype=np.int64)
+    for j in order[::-1]:  # rarest written last, so it wins
+        key[Y[:, j] == 1] = j + 1
+    return key
+
+
+def regularization_path(
+    features, X, Y, Cs: Sequence[float] = PATH_CS, estimator=None, cv: int = 3,
+    n_jobs: Optional[int] = -1, labels: Optional[Sequence[str]] = None,
+    default_C: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Per-label C for OneVsRest(LogisticRegression): on each fold, every
+    label's model is fitted along `Cs` (increasing) with warm starts, each fit
+    starting from the previous C's solution. The folds and their features are
+    built once and shared by all labels; they are stratified on each row's
+    rarest positive label, so every validation fold holds some positives of
+    the rare labels. `features` is an unfitted transformer (e.g. the
+    vectorizer steps of the pipeline), refitted per fold.
+
+    The path's best C of a label maximizes its mean validation F1 (smallest C
+    on ties). default_C (the global C of the pipeline) is inserted into the
+    path; a label keeps it unless the path's best mean F1 is strictly higher
+    than default_C's own ("fallback" in the result).
+    """
+    estimator = estimator if estimator is not None else LogisticRegression(
+        max_iter=2000, class_weight="balanced")
+    texts = [str(t) for t in X]
+    Y = np.asarray(Y)
+    Cs = sorted({float(c) for c in Cs} | ({float(default_C)} if default_C is not None else set()))
+    labels = list(labels) if labels is not None else [str(j) for j in range(Y.shape[1])]
+
+    t0 = time.perf_counter()
+    folds = []
+    for tr, va in StratifiedKFold(n_splits=cv).split(texts, _rarest_label(Y)):
+        feat = clone(features)
+        folds.append((tr, va, feat.fit_transform([texts[i] for i in tr]),
+                      feat.transform([texts[i] for i in va])))
+    t1 = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_label_path)(estimator, X_tr, Y[tr, j], X_va, Y[va, j], Cs)
+        for tr, va, X_tr, X_va in folds for j in range(Y.shape[1])
+    )
+    t2 = time.perf_counter()
+
+    f1 = np.array([r[0] for r in results]).reshape(cv, Y.shape[1], len(Cs))
+    iters = np.array([r[1] for r in results]).reshape(cv, Y.shape[1], len(Cs))
+    mean = f1.mean(axis=0)
+    out = {}
+    for j, lab in enumerate(labels):
+        path_C, path_f1 = Cs[int(np.argmax(mean[j]))], float(mean[j].max())
+        default_f1 = None if default_C is None else float(mean[j][Cs.index(float(default_C))])
+        fallback = default_f1 is not None and not path_f1 > default_f1
+        out[lab] = {
+            "best_C":      float(default_C) if fallback else path_C,
+            "fallback":    bool(fallback),
+            "path_C":      path_C,
+            "path_f1":     path_f1,
+            "default_f1":  default_f1,
+            "cv_f1":       mean[j].tolist(),
+            "fold_f1":     f1[:, j].tolist(),
+            "n_iter":      iters[:, j].sum(axis=0).tolist(),
+        }
+    return {
+        "Cs":         Cs,
+        "cv":         cv,
+        "default_C":  default_C,
+        "features_s": t1 - t0,
+        "path_s":     t2 - t1,
+        "labels":     out,
+    }
+
+
+def fit_binary(estimator, X, y):
+    """One label's estimator, as OneVsRestClassifier.fit stores it (constant predictor if y has one class)."""
+    return OneVsRestClassifier(estimator).fit(X, y).estimators_[0]
+
+
+def assemble_ovr(estimator, Y, fitted_estimators: Sequence[Any], n_jobs: Optional[int] = None) -> OneVsRestClassifier:
+    """
+    OneVsRestClassifier(estimator) from per-label estimators fitted elsewhere
+    (fit_binary, partial_fit, ...), with the fitted attributes
+    OneVsRestClassifier.fit sets: predict / predict_proba, app.py and the flat
+    export use it as is. Only the type and number of columns of Y are used.
+    The per-label trainers (per_label_ovr, rebalance.resampled_ovr,
+    train_incremental_multilabel) all go through here; check_assembly() in
+    train_incremental_multilabel compares the result with a regular fit.
+    """
+    ovr = OneVsRestClassifier(clone(estimator), n_jobs=n_jobs)
+    ovr.label_binarizer_ = LabelBinarizer(sparse_output=True).fit(np.asarray(Y))
+    ovr.classes_ = ovr.label_binarizer_.classes_
+    ovr.estimators_ = list(fitted_estimators)
+    if len(ovr.estimators_) != len(ovr.classes_):
+        raise ValueError(f"{len(ovr.estimators_)} estimators for {len(ovr.classes_)} labels")
+    if hasattr(ovr.estimators_[0], "n_features_in_"):
+        ovr.n_features_in_ = ovr.estimators_[0].n_features_in_
+    if hasattr(ovr.estimators_[0], "feature_names_in_"):
+        ovr.feature_names_in_ = ovr.estimators_[0].feature_names_in_
+    return ovr
+
+
+def assemble_idf(df: np.ndarray, n_docs: int) -> TfidfTransformer:
+    """
+    TfidfTransformer() as fit() leaves it for `n_docs` documents with document
+    frequencies `df` (smooth_idf=True), when the matrix is never held at once.
+    """
+    idf = TfidfTransformer()
+    idf.idf_ = np.log((n_docs + 1) / (np.asarray(df) + 1.0)) + 1.0
+    idf.n_features_in_ = len(df)
+    return idf
+
+
+def per_label_ovr(estimator, X, Y, Cs: Sequence[float], n_jobs: Optional[int] = -1) -> OneVsRestClassifier:
+    """OneVsRestClassifier whose j-th estimator is fitted with C=Cs[j]."""
+    Y = np.asarray(Y)
+    estimators = Parallel(n_jobs=n_jobs)(
+        delayed(fit_binary)(clone(estimator).set_params(C=float(C)), X, Y[:, j])
+        for j, C in enumerate(Cs)
+    )
+    return assemble_ovr(estimator, Y, estimators, n_jobs=n_jobs)
@@ -0,0 +1,303 @@
+"""
+Pipeline continu scraping → scoring → fichiers, sans CSV intermédiaire.
+
+Les collecteurs (API Hacker News en mode suivi, ou rejeu de CSV) alimentent
+une file bornée ; un scorer par lots utilise le même modèle et le même
+chemin de scoring que l'API (cache, dédup, pool de workers) ; les résultats
+partent dans des fichiers NDJSON (ou Parquet si pyarrow est installé)
+tournants. Une file pleine bloque l'étage amont (backpressure). Débit et
+profondeur de file par étage : log périodique, fichier JSON et endpoint HTTP
+optionnel (--metrics-port).
+
+Usage (depuis la racine du repo) :
+    python -m code.pipeline --hn-api --follow
+    python -m code.pipeline --csv data/raw_scraped/hn_comments_raw.csv
+    python -m code.pipeline --hn-api http://127.0.0.1:8765/v0 --follow --metrics-port 9100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import html
+import json
+import os
+import re
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from code import app as api
+from code.scraping.hn_api_collect import BASE as HN_API_BASE, FetchFailed, TIMEOUT_S, TokenBucket, get_json
+from code.serving.jobs import TEXT_COLUMNS
+from code.serving.pipeline import Comment, RotatingWriter, StreamPipeline, available_formats
+
+OUT_DIR = Path("data/stream")
+TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+
+
+def html_to_text(s: str) -> str:
+    """Texte HN (HTML : <p>, <a>, entités) → texte brut."""
+    return html.unescape(TAG.sub(" ", s))
+
+
+# =========================
+# Sources
+# =========================
+class HNApiSource:
+    """
+    Items de l'API Firebase HN par ordre croissant d'id, à partir de
+    maxitem - backfill. En mode `follow`, interroge maxitem toutes les
+    `poll_s` secondes et continue avec les nouveaux items.
+    """
+
+    def __init__(self, base_url: str, backfill: int, follow: bool, poll_s: float,
+                 rate: float, concurrency: int) -> None:
+        self.name = f"hn-api:{base_url}"
+        self.base_url = base_url.rstrip("/")
+        self.backfill = max(backfill, 0)
+        self.follow = follow
+        self.poll_s = poll_s
+        self.rate = rate
+        self.concurrency = max(concurrency, 1)
+        self.next_id: Optional[int] = None
+        self.fetched = 0
+        self.failed = 0
+        self.emitted = 0
+
+    async def _item(self, client: httpx.AsyncClient, bucket: TokenBucket, item_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            item = await get_json(client, bucket, f"{self.base_url}/item/{item_id}.json")
+        except FetchFailed:
+            self.failed += 1
+            return None
+        self.fetched += 1
+        return item
+
+    async def __aiter__(self) -> AsyncIterator[Comment]:
+        bucket = TokenBucket(self.rate, burst=self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=TIMEOUT_S, limits=limits) as client:
+            while True:
+                try:
+                    max_id = int(await get_json(client, bucket, f"{self.base_url}/maxitem.json"))
+                except FetchFailed as e:
+                    print(f" {self.name}: maxitem indisponible ({e}), nouvel essai dans {self.poll_s}s")
+                    await asyncio.sleep(self.poll_s)
+                    continue
+                if self.next_id is None:
+                    self.next_id = max_id - self.backfill + 1
+                # `concurrency` requêtes en vol ; un item lent (retry) ne bloque pas les autres
+                in_flight: Set[asyncio.Task] = set()
+                try:
+                    while self.next_id <= max_id or in_flight:
+                        while self.next_id <= max_id and len(in_flight) < self.concurrency:
+                            in_flight.add(asyncio.create_task(self._item(client, bucket, self.next_id)))
+                            self.next_id += 1
+                        done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            item = task.result()
+                            if item and item.get("type") == "comment" and item.get("text") and not item.get("deleted"):
+                                self.emitted += 1
+                                yield {
+                                    "source": "hn_api",
+                                    "id":     item.get("id"),
+                                    "by":     item.get("by"),
+                                    "time":   item.get("time"),
+                                    "parent": item.get("parent"),
+                                    "text":   html_to_text(item["text"]),
+                                }
+                finally:
+                    for task in in_flight:
+                        task.cancel()
+                if not self.follow:
+                    return
+                await asyncio.sleep(self.poll_s)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "next_id": self.next_id, "fetched": self.fetched,
+                "failed": self.failed, "emitted": self.emitted}
+
+
+class CSVSource:
+    """Rejeu d'un CSV de commentaires (colonne comment_text ou text), optionnellement à `rate` lignes/s."""
+
+    def __init__(self, path: Path, rate: float = 0.0) -> None:
+        self.name = f"csv:{path}"
+        self.path = Path(path)
+        self.rate = rate
+        self.emitted = 0
+
+    async def __aiter__(self) -> AsyncIterator[Comment]:
+        bucket = TokenBucket(self.rate, burst=1) if self.rate > 0 else None
+        with self.path.open(newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            text_col = next((c for c in TEXT_COLUMNS if c in (reader.fieldnames or [])), None)
+            if text_col is None:
+                raise ValueError(f"{self.path}: colonne 'comment_text' ou 'text' attendue")
+            for i, row in enumerate(reader):
+                if bucket is not None:
+                    await bucket.acquire()
+                elif i % 256 == 0:
+                    await asyncio.sleep(0)  # laisse tourner les autres étages
+                text = row.pop(text_col) or ""
+                self.emitted += 1
+                yield {**row, "source": self.path.name, "text": html_to_text(text)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "emitted": self.emitted}
+
+
+# =========================
+# Exposition des métriques
+# =========================
+def write_stats(path: Path, stats: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(stats, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def serve_metrics(port: int, stats_fn: Callable[[], Dict[str, Any]]) -> ThreadingHTTPServer:
+    """GET /metrics → stats JSON du pipeline (thread daemon)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            data = json.dumps(stats_fn()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=srv.serve_forever, name="pipeline-metrics", daemon=True).start()
+    return srv
+
+
+def summary(stats: Dict[str, Any]) -> str:
+    st, q = stats["stages"], stats["queues"]
+    return (
+        f"collect {st['collect']['items_out']} ({st['collect']['recent_items_per_s']}/s, "
+        f"{st['collect']['dropped']} rejetés) | "
+        f"score {st['score']['items_out']} ({st['score']['recent_items_per_s']}/s, "
+        f"{st['score']['toxic']} toxiques) | "
+        f"write {st['write']['items_out']} ({st['write']['files_closed']} fichiers) | "
+        f"file {q['comments']['depth']}/{q['comments']['max_size']} "
+        f"scored {q['scored']['depth']}/{q['scored']['max_size']} | "
+        f"lag moyen {stats['lag_ms']['mean']} ms"
+    )
+
+
+# =========================
+# Main
+# =========================
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Pipeline continu scraping → scoring → NDJSON/Parquet")
+    src = p.add_argument_group("sources")
+    src.add_argument("--hn-api", nargs="?", const=HN_API_BASE, default=None, metavar="BASE_URL",
+                     help="items de l'API HN (défaut : API officielle)")
+    src.add_argument("--hn-backfill", type=int, default=500, help="ids sous maxitem repris au démarrage")
+    src.add_argument("--follow", action="store_true", help="suit les nouveaux items (sinon s'arrête au rattrapage)")
+    src.add_argument("--poll-s", type=float, default=10.0)
+    src.add_argument("--hn-rate", type=float, default=50.0, help="requêtes / seconde")
+    src.add_argument("--hn-concurrency", type=int, default=16)
+    src.add_argument("--csv", type=Path, action="append", default=[], help="CSV à rejouer (répétable)")
+    src.add_argument("--csv-rate", type=float, default=0.0, help="lignes / seconde par CSV (0 = max)")
+
+    sc = p.add_argument_group("scoring")
+    sc.add_argument("--threshold", type=float, default=api.DEFAULT_THRESHOLD)
+    sc.add_argument("--batch-size", type=int, default=256)
+    sc.add_argument("--max-wait-ms", type=float, default=500.0, help="attente max pour remplir un lot")
+    sc.add_argument("--queue-size", type=int, default=4096, help="commentaires en attente de scoring")
+
+    out = p.add_argument_group("sortie")
+    out.add_argument("--out-dir", type=Path, default=OUT_DIR)
+    out.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    out.add_argument("--rotate-rows", type=int, default=100_000)
+    out.add_argument("--rotate-s", type=float, default=300.0)
+    out.add_argument("--stats-every", type=float, default=10.0, help="log + fichier de stats (s)")
+    out.add_argument("--metrics-port", type=int, default=0, help="GET /metrics (0 = désactivé)")
+    out.add_argument("--duration-s", type=float, default=0.0, help="arrêt après N secondes (0 = jamais)")
+    args = p.parse_args(argv)
+    if args.hn_api is None and not args.csv:
+        p.error("au moins une source : --hn-api et/ou --csv")
+    if args.format not in available_formats():
+        p.error("sortie Parquet indisponible : installer pyarrow (ou --format ndjson)")
+    return args
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    api.load_model()
+    if api.model is None:
+        raise SystemExit(f" Modèle introuvable : {api.MODEL_PATH}")
+
+    sources: List[Any] = [CSVSource(path, args.csv_rate) for path in args.csv]
+    if args.hn_api:
+        sources.append(HNApiSource(args.hn_api, args.hn_backfill, args.follow, args.poll_s,
+                                   args.hn_rate, args.hn_concurrency))
+    writer = RotatingWriter(args.out_dir, args.format, args.rotate_rows, args.rotate_s, labels=api.LABELS)
+    pipeline = StreamPipeline(
+        sources, api._get_probas, api._accept, api.LABELS, writer,
+        threshold=args.threshold, batch_size=args.batch_size, max_wait_ms=args.max_wait_ms,
+        queue_size=args.queue_size, model_version=api.model_id,
+    )
+
+    def stats() -> Dict[str, Any]:
+        return {**pipeline.stats(), "sources": [s.stats() for s in sources], "cache": api.cache.stats()}
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows
+            pass
+    if args.duration_s > 0:
+        loop.call_later(args.duration_s, stop.set)
+
+    stats_path = args.out_dir / "pipeline_stats.json"
+    metrics_srv = serve_metrics(args.metrics_port, stats) if args.metrics_port else None
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(args.stats_every)
+            s = stats()
+            write_stats(stats_path, s)
+            print(summary(s), flush=True)
+
+    reporter = asyncio.create_task(report())
+    try:
+        await pipeline.run(stop)
+    finally:
+        reporter.cancel()
+        if metrics_srv is not None:
+            metrics_srv.shutdown()
+        api.pool.shutdown()
+    final = stats()
+    write_stats(stats_path, final)
+    return final
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    final = asyncio.run(run(args))
+    print(summary(final))
+    print(f" Pipeline terminé en {time.perf_counter() - t0:.1f}s : "
+          f"{final['stages']['write']['rows']} lignes -> {args.out_dir} "
+          f"(stats : {args.out_dir / 'pipeline_stats.json'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,290 @@
-from pathlib import Path
+"""
+Collecte de commentaires via l'API officielle Hacker News (Firebase).
+
+Parcourt les ids de max_id vers le bas avec un pool de requêtes concurrentes
+(un seul client httpx, connexions réutilisées), limité par un token bucket,
+avec retry + backoff exponentiel sur timeouts / 429 / 5xx. Les commentaires
+sont ajoutés au CSV au fil de l'eau, et un checkpoint JSON (dernier id
+entièrement parcouru + ids en échec) permet de reprendre un run interrompu.
+
+Usage (depuis la racine du repo) :
+    python code/scraping/hn_api_collect.py
+    python code/scraping/hn_api_collect.py --base-url http://127.0.0.1:8765/v0   # mock local
+    python code/scraping/hn_api_collect.py --fresh                               # nouveau scan
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
 import time
-import requests
-import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import httpx
 from tqdm import tqdm
 
+
+# =========================
+# Config
+# =========================
 OUT_DIR = Path("data/raw_scraped")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 BASE = "https://hacker-news.firebaseio.com/v0"
 MAX_COMMENTS = 1500
-SLEEP = 0.2
+WINDOW = 20000        # nombre d'ids parcourus sous maxitem
+CONCURRENCY = 32      # requêtes en vol
+RATE = 50.0           # requêtes / seconde (token bucket)
+RETRIES = 4           # tentatives supplémentaires par id
+BACKOFF_S = 0.5       # délai de base du backoff exponentiel
+TIMEOUT_S = 30
+CHECKPOINT_EVERY = 200  # ids terminés entre deux écritures du checkpoint
+
+COLUMNS = ["id", "by", "time", "parent", "text"]
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# =========================
+# Rate limit / retry
+# =========================
+class TokenBucket:
+    """`rate` jetons par seconde, au plus `burst` d'avance."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchFailed(Exception):
+    pass
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    try:
+        return float(r.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_json(client: httpx.AsyncClient, bucket: TokenBucket, url: str,
+                   retries: int = RETRIES, backoff_s: float = BACKOFF_S) -> Any:
+    """GET JSON avec retry (timeouts, erreurs réseau, 429, 5xx) ; FetchFailed sinon."""
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        wait = None
+        try:
+            r = await client.get(url)
+            if r.status_code == 200:
+                return r.json()
+            if r.status_code not in RETRY_STATUS:
+                raise FetchFailed(f"HTTP {r.status_code}")
+            error = f"HTTP {r.status_code}"
+            wait = _retry_after(r)
+        except httpx.TransportError as e:
+            error = type(e).__name__
+        except ValueError:
+            error = "JSON invalide"
+        if attempt == retries:
+            raise FetchFailed(error)
+        if wait is None:
+            wait = backoff_s * 2 ** attempt
+        await asyncio.sleep(wait + random.uniform(0, backoff_s))
+
 
-def get_json(url: str):
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    return r.json()
+# =========================
+# Checkpoint / sortie
+# =========================
+def load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
 
-max_id = get_json(f"{BASE}/maxitem.json")
-rows = []
 
-for item_id in tqdm(range(max_id, max_id - 20000, -1)):  # scan window
-    if len(rows) >= MAX_COMMENTS:
-        break
+def save_checkpoint(path: Path, state: Dict[str, Any]) -> None:
+    """Écriture atomique (fichier temporaire + rename)."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def existing_ids(path: Path) -> Set[int]:
+    """Ids déjà présents dans le CSV (écrits après le dernier checkpoint)."""
+    if not path.exists():
+        return set()
+    with path.open(newline="", encoding="utf-8") as f:
+        return {int(row["id"]) for row in csv.DictReader(f) if (row.get("id") or "").isdigit()}
+
+
+# =========================
+# Crawl
+# =========================
+class Collector:
+    """
+    Les ids sont distribués par ordre décroissant aux workers ; `next_id`
+    est la frontière : tous les ids au-dessus sont terminés (collectés,
+    ignorés ou en échec). C'est elle qui est sauvegardée, donc une reprise
+    ne saute jamais un id encore en vol au moment de l'interruption.
+    """
+
+    def __init__(self, args: argparse.Namespace, state: Dict[str, Any], skip: Set[int]) -> None:
+        self.args = args
+        self.state = state
+        self.skip = skip
+        self.done: Set[int] = set()
+        self.failed: Dict[int, str] = {}
+        self.collected = state["collected"]
+        self.fetched = 0
+        self.since_checkpoint = 0
+        self.stop = self.collected >= args.max_comments
+
+    def ids(self) -> Iterator[int]:
+        yield from self.state["failed"]
+        low = self.state["max_id"] - self.args.window
+        for item_id in range(self.state["next_id"], low, -1):
+            if item_id in self.skip:
+                self._finish(item_id)
+            else:
+                yield item_id
+
+    def _finish(self, item_id: int) -> None:
+        self.done.add(item_id)
+        while self.state["next_id"] in self.done:
+            self.done.remove(self.state["next_id"])
+            self.state["next_id"] -= 1
+
+    def checkpoint(self) -> None:
+        self.state["collected"] = self.collected
+        retry = [i for i in self.state["failed"] if i in self.failed or i not in self.done]
+        self.state["failed"] = sorted(set(retry) | set(self.failed), reverse=True)
+        save_checkpoint(self.args.checkpoint, self.state)
+        self.since_checkpoint = 0
+
+    async def worker(self, queue: Iterator[int], client: httpx.AsyncClient, bucket: TokenBucket,
+                     writer: Any, out: Any, bar: tqdm) -> None:
+        for item_id in queue:
+            if self.stop:
+                return
+            try:
+                item = await get_json(client, bucket, f"{self.args.base_url}/item/{item_id}.json")
+            except FetchFailed as e:
+                self.failed[item_id] = str(e)
+            else:
+                self.fetched += 1
+                self.failed.pop(item_id, None)
+                if item and item.get("type") == "comment" and item.get("text") and not item.get("deleted"):
+                    if self.collected >= self.args.max_comments:
+                        return  # non marqué terminé : sera repris au prochain run
+                    writer.writerow([item.get(c) for c in COLUMNS])
+                    out.flush()
+                    self.collected += 1
+                    if self.collected >= self.args.max_comments:
+                        self.stop = True
+            self._finish(item_id)
+            bar.update(1)
+            self.since_checkpoint += 1
+            if self.since_checkpoint >= CHECKPOINT_EVERY:
+                self.checkpoint()
+
+
+async def collect(args: argparse.Namespace) -> Dict[str, Any]:
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    bucket = TokenBucket(args.rate, burst=args.concurrency)
+
+    async with httpx.AsyncClient(timeout=TIMEOUT_S, limits=limits) as client:
+        state = None if args.fresh else load_checkpoint(args.checkpoint)
+        if state is not None and state.get("base_url") != args.base_url:
+            print(f" Checkpoint ignoré (source {state.get('base_url')}) : nouveau scan")
+            state = None
+        if state is None:
+            max_id = await get_json(client, bucket, f"{args.base_url}/maxitem.json")
+            state = {"base_url": args.base_url, "max_id": int(max_id), "next_id": int(max_id),
+                     "collected": 0, "failed": []}
+            skip: Set[int] = set()
+            mode = "w"
+        else:
+            skip = existing_ids(args.out)
+            state["collected"] = max(state["collected"], len(skip))
+            mode = "a"
+            print(f"Reprise : id {state['next_id']} (max_id={state['max_id']}), "
+                  f"{state['collected']} déjà collectés, {len(state['failed'])} ids à retenter")
+
+        run = Collector(args, state, skip)
+        todo = state["next_id"] - (state["max_id"] - args.window) + len(state["failed"])
+        write_header = mode == "w" or not args.out.exists() or args.out.stat().st_size == 0
+        t0 = time.perf_counter()
+        with args.out.open(mode, newline="", encoding="utf-8") as out, tqdm(total=max(todo, 0)) as bar:
+            writer = csv.writer(out)
+            if write_header:
+                writer.writerow(COLUMNS)
+            queue = run.ids()  # itérateur partagé : chaque id est pris par un seul worker
+            workers = [run.worker(queue, client, bucket, writer, out, bar) for _ in range(args.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                run.checkpoint()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "fetched":   run.fetched,
+        "collected": run.collected,
+        "failed":    run.failed,
+        "next_id":   state["next_id"],
+        "elapsed_s": elapsed,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Collecte de commentaires Hacker News via l'API Firebase")
+    p.add_argument("--base-url", default=BASE)
+    p.add_argument("--max-comments", type=int, default=MAX_COMMENTS)
+    p.add_argument("--window", type=int, default=WINDOW, help="ids parcourus sous maxitem")
+    p.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    p.add_argument("--rate", type=float, default=RATE, help="requêtes par seconde")
+    p.add_argument("--out", type=Path, default=OUT_DIR / "hn_comments_raw.csv")
+    p.add_argument("--checkpoint", type=Path, default=None,
+                   help="défaut : <out>.checkpoint.json")
+    p.add_argument("--fresh", action="store_true", help="ignore le checkpoint et réécrit le CSV")
+    args = p.parse_args(argv)
+    args.base_url = args.base_url.rstrip("/")
+    if args.checkpoint is None:
+        args.checkpoint = args.out.with_suffix(".checkpoint.json")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
     try:
-        item = get_json(f"{BASE}/item/{item_id}.json")
-        if item and item.get("type") == "comment" and item.get("text"):
-            rows.append({
-                "id": item.get("id"),
-                "by": item.get("by"),
-                "time": item.get("time"),
-                "parent": item.get("parent"),
-                "text": item.get("text")
-            })
-        time.sleep(SLEEP)
-    except Exception:
-        continue
-
-df = pd.DataFrame(rows)
-out = OUT_DIR / "hn_comments_raw.csv"
-df.to_csv(out, index=False)
-print(f" Step 3 OK: saved {len(df)} comments -> {out}")
+        res = asyncio.run(collect(args))
+    except KeyboardInterrupt:
+        print(f" Interrompu : checkpoint -> {args.checkpoint} (relancer pour reprendre)")
+        return
+    rate = res["fetched"] / res["elapsed_s"] if res["elapsed_s"] else 0.0
+    print(f" Step 3 OK: {res['collected']} comments -> {args.out} "
+          f"({res['fetched']} items en {res['elapsed_s']:.1f}s, {rate:.0f} items/s)")
+    if res["failed"]:
+        kinds: Dict[str, int] = {}
+        for err in res["failed"].values():
+            kinds[err] = kinds.get(err, 0) + 1
+        print(f" {len(res['failed'])} ids en échec (retentés au prochain run) : {kinds}")
+
+
+if __name__ == "__main__":
+    main()
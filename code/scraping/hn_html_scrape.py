@@ -1,32 +1,51 @@
 from __future__ import annotations
 
-from pathlib import Path
-import time
+import argparse
+import asyncio
+import csv
+import os
 import re
-from typing import List, Dict, Optional
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit
 
-import requests
-import pandas as pd
+import httpx
 from bs4 import BeautifulSoup
 
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:  # parser C optionnel
+    PARSER = "html.parser"
+
 
 # =========================
 # Config
 # =========================
 OUT_DIR = Path("data/raw_scraped")
-OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 BASE = "https://news.ycombinator.com"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) ToxiScanScraper/1.0",
     "Accept-Language": "en-US,en;q=0.9",
 }
-SLEEP = 1.2  # plus lent = moins de blocage
+SLEEP = 1.2  # intervalle minimal entre deux requêtes vers un même host
+PER_HOST = 2  # requêtes simultanées max par host
+CONCURRENCY = 8  # pages de threads en cours
 MAX_THREADS = 5
+MAX_FRONT_PAGES = 5  # pages "More" de la frontpage suivies au plus
+MAX_PAGES_PER_THREAD = 10  # pages "More" d'un même thread suivies au plus
 MAX_COMMENTS_TOTAL = 500
+RETRIES = 3
+BACKOFF_S = 2.0  # délai de base du backoff exponentiel
 
 DEBUG_SAVE_HTML = True  # sauvegarde des pages HTML si extraction échoue
 
+COLUMNS = ["thread_id", "thread_url", "thread_title", "comment_text"]
+
 
 # =========================
 # Helpers
@@ -39,29 +58,20 @@ def clean_text(s: str) -> str:
     return s
 
 
-def fetch_html(url: str) -> str:
-    """Télécharge une page HTML."""
-    r = requests.get(url, headers=HEADERS, timeout=30)
-    print(f"FETCH: {url} -> {r.status_code} final: {r.url}")
-    r.raise_for_status()
-    return r.text
-
-
-def get_soup(url: str) -> BeautifulSoup:
-    """Parse HTML -> BeautifulSoup."""
-    html = fetch_html(url)
-    return BeautifulSoup(html, "html.parser")
+def more_link(soup: BeautifulSoup) -> Optional[str]:
+    """href du lien "More" (pagination HN), relatif à la page."""
+    a = soup.select_one("a.morelink")
+    return a.get("href") if a else None
 
 
 # =========================
 # Step 1: récupérer des IDs de threads qui ont 'comments' / 'discuss'
 # =========================
-def extract_thread_ids_from_frontpage() -> List[int]:
+def extract_thread_ids_from_frontpage(soup: BeautifulSoup) -> List[int]:
     """
     Sur la page d'accueil HN, on prend uniquement les liens "XX comments" ou "discuss"
     (dans la subline), pour pointer vers des pages item?id=... qui contiennent des commentaires.
     """
-    soup = get_soup(f"{BASE}/")
     ids: List[int] = []
 
     for a in soup.select("span.subline a"):
@@ -117,71 +127,229 @@ def extract_comments_from_item_page(soup: BeautifulSoup) -> List[str]:
     return comments
 
 
-def scrape_comments_from_thread(thread_id: int) -> List[Dict]:
-    url = f"{BASE}/item?id={thread_id}"
-    html = fetch_html(url)
-    soup = BeautifulSoup(html, "html.parser")
+# Fonctions de parsing exécutées dans le pool de workers (picklables, sans état)
+def parse_front_page(html: str) -> Tuple[List[int], Optional[str]]:
+    soup = BeautifulSoup(html, PARSER)
+    return extract_thread_ids_from_frontpage(soup), more_link(soup)
+
 
-    # titre page (debug/trace)
+def parse_item_page(html: str) -> Tuple[str, List[str], Optional[str]]:
+    soup = BeautifulSoup(html, PARSER)
     title_tag = soup.select_one("title")
     page_title = title_tag.get_text(strip=True) if title_tag else ""
-
-    comments = extract_comments_from_item_page(soup)
-
-    # DEBUG: si 0 commentaires, sauvegarder HTML pour inspection
-    if DEBUG_SAVE_HTML and len(comments) == 0:
-        dbg_path = OUT_DIR / f"debug_item_{thread_id}.html"
-        dbg_path.write_text(html, encoding="utf-8")
-        print(f" DEBUG: 0 comments extracted. Saved HTML -> {dbg_path}")
-        # petit indicateur utile
-        print(f"DEBUG: contains 'commtext'? {'commtext' in html}")
-
-    rows: List[Dict] = []
-    for c in comments:
-        rows.append(
-            {
-                "thread_id": thread_id,
-                "thread_url": url,
-                "thread_title": page_title,
-                "comment_text": c,
-            }
-        )
-    return rows
+    return page_title, extract_comments_from_item_page(soup), more_link(soup)
 
 
 # =========================
-# Main
+# Scheduler
 # =========================
-def main() -> None:
-    thread_ids = extract_thread_ids_from_frontpage()
-    if not thread_ids:
-        print(" Aucun thread_id trouvé sur la frontpage. Réseau/HTML a changé ?")
-        return
+class HostPoliteness:
+    """
+    Budget de politesse par host : au plus `per_host` requêtes en vol et
+    `interval_s` secondes minimum entre deux débuts de requête. Un 429/5xx
+    (Retry-After s'il est fourni) repousse la prochaine requête vers ce host.
+    """
 
-    thread_ids = thread_ids[:MAX_THREADS]
-    all_rows: List[Dict] = []
+    def __init__(self, interval_s: float, per_host: int) -> None:
+        self.interval_s = interval_s
+        self.per_host = max(per_host, 1)
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        sem = self._slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with sem:
+            async with self._locks.setdefault(host, asyncio.Lock()):
+                wait = self._next.get(host, 0.0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next[host] = time.monotonic() + self.interval_s
+            yield
+
+    def back_off(self, host: str, delay_s: float) -> None:
+        self._next[host] = max(self._next.get(host, 0.0), time.monotonic() + delay_s)
+
+
+class ThreadScraper:
+    """
+    Découverte des threads (frontpage + pages "More") et scraping des pages
+    de commentaires (pagination "More" comprise) en parallèle, sous le budget
+    de politesse. Le parsing tourne dans un pool de workers ; les lignes sont
+    écrites dans le CSV page par page.
+    """
 
-    for tid in thread_ids:
+    def __init__(self, args: argparse.Namespace, client: httpx.AsyncClient,
+                 pool: Optional[Executor], writer, out) -> None:
+        self.args = args
+        self.client = client
+        self.pool = pool
+        self.writer = writer
+        self.out = out
+        self.polite = HostPoliteness(args.interval, args.per_host)
+        self.queue: "asyncio.Queue[Optional[Tuple[int, str, int, str]]]" = asyncio.Queue()
+        self.seen: Set[int] = set()
+        self.titles: Dict[int, str] = {}
+        self.total = 0
+        self.pages = 0
+        self.errors = 0
+        self.done_event = asyncio.Event()
+
+    async def fetch_html(self, url: str) -> str:
+        """Télécharge une page HTML (retry sur 429/5xx/erreurs réseau)."""
+        host = urlsplit(url).netloc
+        for attempt in range(RETRIES + 1):
+            async with self.polite.slot(host):
+                try:
+                    r = await self.client.get(url)
+                except httpx.TransportError:
+                    if attempt == RETRIES:
+                        raise
+                    self.polite.back_off(host, BACKOFF_S * 2 ** attempt)
+                    continue
+            print(f"FETCH: {url} -> {r.status_code} final: {r.url}")
+            if (r.status_code == 429 or r.status_code >= 500) and attempt < RETRIES:
+                try:
+                    delay = float(r.headers["retry-after"])
+                except (KeyError, ValueError):
+                    delay = BACKOFF_S * 2 ** attempt
+                self.polite.back_off(host, delay)
+                continue
+            r.raise_for_status()
+            return r.text
+        raise RuntimeError("unreachable")
+
+    async def parse(self, fn, html: str):
+        if self.pool is None:
+            return fn(html)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, html)
+
+    async def discover(self) -> None:
+        """Parcourt la frontpage et ses pages "More" ; chaque thread est mis en file dès qu'il est vu."""
+        url: Optional[str] = f"{self.args.base_url}/"
+        for _ in range(self.args.max_front_pages):
+            if url is None or len(self.seen) >= self.args.max_threads or self.done_event.is_set():
+                break
+            try:
+                ids, more = await self.parse(parse_front_page, await self.fetch_html(url))
+            except Exception as e:
+                print(f" Frontpage {url} failed: {e}")
+                self.errors += 1
+                break
+            for tid in ids:
+                if tid not in self.seen and len(self.seen) < self.args.max_threads:
+                    self.seen.add(tid)
+                    item_url = f"{self.args.base_url}/item?id={tid}"
+                    self.queue.put_nowait((tid, item_url, 1, item_url))
+            url = urljoin(url, more) if more else None
+
+        if not self.seen:
+            print(" Aucun thread_id trouvé sur la frontpage. Réseau/HTML a changé ?")
+
+    async def worker(self) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if job is None:
+                    return
+                if not self.done_event.is_set():
+                    await self.scrape_page(*job)
+            finally:
+                self.queue.task_done()
+
+    async def scrape_page(self, thread_id: int, thread_url: str, page: int, url: str) -> None:
         try:
-            rows = scrape_comments_from_thread(tid)
+            html = await self.fetch_html(url)
+            title, comments, more = await self.parse(parse_item_page, html)
         except Exception as e:
-            print(f" Thread {tid} failed: {e}")
-            rows = []
-
-        all_rows.extend(rows)
-        print(f"[thread {tid}] comments scraped: {len(rows)} (total={len(all_rows)})")
-
-        if len(all_rows) >= MAX_COMMENTS_TOTAL:
-            break
-
-        time.sleep(SLEEP)
+            print(f" Thread {thread_id} (page {page}) failed: {e}")
+            self.errors += 1
+            return
+        self.pages += 1
+
+        # la suite du thread part en file avant l'écriture
+        if more and page < self.args.max_pages_per_thread:
+            self.queue.put_nowait((thread_id, thread_url, page + 1, urljoin(url, more)))
+
+        # DEBUG: si 0 commentaires, sauvegarder HTML pour inspection
+        if DEBUG_SAVE_HTML and len(comments) == 0 and page == 1:
+            dbg_path = self.args.out.parent / f"debug_item_{thread_id}.html"
+            dbg_path.write_text(html, encoding="utf-8")
+            print(f" DEBUG: 0 comments extracted. Saved HTML -> {dbg_path}")
+            # petit indicateur utile
+            print(f"DEBUG: contains 'commtext'? {'commtext' in html}")
+
+        title = self.titles.setdefault(thread_id, title)
+        comments = comments[: max(self.args.max_comments - self.total, 0)]
+        for c in comments:
+            self.writer.writerow([thread_id, thread_url, title, c])
+        self.out.flush()
+        self.total += len(comments)
+        print(f"[thread {thread_id} p{page}] comments scraped: {len(comments)} (total={self.total})")
+        if self.total >= self.args.max_comments:
+            self.done_event.set()
+
+    async def run(self) -> None:
+        workers = [asyncio.create_task(self.worker()) for _ in range(self.args.concurrency)]
+        try:
+            await self.discover()
+            await self.queue.join()  # pages "More" comprises
+        finally:
+            for _ in workers:
+                self.queue.put_nowait(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def scrape(args: argparse.Namespace) -> ThreadScraper:
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    timeout = httpx.Timeout(30)
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 0 else None
+    try:
+        async with httpx.AsyncClient(headers=HEADERS, timeout=timeout, limits=limits,
+                                     follow_redirects=True) as client:
+            with args.out.open("w", newline="", encoding="utf-8") as out:
+                writer = csv.writer(out)
+                writer.writerow(COLUMNS)
+                scraper = ThreadScraper(args, client, pool, writer, out)
+                await scraper.run()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return scraper
 
-    df = pd.DataFrame(all_rows).head(MAX_COMMENTS_TOTAL)
-    out_path = OUT_DIR / "hn_comments_html.csv"
-    df.to_csv(out_path, index=False)
-    print(f" Saved {len(df)} comments -> {out_path}")
 
-    if len(df) == 0:
+# =========================
+# Main
+# =========================
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Scraping HTML des threads Hacker News")
+    p.add_argument("--base-url", default=BASE, help="ex. http://127.0.0.1:8765 pour les fixtures locales")
+    p.add_argument("--max-threads", type=int, default=MAX_THREADS)
+    p.add_argument("--max-front-pages", type=int, default=MAX_FRONT_PAGES)
+    p.add_argument("--max-pages-per-thread", type=int, default=MAX_PAGES_PER_THREAD)
+    p.add_argument("--max-comments", type=int, default=MAX_COMMENTS_TOTAL)
+    p.add_argument("--concurrency", type=int, default=CONCURRENCY, help="pages de threads en cours")
+    p.add_argument("--per-host", type=int, default=PER_HOST, help="requêtes simultanées par host")
+    p.add_argument("--interval", type=float, default=SLEEP, help="secondes entre deux requêtes d'un host")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                   help="processus de parsing (0 = parsing dans la boucle)")
+    p.add_argument("--out", type=Path, default=OUT_DIR / "hn_comments_html.csv")
+    args = p.parse_args(argv)
+    args.base_url = args.base_url.rstrip("/")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    scraper = asyncio.run(scrape(args))
+    elapsed = time.perf_counter() - t0
+    print(f" Saved {scraper.total} comments -> {args.out} "
+          f"({len(scraper.seen)} threads, {scraper.pages} pages, {scraper.errors} erreurs, {elapsed:.1f}s)")
+
+    if scraper.total == 0:
         print(" Résultat vide. Ouvre un fichier debug_item_XXXX.html dans data/raw_scraped/ pour voir le HTML reçu.")
 
 
@@ -0,0 +1,253 @@
+"""
+Mock local de Hacker News, pour tester les scripts de scraping sans réseau.
+
+- API Firebase (hn_api_collect.py) : /v0/maxitem.json et /v0/item/<id>.json.
+  Les items sont déterministes (fonction de l'id) : commentaires tirés de
+  data/sample/hn_scraped_sample.csv, stories, items supprimés et ids vides (null).
+- Pages HTML (hn_html_scrape.py) : /, /news?p=N et /item?id=X&p=N servies
+  depuis un dossier de fixtures HTML sauvegardées (news_p<N>.html,
+  item_<id>_p<N>.html) : pages réelles enregistrées sous ces noms, ou
+  fixtures générées au format HN avec --make-fixtures.
+
+Latence, erreurs 5xx et 429 peuvent être injectées.
+
+Usage (depuis la racine du repo) :
+    python code/scraping/hn_mock_server.py --port 8765 --latency 0.05 --error-rate 0.05
+    python code/scraping/hn_api_collect.py --base-url http://127.0.0.1:8765/v0
+
+    python code/scraping/hn_mock_server.py --port 8765 --html-dir /tmp/hn_html --make-fixtures 300
+    python code/scraping/hn_html_scrape.py --base-url http://127.0.0.1:8765 --interval 0 \
+        --max-threads 300 --max-front-pages 20 --max-comments 100000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import re
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+SAMPLE = Path(__file__).resolve().parents[2] / "data" / "sample" / "hn_scraped_sample.csv"
+MAX_ITEM = 40_000_000
+ITEM_PATH = re.compile(r"^/v0/item/(\d+)\.json$")
+FRONT_PAGE_SIZE = 30     # threads par page de frontpage
+COMMENTS_PER_PAGE = 100  # commentaires par page de thread avant "More"
+FIRST_THREAD_ID = 39_000_000
+
+
+def load_texts(path: Path = SAMPLE) -> List[str]:
+    with path.open(newline="", encoding="utf-8") as f:
+        return [row["text"] for row in csv.DictReader(f) if row.get("text")]
+
+
+def make_item(item_id: int, texts: List[str]) -> Optional[Dict[str, Any]]:
+    """Item synthétique : ~70 % de commentaires, le reste stories / supprimés / null."""
+    kind = item_id % 10
+    if kind == 0:
+        return None
+    base = {"id": item_id, "time": 1_700_000_000 + item_id % 10_000_000}
+    if kind == 1:
+        return {**base, "type": "story", "by": f"user{item_id % 97}", "title": f"Story {item_id}"}
+    if kind == 2:
+        return {**base, "type": "comment", "deleted": True, "parent": item_id - 2}
+    return {
+        **base,
+        "type":   "comment",
+        "by":     f"user{item_id % 97}",
+        "parent": item_id - kind,
+        "text":   texts[item_id % len(texts)],
+    }
+
+
+# =========================
+# Fixtures HTML
+# =========================
+def _page(title: str, body: str) -> str:
+    return (
+        f"<html lang=\"en\"><head><title>{escape(title)}</title>"
+        "<link rel=\"stylesheet\" href=\"news.css\"><script src=\"hn.js\"></script></head>"
+        f"<body><center><table id=\"hnmain\">{body}</table></center></body></html>"
+    )
+
+
+def _more(href: str) -> str:
+    return f'<tr><td class="title"><a href="{escape(href)}" class="morelink" rel="next">More</a></td></tr>'
+
+
+def thread_comment_count(i: int) -> int:
+    """Nombre de commentaires du i-ème thread (0 = lien "discuss")."""
+    return 0 if i % 25 == 24 else 3 + (i * 53) % 240
+
+
+def write_html_fixtures(out_dir: Path, n_threads: int, texts: Optional[List[str]] = None,
+                        front_size: int = FRONT_PAGE_SIZE, per_page: int = COMMENTS_PER_PAGE) -> int:
+    """
+    Écrit une frontpage paginée et `n_threads` threads au format HTML de HN
+    (tr.athing.comtr / span.commtext, liens "More"). Retourne le nombre
+    total de commentaires.
+    """
+    texts = texts or load_texts()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    n_front = max((n_threads + front_size - 1) // front_size, 1)
+    total = 0
+    for p in range(1, n_front + 1):
+        rows = []
+        for i in range((p - 1) * front_size, min(p * front_size, n_threads)):
+            tid, n = FIRST_THREAD_ID + i, thread_comment_count(i)
+            link = f"{n}&nbsp;comments" if n else "discuss"
+            rows.append(
+                f'<tr class="athing submission" id="{tid}"><td class="title"><span class="titleline">'
+                f'<a href="https://example.com/{tid}">Story {tid}</a></span></td></tr>'
+                f'<tr><td class="subtext"><span class="subline"><span class="score">{n + 7} points</span>'
+                f' by <a href="user?id=user{i}" class="hnuser">user{i}</a> | '
+                f'<a href="hide?id={tid}">hide</a> | <a href="item?id={tid}">{link}</a></span></td></tr>'
+            )
+        more = _more(f"?p={p + 1}") if p < n_front else ""
+        (out_dir / f"news_p{p}.html").write_text(_page("Hacker News", "".join(rows) + more), encoding="utf-8")
+
+    for i in range(n_threads):
+        tid, n = FIRST_THREAD_ID + i, thread_comment_count(i)
+        n_pages = max((n + per_page - 1) // per_page, 1)
+        for p in range(1, n_pages + 1):
+            rows = []
+            for j in range((p - 1) * per_page, min(p * per_page, n)):
+                cid = tid * 1000 + j
+                rows.append(
+                    f'<tr class="athing comtr" id="{cid}"><td><table><tr><td class="ind" indent="{j % 3}"></td>'
+                    f'<td class="default"><div class="comhead"><a href="user?id=u{cid % 97}" class="hnuser">'
+                    f'u{cid % 97}</a></div><div class="comment"><span class="commtext c00">'
+                    f'{texts[(i * 31 + j) % len(texts)]}</span><div class="reply"><p><font size="1">'
+                    f'<u><a href="reply?id={cid}">reply</a></u></font></p></div></div></td></tr></table></td></tr>'
+                )
+            more = _more(f"item?id={tid}&p={p + 1}") if p < n_pages else ""
+            body = f'<tr><td><table class="comment-tree">{"".join(rows)}</table></td></tr>{more}'
+            (out_dir / f"item_{tid}_p{p}.html").write_text(
+                _page(f"Story {tid} | Hacker News", body), encoding="utf-8")
+        total += n
+    return total
+
+
+class MockHNServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, max_item: int = MAX_ITEM, latency: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0,
+                 html_dir: Optional[Path] = None) -> None:
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.max_item = max_item
+        self.html_dir = html_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.texts = load_texts()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v0"
+
+    def draw(self) -> float:
+        with self.lock:
+            self.requests += 1
+            return self.rng.random()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: MockHNServer
+
+    def do_GET(self) -> None:
+        srv = self.server
+        roll = srv.draw()
+        if srv.latency:
+            time.sleep(srv.latency)
+        if roll < srv.throttle_rate:
+            return self._send(429, {"error": "Too Many Requests"}, {"Retry-After": "0.1"})
+        if roll < srv.throttle_rate + srv.error_rate:
+            with srv.lock:
+                srv.errors += 1
+            return self._send(503, {"error": "Service Unavailable"})
+        if not self.path.startswith("/v0/"):
+            return self._send_html()
+        if self.path == "/v0/maxitem.json":
+            return self._send(200, srv.max_item)
+        m = ITEM_PATH.match(self.path)
+        if m is None:
+            return self._send(404, {"error": "Not Found"})
+        item_id = int(m.group(1))
+        self._send(200, make_item(item_id, srv.texts) if item_id <= srv.max_item else None)
+
+    def _send_html(self) -> None:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        page = query.get("p", ["1"])[0]
+        if url.path in ("/", "/news"):
+            name = f"news_p{page}.html"
+        elif url.path == "/item" and "id" in query:
+            name = f"item_{query['id'][0]}_p{page}.html"
+        else:
+            name = ""
+        path = self.server.html_dir / name if self.server.html_dir and name else None
+        if path is None or not path.is_file():
+            return self._send(404, "Unknown.", content_type="text/html; charset=utf-8")
+        self._send(200, path.read_text(encoding="utf-8"), content_type="text/html; charset=utf-8")
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None,
+              content_type: str = "application/json; charset=utf-8") -> None:
+        data = (body if isinstance(body, str) and not content_type.startswith("application/json")
+                else json.dumps(body)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Mock local de l'API Firebase Hacker News")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--max-item", type=int, default=MAX_ITEM)
+    p.add_argument("--latency", type=float, default=0.0, help="secondes par requête")
+    p.add_argument("--error-rate", type=float, default=0.0, help="part de réponses 503")
+    p.add_argument("--throttle-rate", type=float, default=0.0, help="part de réponses 429")
+    p.add_argument("--html-dir", type=Path, default=None, help="dossier des fixtures HTML servies")
+    p.add_argument("--make-fixtures", type=int, default=0, metavar="N_THREADS",
+                   help="génère N threads dans --html-dir avant de servir")
+    args = p.parse_args()
+
+    if args.make_fixtures:
+        if args.html_dir is None:
+            p.error("--make-fixtures demande --html-dir")
+        n = write_html_fixtures(args.html_dir, args.make_fixtures)
+        print(f"{args.make_fixtures} threads ({n} commentaires) -> {args.html_dir}")
+
+    srv = MockHNServer(args.port, args.max_item, args.latency, args.error_rate, args.throttle_rate,
+                       html_dir=args.html_dir)
+    print(f"Mock HN API -> {srv.base_url}")
+    if args.html_dir:
+        print(f"Mock HN HTML -> http://127.0.0.1:{srv.server_address[1]}/ ({args.html_dir})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        print(f"{srv.requests} requêtes servies, {srv.errors} erreurs injectées")
+
+
+if __name__ == "__main__":
+    main()
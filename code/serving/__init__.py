@@ -0,0 +1,2 @@
+# code/serving/
+# Briques d'inférence utilisées par l'API (code/app.py).
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512]
+QUEUE_WAIT_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000]
+
+_Item = Tuple[str, "asyncio.Future[Any]", float]
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text requests and scores them together.
+
+    The first queued text opens a window of `max_wait_ms`; every text that
+    arrives before the window closes (or until `max_batch_size` is reached)
+    is scored in the same `score_fn(texts)` call, which must return one row
+    per text. Each caller gets its own row back.
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[str]], Sequence[Any]],
+        max_wait_ms: float = 3.0,
+        max_batch_size: int = 64,
+    ) -> None:
+        self.score_fn = score_fn
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ── lifecycle ───────────────────────────────────────
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        # (Re)bind to the current loop — e.g. a new TestClient or a reload.
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    # ── public API ──────────────────────────────────────
+    async def submit(self, text: str) -> Any:
+        """Queue one text and wait for its row of scores."""
+        self._ensure_started()
+        fut = self._loop.create_future()
+        self._queue.put_nowait((text, fut, time.perf_counter()))
+        return await fut
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_wait_ms":    self.max_wait * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth":    self._queue.qsize() if self._queue is not None else 0,
+            "batch_size":     self.batch_sizes.snapshot(),
+            "queue_wait_ms":  self.queue_wait_ms.snapshot(),
+        }
+
+    # ── worker ──────────────────────────────────────────
+    async def _collect(self) -> List[_Item]:
+        queue = self._queue
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            batch = [item for item in batch if not item[1].done()]  # caller gone
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                self.queue_wait_ms.observe((started - queued_at) * 1000.0)
+            self.batch_sizes.observe(len(batch))
+
+            texts = [text for text, _, _ in batch]
+            try:
+                rows = await self._loop.run_in_executor(None, self.score_fn, texts)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, fut, _), row in zip(batch, rows):
+                if not fut.done():
+                    fut.set_result(row)
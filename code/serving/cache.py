@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Rough per-entry bookkeeping cost (OrderedDict node, key/value objects, tuple)
+ENTRY_OVERHEAD = 160
+
+
+class PredictionCache:
+    """
+    LRU + TTL cache of probability rows.
+
+    Keys are a hash of the model version and the normalized text, so loading
+    a different model never serves stale scores (`set_version` also drops
+    every entry). Size is bounded both in entries and in approximate bytes;
+    rows are stored as packed float64 bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_s: float, n_labels: int) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.max_bytes = max(int(max_bytes), 0)
+        self.ttl_s = float(ttl_s)
+        self.n_labels = n_labels
+        self.version = ""
+        self._prefix = hashlib.blake2b(b"\0", digest_size=16)
+        self._data: "OrderedDict[bytes, Tuple[bytes, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def _entry_size(self, key: bytes, blob: bytes) -> int:
+        return len(key) + len(blob) + ENTRY_OVERHEAD
+
+    def _key(self, text: str) -> bytes:
+        h = self._prefix.copy()
+        h.update(text.encode("utf-8", "surrogatepass"))
+        return h.digest()
+
+    def set_version(self, version: str) -> None:
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._prefix = hashlib.blake2b(version.encode() + b"\0", digest_size=16)
+                self._data.clear()
+                self._bytes = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def get_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up a batch. Returns the (n, n_labels) matrix filled for hits and
+        the indices of the texts that still need scoring.
+        """
+        out = np.empty((len(texts), self.n_labels), dtype=float)
+        if not self.enabled:
+            return out, list(range(len(texts)))
+        keys = [self._key(t) for t in texts]
+        missing: List[int] = []
+        now = time.monotonic()
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._data.get(key)
+                if entry is not None and now - entry[1] > self.ttl_s:
+                    self._drop(key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    missing.append(i)
+                    continue
+                self._data.move_to_end(key)
+                out[i] = np.frombuffer(entry[0], dtype=float)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return out, missing
+
+    def put_many(self, texts: Sequence[str], rows: np.ndarray) -> None:
+        if not self.enabled or not len(texts):
+            return
+        keys = [self._key(t) for t in texts]
+        blobs = [np.ascontiguousarray(r, dtype=float).tobytes() for r in rows]
+        now = time.monotonic()
+        with self._lock:
+            for key, blob in zip(keys, blobs):
+                if key in self._data:
+                    self._drop(key)
+                self._data[key] = (blob, now)
+                self._bytes += self._entry_size(key, blob)
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                key, _ = next(iter(self._data.items()))
+                self._drop(key)
+                self.evictions += 1
+
+    def _drop(self, key: bytes) -> None:
+        blob, _ = self._data.pop(key)
+        self._bytes -= self._entry_size(key, blob)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled":       self.enabled,
+            "model_version": self.version,
+            "entries":       len(self._data),
+            "bytes":         self._bytes,
+            "max_entries":   self.max_entries,
+            "max_bytes":     self.max_bytes,
+            "ttl_s":         self.ttl_s,
+            "hits":          self.hits,
+            "misses":        self.misses,
+            "hit_rate":      round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions":     self.evictions,
+            "expirations":   self.expirations,
+        }
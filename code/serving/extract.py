@@ -0,0 +1,405 @@
+from __future__ import annotations
+
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+try:
+    from lxml import etree
+except ImportError:  # optional faster backend
+    etree = None
+
+Selector = Tuple[str, Optional[Dict[str, str]]]
+
+# Attributes bs4 splits on whitespace (matched per token or as a whole)
+MULTI_VALUED_ATTRS = {"class", "accesskey", "dropzone"}
+# Strings inside these tags get a special bs4 type that get_text() skips
+STRING_CONTAINERS = {"rt", "rp", "style", "script", "template"}
+# Named references without ";" (bs4's table: the HTML5 one)
+ENTITIES = {name[:-1]: char for name, char in html5.items() if name.endswith(";")}
+
+
+class CData(str):
+    """endData() marker: CDATA section, kept by get_text()."""
+
+
+class Markup(str):
+    """endData() marker: comment, doctype, declaration or processing instruction."""
+
+
+class _Element:
+    __slots__ = ("name", "slots", "noise", "container")
+    is_empty_element = False
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.slots: List[List[int]] = []
+        self.noise = False
+        self.container = False
+
+
+class _VoidElement(_Element):
+    __slots__ = ()
+    is_empty_element = True
+
+
+class SelectorCollector:
+    """
+    One-pass replacement for "decompose noise tags, then find_all() per
+    selector, then get_text(separator=' ', strip=True)".
+
+    Receives the tree-construction calls a BeautifulSoup object would get
+    (handle_starttag / handle_endtag / handle_data / endData) and keeps the
+    same open-element stack, but builds no tree: kept strings go to one
+    flat list and every matching element records the [start, end) range of
+    strings it contains. Elements are matched against all selectors at once.
+    """
+
+    VOID_ELEMENTS = frozenset((
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+        "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+        "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+    ))
+
+    def __init__(self, selectors: Sequence[Selector], noise_tags: Iterable[str]) -> None:
+        self.by_tag: Dict[str, List[Tuple[int, Optional[Dict[str, str]]]]] = {}
+        for k, (tag, attrs) in enumerate(selectors):
+            self.by_tag.setdefault(tag, []).append((k, attrs))
+        self.noise_tags: Set[str] = set(noise_tags)
+        self.matches: List[List[List[int]]] = [[] for _ in selectors]
+        self.strings: List[str] = []
+        self.stack: List[_Element] = []
+        self.open_count: Dict[str, int] = {}
+        self.noise_depth = 0
+        self.container_depth = 0
+        self.current_data: List[str] = []
+        self.contains_replacement_characters = False
+
+    # ── Tree-construction API (called by the parser) ──────
+    def endData(self, containerClass: Optional[type] = None) -> None:
+        if not self.current_data:
+            return
+        data = "".join(self.current_data)
+        self.current_data = []
+        # Only plain strings (and CDATA) count for get_text(); comments,
+        # doctypes, <script>/<style>/<template> strings and decomposed
+        # noise subtrees never do.
+        if self.noise_depth:
+            return
+        if containerClass is None:
+            if self.container_depth:
+                return
+        elif containerClass is not CData:
+            return
+        data = data.strip()
+        if data:
+            self.strings.append(data)
+
+    def handle_data(self, data: str) -> None:
+        self.current_data.append(data)
+
+    def handle_starttag(self, name: str, namespace: Optional[str], nsprefix: Optional[str],
+                        attrs: Dict[str, str], sourceline=None, sourcepos=None,
+                        namespaces=None) -> _Element:
+        self.endData()
+        el = (_VoidElement if name in self.VOID_ELEMENTS else _Element)(name)
+        if name in self.noise_tags:
+            el.noise = True
+            self.noise_depth += 1
+        elif not self.noise_depth:
+            for k, want in self.by_tag.get(name, ()):
+                if want is None or self._attrs_match(name, attrs, want):
+                    slot = [len(self.strings), -1, k]
+                    self.matches[k].append(slot)
+                    el.slots.append(slot)
+        if name in STRING_CONTAINERS:
+            el.container = True
+            self.container_depth += 1
+        self.stack.append(el)
+        self.open_count[name] = self.open_count.get(name, 0) + 1
+        return el
+
+    def handle_endtag(self, name: str, nsprefix: Optional[str] = None) -> None:
+        self.endData()
+        # Same as BeautifulSoup._popToTag: pop up to the most recent element
+        # with that name; ignore the end tag if none is open.
+        if not self.open_count.get(name):
+            return
+        while self.stack:
+            el = self._pop()
+            if el.name == name:
+                break
+
+    def close(self) -> None:
+        self.endData()
+        while self.stack:
+            self._pop()
+
+    def _pop(self) -> _Element:
+        el = self.stack.pop()
+        self.open_count[el.name] -= 1
+        for slot in el.slots:
+            slot[1] = len(self.strings)
+        if el.noise:
+            self.noise_depth -= 1
+        if el.container:
+            self.container_depth -= 1
+        return el
+
+    @staticmethod
+    def _attrs_match(name: str, attrs: Dict[str, str], want: Dict[str, str]) -> bool:
+        for key, expected in want.items():
+            value = attrs.get(key)
+            if value is None:
+                return False
+            if key in MULTI_VALUED_ATTRS:
+                tokens = value.split()
+                if expected not in tokens and expected != " ".join(tokens):
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    # ── Results ───────────────────────────────────────────
+    def texts(self) -> Iterator[Tuple[int, List[str]]]:
+        """(selector index, get_text() of every match) for selectors that matched, in priority order."""
+        strings = self.strings
+        for k, slots in enumerate(self.matches):
+            if slots:
+                yield k, [" ".join(strings[a:b]) for a, b, _ in slots]
+
+
+class StreamingCollector(SelectorCollector):
+    """
+    SelectorCollector that judges matches as soon as they close.
+
+    `accept(raw_text)` returns the cleaned text, or None to drop it. Only
+    selectors that can still win (priority <= best one with an accepted text
+    so far) are evaluated. `done` turns True once the top-priority selector
+    (index 0) holds `limit` distinct accepted texts, so the caller can stop
+    reading: any other selector, fallbacks included, can still be overtaken
+    by a higher-priority match later in the page.
+    """
+
+    def __init__(self, selectors: Sequence[Selector], noise_tags: Iterable[str],
+                 accept: Callable[[str], Optional[str]], limit: Optional[int] = None) -> None:
+        super().__init__(selectors, noise_tags)
+        self.accept = accept
+        self.limit = limit
+        self.best = len(selectors)
+        self.accepted: Dict[int, Set[str]] = {}
+        self.done = False
+
+    def _pop(self) -> _Element:
+        el = super()._pop()
+        for slot in el.slots:
+            k = slot[2]
+            if k > self.best:
+                continue
+            text = self.accept(" ".join(self.strings[slot[0]:slot[1]]))
+            slot.append(text)
+            if text is None:
+                continue
+            self.best = min(self.best, k)
+            self.accepted.setdefault(k, set()).add(text)
+        if self.limit is not None and self.best == 0 and len(self.accepted.get(0, ())) >= self.limit:
+            self.done = True
+        return el
+
+    def result(self) -> List[str]:
+        """Accepted texts of the winning selector, deduplicated, in document order."""
+        if self.best >= len(self.matches):
+            return []
+        seen: Set[str] = set()
+        out: List[str] = []
+        for slot in self.matches[self.best]:
+            text = slot[3] if len(slot) > 3 else None  # open (unfinished) matches are skipped
+            if text is not None and text not in seen:
+                seen.add(text)
+                out.append(text)
+        return out
+
+
+def _charref(num: int) -> str:
+    """Numeric character reference, HTML5 rules (as bs4 resolves them)."""
+    if num == 0 or num > 0x10FFFF or 0xD800 <= num <= 0xDFFF:
+        return "\ufffd"
+    if 0x80 <= num <= 0x9F:  # references written in windows-1252
+        try:
+            return bytes([num]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(num)
+
+
+class _StdlibParser(HTMLParser):
+    """
+    html.parser front-end emitting the tree-construction calls bs4's
+    "html.parser" builder makes: None attribute values become "", later
+    duplicate attributes win, void tags are closed right away (a later
+    explicit end tag is ignored), references are resolved like bs4 does and
+    comments / declarations / CDATA are passed with their string type.
+    """
+
+    def __init__(self, collector: SelectorCollector) -> None:
+        super().__init__(convert_charrefs=False)
+        self.c = collector
+        self.already_closed_empty_element: List[str] = []
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag, check_already_closed=False)
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]],
+                        handle_empty_element: bool = True) -> None:
+        attr_dict = {key: "" if value is None else value for key, value in attrs}
+        el = self.c.handle_starttag(tag, None, None, attr_dict)
+        if el.is_empty_element and handle_empty_element:
+            self.handle_endtag(tag, check_already_closed=False)
+            self.already_closed_empty_element.append(tag)
+
+    def handle_endtag(self, tag: str, check_already_closed: bool = True) -> None:
+        if check_already_closed and tag in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(tag)
+        else:
+            self.c.handle_endtag(tag)
+
+    def handle_data(self, data: str) -> None:
+        self.c.handle_data(data)
+
+    def handle_charref(self, name: str) -> None:
+        base, digits = (16, "0123456789abcdef") if name[:1] in ("x", "X") else (10, "0123456789")
+        body = name[1:] if base == 16 else name
+        try:
+            n = len(body) if int(body, base) >= 0 else 0
+        except ValueError:
+            # Unterminated reference: leading digits only, the rest is plain text
+            n = len(body) - len(body.lstrip(digits))
+        if n:
+            char = _charref(int(body[:n], base))
+            if char == "\ufffd":
+                self.c.contains_replacement_characters = True
+            self.c.handle_data(char)
+        self.c.handle_data(body[n:])
+
+    def handle_entityref(self, name: str) -> None:
+        self.c.handle_data(ENTITIES.get(name, "&" + name))
+
+    def _special(self, data: str, kind: type) -> None:
+        self.c.endData()
+        self.c.handle_data(data)
+        self.c.endData(kind)
+
+    def handle_comment(self, data: str) -> None:
+        self._special(data, Markup)
+
+    def handle_decl(self, decl: str) -> None:
+        self._special(decl[len("DOCTYPE "):], Markup)
+
+    def unknown_decl(self, data: str) -> None:
+        if data.upper().startswith("CDATA["):
+            self._special(data[len("CDATA["):], CData)
+        else:
+            self._special(data, Markup)
+
+    def handle_pi(self, data: str) -> None:
+        self._special(data, Markup)
+
+
+class _LxmlTarget:
+    """lxml parser target forwarding SAX-style events to a SelectorCollector."""
+
+    def __init__(self, collector: SelectorCollector) -> None:
+        self.c = collector
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        self.c.handle_starttag(tag, None, None, dict(attrib))
+
+    def end(self, tag: str) -> None:
+        self.c.handle_endtag(tag)
+
+    def data(self, data: str) -> None:
+        self.c.handle_data(data)
+
+    def comment(self, text: str) -> None:
+        self.c.endData()
+
+    def close(self) -> None:
+        self.c.close()
+
+
+def available_parsers() -> List[str]:
+    return ["html.parser"] + (["lxml"] if etree is not None else [])
+
+
+class _StdlibFeeder:
+    def __init__(self, collector: SelectorCollector) -> None:
+        self.collector = collector
+        self.parser = _StdlibParser(collector)
+
+    def feed(self, html: str) -> None:
+        self.parser.feed(html)
+
+    def close(self) -> None:
+        self.parser.close()
+        self.collector.close()
+
+
+def _feeder(collector: SelectorCollector, parser: str) -> Any:
+    """Incremental parser driving `collector`: feed(str) then close()."""
+    if parser == "lxml" and etree is not None:
+        return etree.HTMLParser(target=_LxmlTarget(collector))
+    return _StdlibFeeder(collector)
+
+
+class PageExtractor:
+    """
+    Incremental counterpart of selector_texts() for pages read in chunks:
+    feed() decoded HTML as it arrives; it returns True once `limit` texts
+    of the top-priority selector are in, after which the rest of the page
+    can be skipped. texts()[:limit] is then what a full parse would give;
+    without an early stop, texts() is exactly what a full parse would give.
+    """
+
+    def __init__(self, selectors: Sequence[Selector], noise_tags: Iterable[str],
+                 accept: Callable[[str], Optional[str]], limit: Optional[int] = None,
+                 parser: str = "html.parser") -> None:
+        self.collector = StreamingCollector(selectors, noise_tags, accept, limit)
+        self._parser = _feeder(self.collector, parser)
+        self.stopped_early = False
+
+    def feed(self, html: str) -> bool:
+        self._parser.feed(html)
+        if self.collector.done:
+            self.stopped_early = True
+        return self.stopped_early
+
+    def close(self) -> None:
+        """Finish parsing (not after an early stop: unfinished matches are dropped)."""
+        if not self.stopped_early:
+            self._parser.close()
+
+    def texts(self) -> List[str]:
+        return self.collector.result()
+
+
+def selector_texts(
+    html: str,
+    selectors: Sequence[Selector],
+    noise_tags: Iterable[str],
+    parser: str = "html.parser",
+) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Parse `html` once and return, for each selector that matched at least
+    one element (in priority order), the get_text(" ", strip=True) of its
+    matches in document order — what BeautifulSoup(html, "html.parser")
+    with the noise tags decomposed would give.
+
+    `parser="lxml"` uses libxml2 when installed (faster; its error recovery
+    can differ from html.parser on malformed markup).
+    """
+    collector = SelectorCollector(selectors, noise_tags)
+    p = _feeder(collector, parser)
+    p.feed(html)
+    p.close()
+    return collector.texts()
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import asyncio
+import codecs
+import hashlib
+import re
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Protocol, Sequence, Union
+
+import anyio
+import httpx
+
+USER_AGENT = "Mozilla/5.0 (ToxiScan/2.1)"
+# <meta charset=...> / http-equiv content-type, looked for in the first bytes only
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9._:-]+)""", re.I)
+PRESCAN_BYTES = 1024
+
+
+class PageSink(Protocol):
+    """Consumer of a page's decoded HTML, chunk by chunk."""
+
+    def feed(self, html: str) -> bool:
+        """Return True to stop downloading (enough has been read)."""
+
+    def close(self) -> None:
+        ...
+
+
+class FetchError(Exception):
+    """Page could not be fetched; carries the HTTP status the API should answer with."""
+
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _encoding(response: httpx.Response, head: bytes) -> str:
+    """BOM, else header charset, else <meta charset> in the first bytes, else UTF-8."""
+    candidates = ["utf-8-sig" if head.startswith(codecs.BOM_UTF8) else None]
+    candidates.append(response.charset_encoding)
+    m = META_CHARSET.search(head[:PRESCAN_BYTES])
+    if m:
+        candidates.append(m.group(1).decode("ascii"))
+    for enc in candidates:
+        if enc:
+            try:
+                return codecs.lookup(enc).name
+            except LookupError:
+                pass
+    return "utf-8"
+
+
+class PageFetcher:
+    """
+    Shared async HTTP client for the URL endpoints.
+
+    One pooled `httpx.AsyncClient` (keep-alive, global connection cap,
+    separate connect / read timeouts) plus a semaphore per host, so a batch
+    of URLs on the same site never opens more than `per_host` connections
+    to it while other hosts proceed in parallel. A host's semaphore only
+    lives while requests to it are running or waiting, so the table stays
+    bounded by the requests in flight.
+    """
+
+    def __init__(
+        self,
+        connect_timeout_s: float,
+        read_timeout_s: float,
+        max_connections: int,
+        per_host: int,
+        max_bytes: int,
+        keepalive_s: float = 30.0,
+        chunk_bytes: int = 64 * 1024,
+    ) -> None:
+        self.timeout = httpx.Timeout(read_timeout_s, connect=connect_timeout_s)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_s,
+        )
+        self.per_host = max(int(per_host), 1)
+        self.max_bytes = int(max_bytes)
+        self.chunk_bytes = chunk_bytes
+        self._client: Optional[httpx.AsyncClient] = None
+        self._hosts: Dict[str, List[Any]] = {}  # host -> [semaphore, requests holding or waiting]
+        self.requests = self.errors = 0
+        self.bytes_read = self.truncated = self.stopped_early = self.not_modified = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"User-Agent": USER_AGENT},
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _host_slot(self, url: httpx.URL) -> AsyncIterator[None]:
+        key = f"{url.host}:{url.port or url.scheme}"
+        slot = self._hosts.get(key)
+        if slot is None:
+            slot = self._hosts[key] = [asyncio.Semaphore(self.per_host), 0]
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if slot[1] == 0:  # idle: no holder, no waiter
+                del self._hosts[key]
+
+    async def _read(
+        self, r: httpx.Response, sink: PageSink, previous: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Decode the body incrementally into `sink`, up to max_bytes.
+
+        With `previous` (the info of an earlier fetch of this page), the first
+        `previous["bytes_read"]` bytes are held back and hashed: if they are
+        the same bytes — and, for a page that was read to the end, the body
+        ends there too — the sink is never fed and the status is "unchanged".
+        Chunks have a fixed size, so equal prefixes mean equal extraction.
+        """
+        n, decoder, encoding = 0, None, None
+        truncated = stopped = same = False
+        digest = hashlib.blake2b(digest_size=16)
+        expect = previous.get("bytes_read") if previous and previous.get("content_hash") else None
+        held: List[bytes] = []
+
+        async def feed(data: bytes) -> bool:
+            nonlocal decoder, encoding
+            if decoder is None:
+                encoding = _encoding(r, data)
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            # Parsing is CPU-bound: keep it off the event loop
+            return await anyio.to_thread.run_sync(sink.feed, decoder.decode(data))
+
+        async for chunk in r.aiter_bytes(self.chunk_bytes):
+            if n + len(chunk) > self.max_bytes:
+                chunk, truncated = chunk[: self.max_bytes - n], True
+            n += len(chunk)
+            digest.update(chunk)
+            if expect is not None:
+                held.append(chunk)
+                if n < expect and not truncated:
+                    continue
+                if n == expect and digest.hexdigest() == previous["content_hash"]:
+                    if not previous.get("complete"):
+                        break
+                    if not truncated:
+                        same = True  # identical so far; unchanged only if the body ends here
+                        continue
+                # The body differs from the previous visit: parse what was held back
+                expect, chunks, held = None, held, []
+            else:
+                chunks = [chunk]
+            for c in chunks:
+                stopped = await feed(c)
+                if stopped:
+                    break
+            if stopped or truncated:
+                break
+        else:
+            if expect is not None and not same:  # shorter than before
+                for c in held:
+                    stopped = await feed(c)
+                    if stopped:
+                        break
+                expect = None
+
+        unchanged = expect is not None
+        if not stopped and not unchanged:
+            if decoder is not None:
+                await anyio.to_thread.run_sync(sink.feed, decoder.decode(b"", final=True))
+            await anyio.to_thread.run_sync(sink.close)
+        self.bytes_read += n
+        self.truncated += truncated
+        self.stopped_early += stopped
+        validators = {"etag": r.headers.get("etag"), "last_modified": r.headers.get("last-modified")}
+        if unchanged:
+            return {**previous, **validators, "status": "unchanged"}
+        return {
+            "status":        "fetched",
+            "bytes_read":    n,
+            "encoding":      encoding or "utf-8",
+            "truncated":     truncated,
+            "stopped_early": stopped,
+            "complete":      not (truncated or stopped),
+            "content_hash":  digest.hexdigest(),
+            **validators,
+        }
+
+    async def fetch(
+        self, url: str, sink: PageSink, previous: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        GET one page and stream its decoded HTML into `sink`. Reading stops
+        at `max_bytes` or as soon as the sink has enough; raises FetchError.
+
+        `previous` (the info returned by an earlier fetch) turns the request
+        into a conditional GET (If-None-Match / If-Modified-Since); on a 304
+        or an identical body the sink is not fed and the returned status is
+        "not_modified" / "unchanged".
+        """
+        self.requests += 1
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+        try:
+            parsed = httpx.URL(url)
+            async with self._host_slot(parsed):
+                async with self._get_client().stream("GET", parsed, headers=headers) as r:
+                    if previous and r.status_code == 304:
+                        self.not_modified += 1
+                        return {**previous, "status": "not_modified"}
+                    r.raise_for_status()
+                    return await self._read(r, sink, previous)
+        except httpx.TimeoutException:
+            self.errors += 1
+            raise FetchError(408, "Timeout : la page met trop de temps à répondre")
+        except httpx.HTTPStatusError as e:
+            self.errors += 1
+            raise FetchError(400, f"Erreur HTTP {e.response.status_code}")
+        except httpx.ConnectError:
+            self.errors += 1
+            raise FetchError(
+                400,
+                "Connexion refusée. Assurez-vous que 'python -m http.server 9000' est démarré."
+            )
+        except Exception as e:
+            self.errors += 1
+            raise FetchError(400, f"Erreur de chargement : {e}")
+
+    async def fetch_many(
+        self,
+        urls: Sequence[str],
+        sinks: Sequence[PageSink],
+        previous: Sequence[Optional[Dict[str, Any]]],
+    ) -> List[Union[Dict[str, Any], FetchError]]:
+        """Fetch concurrently; each slot holds the fetch info or the FetchError for that URL."""
+        async def one(url, sink, prev) -> Union[Dict[str, Any], FetchError]:
+            try:
+                return await self.fetch(url, sink, prev)
+            except FetchError as e:
+                return e
+        return list(await asyncio.gather(*(one(*args) for args in zip(urls, sinks, previous))))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests":          self.requests,
+            "errors":            self.errors,
+            "active_hosts":      len(self._hosts),
+            "per_host":          self.per_host,
+            "max_connections":   self.limits.max_connections,
+            "connect_timeout_s": self.timeout.connect,
+            "read_timeout_s":    self.timeout.read,
+            "max_bytes":         self.max_bytes,
+            "bytes_read":        self.bytes_read,
+            "truncated":         self.truncated,
+            "stopped_early":     self.stopped_early,
+            "not_modified":      self.not_modified,
+        }
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .linear import CompiledLinearModel
+
+# Layout: MAGIC | uint64 header length | JSON header | arrays (64-byte aligned)
+MAGIC = b"TXSFLAT1"
+ALIGN = 64
+
+# TfidfVectorizer params that define the analyzer (everything else is learned)
+ANALYZER_PARAMS = (
+    "input", "encoding", "decode_error", "strip_accents", "lowercase",
+    "token_pattern", "stop_words", "ngram_range", "analyzer",
+)
+IDF_PARAMS = ("norm", "use_idf", "smooth_idf", "sublinear_tf")
+
+
+# ═══════════════════════════════════════════════════════
+#  Featurizers rebuilt from flat arrays
+# ═══════════════════════════════════════════════════════
+
+def _idf_weight(X: sp.csr_matrix, idf: np.ndarray, opts: Dict[str, Any]) -> sp.csr_matrix:
+    """TfidfTransformer.transform on raw counts, with a stored idf_ array."""
+    X = sp.csr_matrix(X, dtype=np.float64)
+    if opts.get("binary"):
+        X.data[:] = 1.0
+    if opts.get("sublinear_tf"):
+        np.log(X.data, X.data)
+        X.data += 1.0
+    if opts.get("use_idf", True):
+        X.data *= idf[X.indices]
+    if opts.get("norm"):
+        X = normalize(X, norm=opts["norm"], copy=False)
+    return X
+
+
+class FlatTfidfFeaturizer:
+    """
+    TfidfVectorizer.transform without the `vocabulary_` dict: terms are a
+    sorted fixed-width byte array and looked up with one `searchsorted`
+    over all tokens of the batch.
+    """
+
+    def __init__(self, params: Dict[str, Any], opts: Dict[str, Any],
+                 terms: np.ndarray, columns: np.ndarray, idf: np.ndarray) -> None:
+        params = dict(params)
+        if params.get("ngram_range") is not None:
+            params["ngram_range"] = tuple(params["ngram_range"])
+        self.analyzer = TfidfVectorizer(**params).build_analyzer()
+        self.opts = opts
+        self.terms = terms
+        self.columns = columns
+        self.idf = idf
+        self.width = terms.dtype.itemsize
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        docs = [self.analyzer(t) for t in texts]
+        lengths = np.fromiter((len(d) for d in docs), dtype=np.intp, count=len(docs))
+        # Tokens longer than the widest term cannot match (and must not be truncated)
+        tokens = [
+            b if len(b) <= self.width else b""
+            for d in docs for b in (tok.encode("utf-8") for tok in d)
+        ]
+        n_features = self.idf.shape[0]
+        if not tokens:
+            return sp.csr_matrix((len(texts), n_features), dtype=np.float64)
+        arr = np.array(tokens, dtype=self.terms.dtype)
+        pos = np.minimum(np.searchsorted(self.terms, arr), len(self.terms) - 1)
+        hit = self.terms[pos] == arr
+        rows = np.repeat(np.arange(len(texts)), lengths)[hit]
+        cols = self.columns[pos[hit]]
+        X = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(len(texts), n_features),
+        )
+        X.sum_duplicates()
+        return _idf_weight(X, self.idf, self.opts)
+
+
+class FlatHashingFeaturizer:
+    """Stateless HashingVectorizer followed by a stored IDF array."""
+
+    def __init__(self, params: Dict[str, Any], opts: Dict[str, Any], idf: np.ndarray) -> None:
+        params = dict(params)
+        params["ngram_range"] = tuple(params["ngram_range"])
+        self.vectorizer = HashingVectorizer(**params)
+        self.opts = opts
+        self.idf = idf
+
+    def transform(self, texts: List[str]) -> sp.csr_matrix:
+        return _idf_weight(self.vectorizer.transform(texts), self.idf, self.opts)
+
+
+# ═══════════════════════════════════════════════════════
+#  Export
+# ═══════════════════════════════════════════════════════
+
+def _json_params(est: Any, keys: Tuple[str, ...]) -> Dict[str, Any]:
+    params = est.get_params()
+    out = {}
+    for k in keys:
+        v = params.get(k)
+        if isinstance(v, (set, frozenset)):
+            v = sorted(v)
+        elif isinstance(v, tuple):
+            v = list(v)
+        if callable(v):
+            raise TypeError(f"Paramètre non exportable : {k}={v!r}")
+        out[k] = v
+    return out
+
+
+def _featurizer_arrays(featurizer: Any) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    steps = [s for _, s in getattr(featurizer, "steps", [("f", featurizer)])]
+
+    if len(steps) == 1 and isinstance(steps[0], TfidfVectorizer):
+        vec = steps[0]
+        if vec.tokenizer is not None or vec.preprocessor is not None or callable(vec.analyzer):
+            raise TypeError("TfidfVectorizer avec tokenizer/preprocessor/analyzer personnalisé")
+        vocab = sorted(
+            ((term.encode("utf-8"), col) for term, col in vec.vocabulary_.items()),
+            key=lambda kv: kv[0],
+        )
+        width = max(len(t) for t, _ in vocab)
+        meta = {
+            "kind":   "tfidf",
+            "params": _json_params(vec, ANALYZER_PARAMS),
+            "opts":   {**_json_params(vec, IDF_PARAMS), "binary": bool(vec.binary)},
+        }
+        arrays = {
+            "terms":   np.array([t for t, _ in vocab], dtype=f"S{width}"),
+            "columns": np.array([c for _, c in vocab], dtype=np.int32),
+            "idf":     np.asarray(vec.idf_, dtype=np.float64),
+        }
+        return meta, arrays
+
+    if (len(steps) == 2 and isinstance(steps[0], HashingVectorizer)
+            and hasattr(steps[1], "idf_")):
+        hv, tfidf = steps
+        meta = {
+            "kind":   "hashing",
+            "params": _json_params(hv, tuple(k for k in hv.get_params() if k != "dtype")),
+            "opts":   _json_params(tfidf, IDF_PARAMS),
+        }
+        return meta, {"idf": np.asarray(tfidf.idf_, dtype=np.float64)}
+
+    raise TypeError(
+        "Featurizer non exportable : attendu TfidfVectorizer ou HashingVectorizer + TfidfTransformer"
+    )
+
+
+def write_flat_model(pipe: Any, path: Path, labels: List[str]) -> Dict[str, Any]:
+    """
+    Export a linear text pipeline to the single-file, mmap-able format.
+    Raises TypeError for what CompiledLinearModel.from_pipeline rejects.
+    """
+    compiled = CompiledLinearModel.from_pipeline(pipe)
+    meta, arrays = _featurizer_arrays(compiled.featurizer)
+    arrays["coef"] = compiled.coef
+    arrays["intercept"] = compiled.intercept
+
+    layout: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+    header = {"format": 1, "labels": list(labels), "featurizer": meta, "arrays": layout}
+    raw = json.dumps(header).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(raw)) // ALIGN) * ALIGN
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(raw)))
+        f.write(raw)
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(arr).tobytes())
+    return header
+
+
+# ═══════════════════════════════════════════════════════
+#  Load (zero-copy)
+# ═══════════════════════════════════════════════════════
+
+def load_flat_model(path: Path) -> CompiledLinearModel:
+    """
+    Open a flat artifact. Arrays are read-only views on one shared mmap, so
+    every process serving the same file shares its pages via the OS cache.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Format de modèle inconnu : {path}")
+    (header_len,) = struct.unpack_from("<Q", mm, len(MAGIC))
+    header = json.loads(mm[len(MAGIC) + 8: len(MAGIC) + 8 + header_len])
+    data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            mm, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+
+    meta = header["featurizer"]
+    if meta["kind"] == "tfidf":
+        featurizer: Any = FlatTfidfFeaturizer(
+            meta["params"], meta["opts"], arrays["terms"], arrays["columns"], arrays["idf"]
+        )
+    elif meta["kind"] == "hashing":
+        featurizer = FlatHashingFeaturizer(meta["params"], meta["opts"], arrays["idf"])
+    else:
+        raise ValueError(f"Featurizer inconnu : {meta['kind']}")
+
+    model = CompiledLinearModel(featurizer, arrays["coef"], arrays["intercept"])
+    model.mmap = mm  # keep the mapping alive as long as the model
+    return model
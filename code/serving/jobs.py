@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .pool import ScoringPool
+from .text import dedup_index, dedup_ratio
+
+TEXT_COLUMNS = ("comment_text", "text")
+COPY_BUFSIZE = 1 << 20
+
+
+# ═══════════════════════════════════════════════════════
+#  Result store (SQLite)
+# ═══════════════════════════════════════════════════════
+
+class JobStore:
+    """
+    SQLite store for job metadata and per-row probabilities.
+    A chunk's rows and the job's progress counters are committed in the same
+    transaction, so `chunks_done` always matches what is stored.
+
+    Several processes can share the store (uvicorn --workers N, overlapping
+    restarts): a job is claimed atomically (queued -> running with an owner),
+    its owner refreshes `heartbeat_at` while it runs, and only running jobs
+    whose heartbeat is stale are handed back to the queue.
+    """
+
+    def __init__(self, db_path: Path, labels: Sequence[str]) -> None:
+        self.db_path = Path(db_path)
+        self.labels = list(labels)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        prob_cols = ", ".join(f"p{j} REAL" for j in range(len(self.labels)))
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    input_path TEXT NOT NULL,
+                    chunk_size INTEGER NOT NULL,
+                    chunks_done INTEGER NOT NULL DEFAULT 0,
+                    rows_read INTEGER NOT NULL DEFAULT 0,
+                    rows_scored INTEGER NOT NULL DEFAULT 0,
+                    rows_unique INTEGER NOT NULL DEFAULT 0,
+                    bytes_total INTEGER,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            db.execute(
+                f"""CREATE TABLE IF NOT EXISTS results (
+                    job_id TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    {prob_cols},
+                    PRIMARY KEY (job_id, row)
+                ) WITHOUT ROWID"""
+            )
+            # Stores created before in-batch dedup lack this column.
+            cols = {r["name"] for r in db.execute("PRAGMA table_info(jobs)")}
+            if "rows_unique" not in cols:
+                db.execute("ALTER TABLE jobs ADD COLUMN rows_unique INTEGER NOT NULL DEFAULT 0")
+            if "owner" not in cols:
+                db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+                db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def create(self, job_id: str, filename: str, input_path: Path, chunk_size: int) -> None:
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, status, filename, input_path, chunk_size, bytes_total,"
+                " created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, str(input_path), chunk_size,
+                 input_path.stat().st_size, now, now),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def queued(self) -> List[str]:
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at"
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """queued -> running for `owner`; False if another process got it first."""
+        now = time.time()
+        with self._connect() as db:
+            cur = db.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, updated_at = ?"
+                " WHERE id = ? AND status = 'queued'",
+                (owner, now, now, job_id),
+            )
+        return cur.rowcount == 1
+
+    def heartbeat(self, owner: str) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running'",
+                (time.time(), owner),
+            )
+
+    def requeue_stale(self, stale_after: float) -> List[str]:
+        """Hand running jobs whose owner stopped heartbeating back to the queue."""
+        now = time.time()
+        stale = "status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        requeued = []
+        with self._connect() as db:
+            for r in db.execute(f"SELECT id FROM jobs WHERE {stale}", (now - stale_after,)).fetchall():
+                cur = db.execute(
+                    f"UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ? WHERE id = ? AND {stale}",
+                    (now, r["id"], now - stale_after),
+                )
+                if cur.rowcount == 1:
+                    requeued.append(r["id"])
+        return requeued
+
+    def release(self, owner: str) -> None:
+        """Re-queue the running jobs of `owner` (clean shutdown: resume right away)."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, updated_at = ?"
+                " WHERE owner = ? AND status = 'running'",
+                (time.time(), owner),
+            )
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None,
+                   owner: Optional[str] = None) -> bool:
+        """Set a job's status; with `owner`, only if that process still holds the job."""
+        query = "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?"
+        params: tuple = (status, error, time.time(), job_id)
+        if owner is not None:
+            query += " AND owner = ? AND status = 'running'"
+            params += (owner,)
+        with self._connect() as db:
+            return db.execute(query, params).rowcount == 1
+
+    def write_chunk(
+        self, job_id: str, chunk_idx: int, n_read: int,
+        rows: Sequence[int], texts: Sequence[str], probas: np.ndarray, n_unique: int,
+        owner: Optional[str] = None,
+    ) -> bool:
+        """Commit a chunk; False (nothing written) if `owner` no longer holds the job."""
+        marks = ", ".join("?" * (2 + len(self.labels)))
+        now = time.time()
+        with self._connect() as db:
+            cur = db.execute(
+                "UPDATE jobs SET chunks_done = ?, rows_read = rows_read + ?,"
+                " rows_scored = rows_scored + ?, rows_unique = rows_unique + ?,"
+                " heartbeat_at = ?, updated_at = ?"
+                " WHERE id = ? AND chunks_done = ? AND (? IS NULL OR owner = ?)",
+                (chunk_idx + 1, n_read, len(rows), n_unique, now, now, job_id, chunk_idx,
+                 owner, owner),
+            )
+            if cur.rowcount != 1:
+                return False
+            db.executemany(
+                f"INSERT OR REPLACE INTO results VALUES (?, {marks})",
+                ((job_id, r, t, *p) for r, t, p in zip(rows, texts, probas.tolist())),
+            )
+        return True
+
+    def page(self, job_id: str, after: int, limit: int) -> Dict[str, Any]:
+        """Keyset pagination over a job's results, ordered by CSV row."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT * FROM results WHERE job_id = ? AND row > ? ORDER BY row LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        n_labels = len(self.labels)
+        return {
+            "rows":   [r["row"] for r in rows],
+            "texts":  [r["text"] for r in rows],
+            "probas": np.array(
+                [[r[f"p{j}"] for j in range(n_labels)] for r in rows], dtype=float
+            ).reshape(len(rows), n_labels),
+        }
+
+
+# ═══════════════════════════════════════════════════════
+#  Job manager
+# ═══════════════════════════════════════════════════════
+
+class JobManager:
+    """
+    Runs CSV scoring jobs in the background.
+
+    Uploads are saved under `jobs_dir`; a dispatcher thread reads each CSV in
+    chunks of `chunk_size` rows and fans them out to the ScoringPool worker
+    processes. Chunks are committed to the
+    JobStore in order, so after a restart a job resumes after its last
+    committed chunk.
+
+    Jobs are claimed atomically, so several managers can share `jobs_dir`.
+    A job left running by a process that died is resumed once its heartbeat
+    is older than `stale_after` seconds; a clean shutdown re-queues its
+    running jobs immediately.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: Path,
+        labels: Sequence[str],
+        pool: ScoringPool,
+        clean_many: Callable[[List[str]], List[str]],
+        chunk_size: int = 5000,
+        stale_after: float = 60.0,
+    ) -> None:
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.store = JobStore(self.jobs_dir / "jobs.sqlite3", labels)
+        self.labels = list(labels)
+        self.pool = pool
+        self.clean_many = clean_many
+        self.chunk_size = max(int(chunk_size), 1)
+        self.stale_after = float(stale_after)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    # ── lifecycle ───────────────────────────────────────
+    def start(self) -> None:
+        """Start the dispatcher; queued jobs and stale running ones are picked up."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._dispatch, name="toxiscan-jobs", daemon=True)
+        self._thread.start()
+        self._heartbeat = threading.Thread(target=self._beat, name="toxiscan-jobs-heartbeat", daemon=True)
+        self._heartbeat.start()
+        self.store.requeue_stale(self.stale_after)
+        for job_id in self.store.queued():
+            self._queue.put(job_id)
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=10)
+            self._heartbeat = None
+        self.store.release(self.owner)
+
+    def _beat(self) -> None:
+        """Keep our running jobs alive; pick up jobs whose owner died."""
+        while not self._stopping.wait(self.stale_after / 4):
+            try:
+                self.store.heartbeat(self.owner)
+                for job_id in self.store.requeue_stale(self.stale_after):
+                    self._queue.put(job_id)
+            except sqlite3.Error:
+                pass  # busy store: next beat
+
+    # ── public API ──────────────────────────────────────
+    def submit(self, fileobj: BinaryIO, filename: str) -> str:
+        job_id = uuid.uuid4().hex
+        input_path = self.jobs_dir / f"{job_id}.csv"
+        with open(input_path, "wb") as out:
+            while True:
+                block = fileobj.read(COPY_BUFSIZE)
+                if not block:
+                    break
+                out.write(block)
+        self.store.create(job_id, filename, input_path, self.chunk_size)
+        self._queue.put(job_id)
+        return job_id
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        job.pop("input_path", None)
+        job["dedup_ratio"] = dedup_ratio(job["rows_scored"], job["rows_unique"])
+        for key in ("created_at", "updated_at"):
+            job[key] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(job[key]))
+        return job
+
+    # ── dispatcher ──────────────────────────────────────
+    def _dispatch(self) -> None:
+        while not self._stopping.is_set():
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            if not self.store.claim(job_id, self.owner):
+                continue  # finished, or claimed by another process
+            job = self.store.get(job_id)
+            try:
+                if self._run(job):
+                    self.store.set_status(job_id, "done", owner=self.owner)
+            except Exception as e:
+                if not self._stopping.is_set():
+                    self.store.set_status(job_id, "failed", f"{type(e).__name__}: {e}", owner=self.owner)
+
+    def _chunks(self, job: Dict[str, Any]) -> Iterator[tuple]:
+        """Yield (chunk_idx, n_read, rows, clean_texts) for chunks not yet committed."""
+        chunk_size = job["chunk_size"]
+        reader = pd.read_csv(job["input_path"], chunksize=chunk_size, dtype=str)
+        for idx, df in enumerate(reader):
+            if idx == 0:
+                text_col = next((c for c in TEXT_COLUMNS if c in df.columns), None)
+                if text_col is None:
+                    raise ValueError(
+                        "Le CSV doit contenir une colonne 'comment_text' ou 'text'"
+                    )
+            if idx < job["chunks_done"]:
+                continue
+            first_row = idx * chunk_size
+            cleaned = self.clean_many(df[text_col].fillna("").tolist())
+            rows  = [first_row + i for i, t in enumerate(cleaned) if t]
+            texts = [t for t in cleaned if t]
+            yield idx, len(df), rows, texts
+
+    def _run(self, job: Dict[str, Any]) -> bool:
+        """Score the remaining chunks; False if interrupted by shutdown or the job was lost."""
+        max_in_flight = 2 * max(self.pool.n_workers, 1)
+        in_flight: "deque[tuple]" = deque()
+
+        def commit_oldest() -> bool:
+            idx, n_read, rows, texts, inverse, n_unique, fut = in_flight.popleft()
+            probas = fut.result()[inverse] if rows else np.zeros((0, len(self.labels)))
+            return self.store.write_chunk(
+                job["id"], idx, n_read, rows, texts, np.round(probas, 4), n_unique, self.owner
+            )
+
+        for idx, n_read, rows, texts in self._chunks(job):
+            if self._stopping.is_set():
+                return False
+            # Identical texts in a chunk are scored once, then scattered back.
+            unique, inverse = dedup_index(texts)
+            fut: Optional[Future] = self.pool.submit(unique) if rows else None
+            in_flight.append((idx, n_read, rows, texts, inverse, len(unique), fut))
+            if len(in_flight) >= max_in_flight and not commit_oldest():
+                return False
+        while in_flight:
+            if self._stopping.is_set() or not commit_oldest():
+                return False
+        return True
+
+    def results(self, job_id: str, after: int, limit: int) -> Dict[str, Any]:
+        return self.store.page(job_id, after, limit)
+
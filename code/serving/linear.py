@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Any, List, Sequence
+
+import numpy as np
+from scipy.special import expit
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.multiclass import OneVsRestClassifier
+
+
+def _is_logistic(est: Any) -> bool:
+    """True for binary estimators whose P(positive) = sigmoid(x·w + b)."""
+    if isinstance(est, LogisticRegression):
+        return len(getattr(est, "classes_", [])) == 2
+    if isinstance(est, SGDClassifier):
+        return est.loss in ("log_loss", "log") and len(getattr(est, "classes_", [])) == 2
+    return False
+
+
+class CompiledLinearModel:
+    """
+    Serving-time replacement for `Pipeline(features..., OneVsRest(LogReg))`.
+
+    The per-label coefficient vectors are stacked into one dense
+    `(n_features, n_labels)` matrix, so a whole batch is scored with a single
+    sparse × dense product followed by a vectorized sigmoid.
+    `predict_proba` returns a `(n_samples, n_labels)` array.
+    """
+
+    def __init__(self, featurizer: Any, coef: np.ndarray, intercept: np.ndarray) -> None:
+        self.featurizer = featurizer
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64).ravel()
+        if self.coef.shape[1] != self.intercept.shape[0]:
+            raise ValueError(
+                f"coef/intercept incohérents : {self.coef.shape} vs {self.intercept.shape}"
+            )
+
+    @classmethod
+    def from_pipeline(cls, pipe: Any) -> "CompiledLinearModel":
+        """
+        Build from a fitted sklearn Pipeline whose last step exposes
+        `estimators_` (OneVsRestClassifier / MultiOutputClassifier) of binary
+        logistic models. Every preceding step is kept as the featurizer.
+        Raises TypeError when the pipeline cannot be compiled, including a
+        multiclass (or binary) OneVsRestClassifier: its predict_proba
+        normalizes the per-class sigmoids, the compiled scorer does not.
+        """
+        steps = getattr(pipe, "steps", None)
+        if not steps or len(steps) < 2:
+            raise TypeError("Pipeline (features → classifieur) attendu")
+        clf = steps[-1][1]
+        estimators: Sequence[Any] = getattr(clf, "estimators_", None) or []
+        if not estimators or not all(_is_logistic(e) for e in estimators):
+            raise TypeError(
+                f"Classifieur non compilable : {type(clf).__name__} "
+                "(attendu : estimateurs logistiques binaires)"
+            )
+        if isinstance(clf, OneVsRestClassifier) and not getattr(clf, "multilabel_", False):
+            raise TypeError("OneVsRestClassifier non multi-label : predict_proba normalisé, non compilable")
+
+        coef = np.column_stack([np.ravel(e.coef_) for e in estimators])
+        intercept = np.array([float(np.ravel(e.intercept_)[0]) for e in estimators])
+        return cls(pipe[:-1], coef, intercept)
+
+    @property
+    def n_features(self) -> int:
+        return self.coef.shape[0]
+
+    @property
+    def n_labels(self) -> int:
+        return self.coef.shape[1]
+
+    def transform(self, texts: List[str]):
+        return self.featurizer.transform(texts)
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        X = self.transform(texts)
+        return np.asarray(X @ self.coef) + self.intercept
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        return expit(self.decision_function(texts))
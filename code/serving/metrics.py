@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (cumulative counts, Prometheus style).
+    Thread-safe: observations may come from the event loop or worker threads.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = {}, 0
+        for bound, c in zip(self.buckets, counts):
+            running += c
+            cumulative[f"le_{bound:g}"] = running
+        cumulative["le_inf"] = count
+        return {
+            "count":   count,
+            "sum":     round(total, 4),
+            "mean":    round(total / count, 4) if count else 0.0,
+            "buckets": cumulative,
+        }
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import Any, List
+
+import joblib
+import numpy as np
+
+from .flat import load_flat_model
+from .linear import CompiledLinearModel
+
+FLAT_SUFFIX = ".flat"
+
+
+def load_serving_model(path: Path, compiled: bool = True) -> Any:
+    """
+    Load a saved model for inference. Linear sklearn pipelines are swapped
+    for their CompiledLinearModel when `compiled` is set and possible.
+    Flat artifacts (`.flat`, see export_model_flat.py) are memory-mapped
+    instead of unpickled and are always compiled.
+    """
+    if Path(path).suffix == FLAT_SUFFIX:
+        return load_flat_model(path)
+    model = joblib.load(path)
+    if not compiled:
+        return model
+    try:
+        return CompiledLinearModel.from_pipeline(model)
+    except TypeError:
+        return model
+
+
+def model_version(path: Path) -> str:
+    """Content hash of a model artifact — changes whenever the model is replaced."""
+    h = hashlib.blake2b(digest_size=8)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def probas_matrix(model: Any, texts: List[str], n_labels: int) -> np.ndarray:
+    """
+    Extract per-label probabilities from model.predict_proba()
+    as a (n_samples, n_labels) float array.
+    MultiOutputClassifier returns a list of N_labels arrays,
+    each of shape (n_samples, 2). Column 1 = P(positive).
+    CompiledLinearModel and OneVsRest pipelines return a 2-D array.
+    """
+    raw = model.predict_proba(texts)
+
+    # Case A: list of arrays — MultiOutputClassifier
+    if isinstance(raw, list) and len(raw) == n_labels:
+        return np.column_stack([np.asarray(p)[:, 1] for p in raw]).astype(float, copy=False)
+
+    # Case B: single 2-D array (Pipeline variant)
+    arr = np.asarray(raw, dtype=float)
+    if arr.ndim == 2 and arr.shape[1] == n_labels:
+        return arr
+
+    raise ValueError(
+        f"predict_proba output inattendu : type={type(raw)}, "
+        f"len={len(raw) if isinstance(raw, list) else 'n/a'}"
+    )
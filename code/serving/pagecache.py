@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .snapshot import RunningAggregate
+
+# Per-request keys that are not part of the stored fetch info
+TRANSIENT_KEYS = ("status", "texts", "probas", "running")
+
+
+class PageCache:
+    """
+    LRU + TTL cache of analysed pages, for /predict_url revalidation.
+
+    Two maps: (url, max_texts) → info of the last fetch (ETag, Last-Modified,
+    content hash, bytes read), and (content hash, max_texts) → the texts
+    extracted from that content with their probability rows and running
+    aggregate. A 304 or an identical body then costs neither a parse nor a
+    model call, and a changed page is diffed against this last snapshot.
+    Rows depend on the model, so `set_version` drops everything.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float) -> None:
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl_s = float(ttl_s)
+        self.version = ""
+        self._pages: "OrderedDict[Tuple[str, int], Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._contents: "OrderedDict[Tuple[str, int], Tuple[List[str], np.ndarray, RunningAggregate]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def set_version(self, version: str) -> None:
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._pages.clear()
+                self._contents.clear()
+
+    def get(self, url: str, max_texts: int) -> Optional[Dict[str, Any]]:
+        """
+        Last fetch info for the page plus its cached "texts", "probas" and
+        "running" aggregate, or
+        None when the page is unknown, expired, or its content was evicted.
+        """
+        if not self.enabled:
+            return None
+        key = (url, max_texts)
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_s:
+                self._pages.pop(key)
+                self.expirations += 1
+                entry = None
+            content = self._contents.get((entry[0]["content_hash"], max_texts)) if entry else None
+            if content is None:
+                return None
+            self._pages.move_to_end(key)
+            self._contents.move_to_end((entry[0]["content_hash"], max_texts))
+            return {**entry[0], "texts": content[0], "probas": content[1], "running": content[2]}
+
+    def put(
+        self,
+        url: str,
+        max_texts: int,
+        info: Dict[str, Any],
+        texts: List[str],
+        probas: np.ndarray,
+        running: RunningAggregate,
+    ) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            stored = {k: v for k, v in info.items() if k not in TRANSIENT_KEYS}
+            self._pages[(url, max_texts)] = (stored, now)
+            self._pages.move_to_end((url, max_texts))
+            self._contents[(info["content_hash"], max_texts)] = (list(texts), probas, running)
+            self._contents.move_to_end((info["content_hash"], max_texts))
+            for d in (self._pages, self._contents):
+                while len(d) > self.max_entries:
+                    d.popitem(last=False)
+                    self.evictions += 1
+
+    def record(self, hit: bool) -> None:
+        """Count a revalidation outcome (hit = 304 or identical body)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled":     self.enabled,
+            "pages":       len(self._pages),
+            "contents":    len(self._contents),
+            "max_entries": self.max_entries,
+            "ttl_s":       self.ttl_s,
+            "hits":        self.hits,
+            "misses":      self.misses,
+            "hit_rate":    round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions":   self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,415 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .metrics import Histogram
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: NDJSON output only
+    pa = pq = None
+
+Comment = Dict[str, Any]  # {"text": ..., plus source metadata}
+
+BATCH_SIZE_BUCKETS = [1, 8, 32, 64, 128, 256, 512, 1024, 2048]
+LAG_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+RECENT_WINDOW_S = 5.0  # minimum span of the "recent" throughput window
+_END = None  # end-of-stream marker passed down the queues
+
+
+def available_formats() -> List[str]:
+    return ["ndjson"] + (["parquet"] if pq is not None else [])
+
+
+# ═══════════════════════════════════════════════════════
+#  Per-stage counters
+# ═══════════════════════════════════════════════════════
+
+class StageStats:
+    """Items in/out, busy time and time blocked on a full downstream queue."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.batches = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0
+        self.reset()
+
+    def reset(self) -> None:
+        self.started = time.perf_counter()
+        self._window = (self.started, 0)  # (t, items_out) at the start of the rate window
+        self._recent = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.perf_counter()
+        elapsed = now - self.started
+        t_prev, n_prev = self._window
+        if now - t_prev >= RECENT_WINDOW_S:
+            self._recent = (self.items_out - n_prev) / (now - t_prev)
+            self._window = (now, self.items_out)
+        return {
+            "items_in":           self.items_in,
+            "items_out":          self.items_out,
+            "batches":            self.batches,
+            "busy_s":             round(self.busy_s, 3),
+            "blocked_s":          round(self.blocked_s, 3),
+            "utilization":        round(self.busy_s / elapsed, 4) if elapsed else 0.0,
+            "items_per_s":        round(self.items_out / elapsed, 2) if elapsed else 0.0,
+            "recent_items_per_s": round(self._recent, 2),
+        }
+
+
+def _queue_stats(q: "asyncio.Queue[Any]", high: int) -> Dict[str, Any]:
+    return {"depth": q.qsize(), "max_size": q.maxsize, "high_water": high}
+
+
+# ═══════════════════════════════════════════════════════
+#  Rotating output
+# ═══════════════════════════════════════════════════════
+
+class RotatingWriter:
+    """
+    Appends scored rows to `<prefix>-<UTC timestamp>-<seq>.<fmt>` files in
+    `out_dir`, starting a new file every `rotate_rows` rows or `rotate_s`
+    seconds. The open file carries a `.part` suffix and is renamed when it
+    is closed, so consumers only ever see complete files.
+
+    Parquet files share one schema, output_schema(labels), whatever source
+    the rows come from (see _ParquetFile).
+    """
+
+    def __init__(self, out_dir: Path, fmt: str = "ndjson", rotate_rows: int = 100_000,
+                 rotate_s: float = 300.0, prefix: str = "scores",
+                 labels: Optional[Sequence[str]] = None) -> None:
+        if fmt not in ("ndjson", "parquet"):
+            raise ValueError(f"format inconnu : {fmt}")
+        if fmt == "parquet" and pq is None:
+            raise RuntimeError("Sortie Parquet indisponible : installer pyarrow (ou utiliser ndjson)")
+        if fmt == "parquet" and not labels:
+            raise ValueError("Sortie Parquet : `labels` requis pour le schéma")
+        self.labels = list(labels or [])
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt
+        self.rotate_rows = max(int(rotate_rows), 1)
+        self.rotate_s = float(rotate_s)
+        self.prefix = prefix
+        self.files: List[Path] = []
+        self.rows = 0
+        self.bytes = 0
+        self._seq = 0
+        self._path: Optional[Path] = None
+        self._handle: Any = None
+        self._file_rows = 0
+        self._opened = 0.0
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        while rows:
+            if self._handle is not None and (
+                self._file_rows >= self.rotate_rows
+                or time.monotonic() - self._opened >= self.rotate_s
+            ):
+                self._close_file()
+            if self._handle is None:
+                self._open_file()
+            take = rows[: self.rotate_rows - self._file_rows]
+            rows = rows[len(take):]
+            if self.fmt == "ndjson":
+                data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in take).encode("utf-8")
+                self._handle.write(data)
+                self._handle.flush()
+                self.bytes += len(data)
+            else:
+                self._handle.write(take)
+            self._file_rows += len(take)
+            self.rows += len(take)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._close_file()
+
+    def _open_file(self) -> None:
+        self._seq += 1
+        stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+        self._path = self.out_dir / f"{self.prefix}-{stamp}-{self._seq:05d}.{self.fmt}.part"
+        self._handle = open(self._path, "wb") if self.fmt == "ndjson" else _ParquetFile(self._path, self.labels)
+        self._file_rows = 0
+        self._opened = time.monotonic()
+
+    def _close_file(self) -> None:
+        self._handle.close()
+        final = self._path.with_suffix("")  # drop ".part"
+        if self._file_rows:
+            os.replace(self._path, final)
+            self.files.append(final)
+            if self.fmt == "parquet":
+                self.bytes += final.stat().st_size
+        else:
+            self._path.unlink(missing_ok=True)
+        self._handle = self._path = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "format":       self.fmt,
+            "out_dir":      str(self.out_dir),
+            "rows":         self.rows,
+            "bytes":        self.bytes,
+            "files_closed": len(self.files),
+            "current_file": str(self._path) if self._path else None,
+        }
+
+
+META_COLUMN = "meta"
+
+
+def output_schema(labels: Sequence[str]) -> "pa.Schema":
+    """Columns of every Parquet output file: fixed fields, one probability per label, then `meta`."""
+    return pa.schema(
+        [("source", pa.string()), ("id", pa.string()), ("text", pa.string())]
+        + [(lab, pa.float64()) for lab in labels]
+        + [("is_toxic", pa.bool_()), ("top_label", pa.string()), ("top_prob", pa.float64()),
+           ("model_version", pa.string()), ("scored_at", pa.string()), (META_COLUMN, pa.string())]
+    )
+
+
+class _ParquetFile:
+    """
+    ParquetWriter with the fixed output_schema(labels). Sources emit
+    different keys (HN API items vs CSV rows): `id` is stored as a string and
+    every key outside the schema goes, JSON-encoded, into the `meta` column,
+    so no column is dropped or mistyped when sources alternate in a file.
+    """
+
+    def __init__(self, path: Path, labels: Sequence[str]) -> None:
+        self.schema = output_schema(labels)
+        self._writer = pq.ParquetWriter(str(path), self.schema)
+
+    def _row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        out = {name: row.get(name) for name in self.schema.names}
+        if out["id"] is not None:
+            out["id"] = str(out["id"])
+        extra = {k: v for k, v in row.items() if k not in out}
+        out[META_COLUMN] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+        return out
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        self._writer.write_table(pa.Table.from_pylist([self._row(r) for r in rows], schema=self.schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+# ═══════════════════════════════════════════════════════
+#  Pipeline
+# ═══════════════════════════════════════════════════════
+
+class StreamPipeline:
+    """
+    Long-running scrape → score → write pipeline.
+
+    Each source is an async iterator of comments; collectors clean them with
+    `clean(text)` (None drops the comment) and put them on a bounded queue.
+    The scorer takes up to `batch_size` comments (waiting at most
+    `max_wait_ms` for a batch to fill), scores them in a worker thread with
+    `score_fn(texts) -> (n, n_labels) probabilities`, and hands the rows to
+    the writer through a second bounded queue. When the writer or the model
+    falls behind, the queues fill up and `put()` blocks the stage upstream,
+    down to the sources: nothing is buffered without bound.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[AsyncIterator[Comment]],
+        score_fn: Callable[[List[str]], np.ndarray],
+        clean: Callable[[str], Optional[str]],
+        labels: Sequence[str],
+        writer: RotatingWriter,
+        threshold: float = 0.5,
+        batch_size: int = 256,
+        max_wait_ms: float = 200.0,
+        queue_size: int = 4096,
+        out_queue_batches: int = 4,
+        model_version: Optional[str] = None,
+    ) -> None:
+        self.sources = list(sources)
+        self.score_fn = score_fn
+        self.clean = clean
+        self.labels = list(labels)
+        self.writer = writer
+        self.threshold = threshold
+        self.batch_size = max(int(batch_size), 1)
+        self.max_wait = max(max_wait_ms, 0.0) / 1000.0
+        self.queue_size = max(int(queue_size), 1)
+        self.out_queue_batches = max(int(out_queue_batches), 1)
+        self.model_version = model_version
+
+        self.collect = StageStats("collect")
+        self.score = StageStats("score")
+        self.write = StageStats("write")
+        self.dropped = 0
+        self.toxic = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.lag_ms = Histogram(LAG_BUCKETS_MS)
+        self.started = time.time()
+        self._in: Optional[asyncio.Queue] = None
+        self._out: Optional[asyncio.Queue] = None
+        self._in_high = self._out_high = 0
+
+    # ── stages ──────────────────────────────────────────
+    async def _collector(self, source: AsyncIterator[Comment]) -> None:
+        async for item in source:
+            self.collect.items_in += 1
+            t0 = time.perf_counter()
+            text = self.clean(str(item.get("text") or ""))
+            self.collect.busy_s += time.perf_counter() - t0
+            if text is None:
+                self.dropped += 1
+                continue
+            t0 = time.perf_counter()
+            await self._in.put({**item, "text": text, "_t": time.perf_counter()})
+            self.collect.blocked_s += time.perf_counter() - t0
+            self._in_high = max(self._in_high, self._in.qsize())
+            self.collect.items_out += 1
+
+    async def _next_batch(self) -> List[Optional[Comment]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._in.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.batch_size and batch[-1] is not _END:
+            if not self._in.empty():
+                batch.append(self._in.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._in.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _scorer(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            end = batch[-1] is _END
+            items = [b for b in batch if b is not _END]
+            if items:
+                self.score.items_in += len(items)
+                t0 = time.perf_counter()
+                probas = await asyncio.to_thread(self.score_fn, [it["text"] for it in items])
+                self.score.busy_s += time.perf_counter() - t0
+                self.score.batches += 1
+                self.batch_sizes.observe(len(items))
+                rows = self._rows(items, probas)
+                t0 = time.perf_counter()
+                await self._out.put(rows)
+                self.score.blocked_s += time.perf_counter() - t0
+                self._out_high = max(self._out_high, self._out.qsize())
+                self.score.items_out += len(rows)
+            if end:
+                await self._out.put(_END)
+                return
+
+    async def _writer(self) -> None:
+        while True:
+            rows = await self._out.get()
+            if rows is _END:
+                await asyncio.to_thread(self.writer.close)
+                return
+            self.write.items_in += len(rows)
+            stamps = [r.pop("_t") for r in rows]
+            t0 = time.perf_counter()
+            await asyncio.to_thread(self.writer.write, rows)
+            now = time.perf_counter()
+            self.write.busy_s += now - t0
+            self.write.batches += 1
+            self.write.items_out += len(rows)
+            for t in stamps:
+                self.lag_ms.observe((now - t) * 1000.0)
+
+    def _rows(self, items: List[Comment], probas: np.ndarray) -> List[Dict[str, Any]]:
+        probs = np.round(probas, 4)
+        top = probs.argmax(axis=1)
+        toxic = (probs >= self.threshold).any(axis=1)
+        self.toxic += int(toxic.sum())
+        scored_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        probs_l, top_l, toxic_l = probs.tolist(), top.tolist(), toxic.tolist()
+        return [
+            {
+                **item,
+                **dict(zip(self.labels, probs_l[i])),
+                "is_toxic":      toxic_l[i],
+                "top_label":     self.labels[top_l[i]],
+                "top_prob":      probs_l[i][top_l[i]],
+                "model_version": self.model_version,
+                "scored_at":     scored_at,
+            }
+            for i, item in enumerate(items)
+        ]
+
+    # ── run ─────────────────────────────────────────────
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Run until every source is exhausted or `stop` is set, then drain the queues."""
+        self._in = asyncio.Queue(self.queue_size)
+        self._out = asyncio.Queue(self.out_queue_batches)
+        self.started = time.time()
+        for stage in (self.collect, self.score, self.write):
+            stage.reset()
+
+        scorer = asyncio.create_task(self._scorer())
+        writer = asyncio.create_task(self._writer())
+        collectors = asyncio.gather(*(self._collector(s) for s in self.sources))
+        watched = {collectors, scorer, writer}
+        if stop is not None:
+            watched.add(asyncio.create_task(stop.wait()))
+        try:
+            await asyncio.wait(watched, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in watched - {scorer, writer}:
+                task.cancel()
+            await asyncio.gather(*(watched - {scorer, writer}), return_exceptions=True)
+            if not (scorer.done() or writer.done()):
+                # whatever was collected is still scored and written
+                await self._in.put(_END)
+                await asyncio.gather(scorer, writer)
+            else:
+                scorer.cancel()
+                writer.cancel()
+                await asyncio.gather(scorer, writer, return_exceptions=True)
+                self.writer.close()
+        for task in (collectors, scorer, writer):
+            if task.done() and not task.cancelled():
+                exc = task.exception()
+                if exc is not None and not isinstance(exc, asyncio.CancelledError):
+                    raise exc
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started_at":    time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+            "uptime_s":      round(time.time() - self.started, 1),
+            "model_version": self.model_version,
+            "threshold":     self.threshold,
+            "stages": {
+                "collect": {**self.collect.snapshot(), "dropped": self.dropped,
+                            "sources": len(self.sources)},
+                "score":   {**self.score.snapshot(), "batch_size": self.batch_sizes.snapshot(),
+                            "toxic": self.toxic},
+                "write":   {**self.write.snapshot(), **self.writer.stats()},
+            },
+            "queues": {
+                "comments": _queue_stats(self._in, self._in_high) if self._in else None,
+                "scored":   _queue_stats(self._out, self._out_high) if self._out else None,
+            },
+            "lag_ms": self.lag_ms.snapshot(),
+        }
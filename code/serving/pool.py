@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import gc
+import logging
+import multiprocessing as mp
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .model import load_serving_model, probas_matrix
+
+log = logging.getLogger(__name__)
+
+# Set in the parent right before the workers are forked: children inherit the
+# loaded model (vocabulary, coefficient arrays) copy-on-write instead of
+# unpickling their own copy.
+_model: Any = None
+_n_labels = 0
+
+
+def _init_worker(model_path: str, compiled: bool, n_labels: int) -> None:
+    global _model, _n_labels
+    _n_labels = n_labels
+    if _model is None:  # spawn start method: nothing inherited, load from disk
+        _model = load_serving_model(Path(model_path), compiled)
+
+
+def _score(texts: List[str]) -> np.ndarray:
+    return probas_matrix(_model, texts, _n_labels)
+
+
+def _ping() -> bool:
+    return _model is not None
+
+
+class ScoringPool:
+    """
+    Process pool for CPU-bound scoring (TF-IDF tokenization + linear model).
+
+    On Linux the workers are forked after the model is loaded, so the large
+    read-only structures are shared with the parent; elsewhere each worker
+    loads the model from `model_path` once. Batches of at least `min_batch`
+    texts are split across all workers by `score()`. With `n_workers=0`
+    everything runs inline in the calling thread.
+
+    If a worker dies (OOM kill, crash), the executor is broken for good: the
+    pool drops it, rebuilds a new one in a background thread and scores
+    inline until it is ready. Batches caught by the crash are rescored inline.
+    Only the first start forks: by the time of a rebuild the server runs
+    other threads (event loop helpers, batcher, HTTP client) whose locks a
+    forked child could inherit held, so rebuilt workers come from a
+    forkserver (spawn where there is none) and load the model from disk.
+    """
+
+    def __init__(self, n_workers: int, n_labels: int, min_batch: int = 2048) -> None:
+        self.n_workers = max(int(n_workers), 0)
+        self.n_labels = n_labels
+        self.min_batch = max(int(min_batch), 1)
+        self.restarts = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._model: Any = None
+        self._model_path: Optional[Path] = None
+        self._compiled = True
+        self._frozen = False
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def parallel(self) -> bool:
+        return self._executor is not None
+
+    def start(self, model: Any, model_path: Path, compiled: bool = True) -> None:
+        self.shutdown()
+        self._model, self._model_path, self._compiled = model, model_path, compiled
+        if self.n_workers == 0:
+            return
+        self._executor = self._new_executor(fork=True)
+
+    def _new_executor(self, fork: bool) -> ProcessPoolExecutor:
+        global _model, _n_labels
+        methods = mp.get_all_start_methods()
+        if fork and "fork" in methods and sys.platform.startswith("linux"):
+            ctx = mp.get_context("fork")
+            _model, _n_labels = self._model, self.n_labels
+            if self._frozen:
+                gc.unfreeze()
+            gc.freeze()  # keep the GC from touching (and un-sharing) inherited pages
+            self._frozen = True
+        else:
+            ctx = mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+        executor = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(str(self._model_path), self._compiled, self.n_labels),
+        )
+        # Start every worker now rather than on the first request.
+        for fut in [executor.submit(_ping) for _ in range(self.n_workers)]:
+            fut.result()
+        return executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._generation += 1
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if self._frozen:
+            gc.unfreeze()
+            self._frozen = False
+
+    def _broken(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken executor (once) and rebuild the workers in the background."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # already handled, or shut down
+            self._executor = None
+            self.restarts += 1
+            generation = self._generation
+        log.warning("scoring worker died, restarting the pool (scoring inline meanwhile)")
+        executor.shutdown(wait=False, cancel_futures=True)
+        threading.Thread(target=self._rebuild, args=(generation,), daemon=True).start()
+
+    def _rebuild(self, generation: int) -> None:
+        try:
+            executor = self._new_executor(fork=False)
+        except Exception:
+            log.exception("scoring pool restart failed, staying inline")
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._executor, executor = executor, None
+        if executor is not None:  # shut down or restarted meanwhile
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _inline(self, texts: List[str]) -> np.ndarray:
+        return probas_matrix(self._model, texts, self.n_labels)
+
+    def _inline_future(self, texts: List[str]) -> "Future[np.ndarray]":
+        fut: "Future[np.ndarray]" = Future()
+        try:
+            fut.set_result(self._inline(texts))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def submit(self, texts: List[str]) -> "Future[np.ndarray]":
+        """Score one batch on a single worker (or inline when there is no pool)."""
+        executor = self._executor
+        if executor is None:
+            return self._inline_future(texts)
+        try:
+            worker_fut = executor.submit(_score, texts)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # RuntimeError: shut down meanwhile by another thread's _broken()
+            if not isinstance(e, BrokenProcessPool) and self._executor is executor:
+                raise
+            self._broken(executor)
+            return self._inline_future(texts)
+
+        fut: "Future[np.ndarray]" = Future()
+
+        def done(f: "Future[np.ndarray]") -> None:
+            if f.cancelled() or isinstance(f.exception(), BrokenProcessPool):
+                # Rescore off the executor's management thread.
+                self._broken(executor)
+                threading.Thread(
+                    target=lambda: self._copy_result(self._inline_future(texts), fut), daemon=True
+                ).start()
+            else:
+                self._copy_result(f, fut)
+
+        worker_fut.add_done_callback(done)
+        return fut
+
+    @staticmethod
+    def _copy_result(src: "Future[np.ndarray]", dst: "Future[np.ndarray]") -> None:
+        if src.exception() is not None:
+            dst.set_exception(src.exception())
+        else:
+            dst.set_result(src.result())
+
+    def score(self, texts: List[str]) -> np.ndarray:
+        """Score a batch, fanning it out across workers when it is large enough."""
+        executor = self._executor
+        if executor is None or len(texts) < self.min_batch:
+            return self._inline(texts)
+        bounds = np.linspace(0, len(texts), self.n_workers + 1).astype(int)
+        try:
+            futures = [
+                executor.submit(_score, texts[lo:hi])
+                for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+            ]
+            return np.vstack([f.result() for f in futures])
+        except (BrokenProcessPool, RuntimeError) as e:
+            if not isinstance(e, BrokenProcessPool) and self._executor is executor:
+                raise
+            self._broken(executor)
+            return self._inline(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers":   self.n_workers,
+            "parallel":  self.parallel,
+            "min_batch": self.min_batch,
+            "restarts":  self.restarts,
+        }
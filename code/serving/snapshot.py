@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Thresholds whose hit counts are kept up to date per page
+MAX_THRESHOLDS = 16
+
+
+def diff_texts(old: Sequence[str], new: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """
+    Snapshot diff of two lists of distinct texts: indices in `new` of the
+    texts that are not in `old` (new or edited comments), and indices in
+    `old` of the texts that are gone (deleted, or the previous version of
+    an edited comment).
+    """
+    old_set, new_set = set(old), set(new)
+    added   = [i for i, t in enumerate(new) if t not in old_set]
+    removed = [i for i, t in enumerate(old) if t not in new_set]
+    return added, removed
+
+
+class RunningAggregate:
+    """
+    Running totals behind a page's aggregate: row count, per-label sum of
+    (rounded) probabilities and, per threshold, the toxic count and label
+    hit counts. `update` adds new rows and subtracts removed ones, so a
+    thread that gained a few comments is not re-aggregated from scratch.
+    """
+
+    def __init__(self, n_labels: int) -> None:
+        self.n = 0
+        self.sums = np.zeros(n_labels)
+        self.hits: "OrderedDict[float, Tuple[int, np.ndarray]]" = OrderedDict()
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "RunningAggregate":
+        agg = cls(rows.shape[1])
+        agg.n = len(rows)
+        agg.sums = rows.sum(axis=0)
+        return agg
+
+    def copy(self) -> "RunningAggregate":
+        agg = RunningAggregate(len(self.sums))
+        agg.n = self.n
+        agg.sums = self.sums.copy()
+        agg.hits = OrderedDict(self.hits)
+        return agg
+
+    def update(self, added: np.ndarray, removed: np.ndarray) -> None:
+        self.n += len(added) - len(removed)
+        self.sums = self.sums + added.sum(axis=0) - removed.sum(axis=0)
+        for t, (toxic, counts) in self.hits.items():
+            a, r = added >= t, removed >= t
+            self.hits[t] = (
+                toxic + int(a.any(axis=1).sum()) - int(r.any(axis=1).sum()),
+                counts + a.sum(axis=0) - r.sum(axis=0),
+            )
+
+    def counts(self, threshold: float, rows: np.ndarray) -> Tuple[int, np.ndarray]:
+        """Toxic count and per-label hits at `threshold`; `rows` (all current rows) seeds a new threshold."""
+        if threshold not in self.hits:
+            preds = rows >= threshold
+            self.hits[threshold] = (int(preds.any(axis=1).sum()), preds.sum(axis=0))
+            while len(self.hits) > MAX_THRESHOLDS:
+                self.hits.popitem(last=False)
+        return self.hits[threshold]
+
+    def means(self) -> np.ndarray:
+        return self.sums / self.n if self.n else np.zeros_like(self.sums)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Tuple
+
+import anyio
+from starlette.responses import StreamingResponse
+
+TEXT_COLUMNS = ("comment_text", "text")
+MAX_RECORD_CHARS = csv.field_size_limit()  # csv.reader rejects longer fields anyway
+
+
+class RecordTooLarge(ValueError):
+    """A CSV record (e.g. an unterminated quote) outgrew the splitter's limit."""
+
+
+class CSVRecordSplitter:
+    """
+    Incremental CSV parser for a byte stream.
+
+    Bytes are decoded incrementally; only the part of the buffer that ends on
+    a record boundary (a newline outside quotes) is handed to `csv.reader`,
+    the rest is kept for the next chunk. The quote parity and the scan
+    offset of the kept part carry over, so each character is scanned once.
+    Memory is bounded by the chunk size plus `max_record_chars`: a longer
+    pending record raises RecordTooLarge.
+    """
+
+    def __init__(self, encoding: str = "utf-8-sig", max_record_chars: int = MAX_RECORD_CHARS) -> None:
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.max_record_chars = max_record_chars
+        self._tail = ""
+        self._scanned = 0  # characters of _tail already scanned
+        self._odd = 0      # quote parity of those characters
+
+    def _split(self, text: str) -> Tuple[str, str]:
+        pos, odd, cut = self._scanned, self._odd, 0
+        while True:
+            nl = text.find("\n", pos)
+            if nl < 0:
+                odd ^= text.count('"', pos) & 1
+                break
+            odd ^= text.count('"', pos, nl) & 1
+            pos = nl + 1
+            if not odd:
+                cut = pos
+        self._scanned, self._odd = len(text) - cut, odd
+        return text[:cut], text[cut:]
+
+    def feed(self, data: bytes) -> List[List[str]]:
+        text = self._tail + self._decoder.decode(data)
+        complete, self._tail = self._split(text)
+        if len(self._tail) > self.max_record_chars:
+            raise RecordTooLarge(
+                f"Enregistrement CSV de plus de {self.max_record_chars} caractères (guillemet non fermé ?)")
+        return list(csv.reader(io.StringIO(complete, newline=""))) if complete else []
+
+    def close(self) -> List[List[str]]:
+        text = self._tail + self._decoder.decode(b"", final=True)
+        self._tail, self._scanned, self._odd = "", 0, 0
+        return list(csv.reader(io.StringIO(text, newline=""))) if text.strip() else []
+
+
+class CSVTextStream:
+    """
+    Pull text cells out of an async byte stream, in fixed-size batches.
+
+    `read_header()` must be awaited first (so a bad upload can still be
+    rejected with a 4xx before the response starts); `batches()` then
+    yields `(row_indices, raw_texts)` lists of at most `batch_size` items.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        batch_size: int,
+        columns: Sequence[str] = TEXT_COLUMNS,
+        max_record_chars: int = MAX_RECORD_CHARS,
+    ) -> None:
+        self._chunks = chunks
+        self._splitter = CSVRecordSplitter(max_record_chars=max_record_chars)
+        self._pending: List[List[str]] = []
+        self._exhausted = False
+        self.batch_size = batch_size
+        self.columns = columns
+        self.header: Optional[List[str]] = None
+        self.text_index: Optional[int] = None
+
+    async def _fill(self) -> bool:
+        """Read one more chunk; False when the upload is over."""
+        if self._exhausted:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._exhausted = True
+            self._pending.extend(self._splitter.close())
+            return False
+        self._pending.extend(self._splitter.feed(chunk))
+        return True
+
+    async def read_header(self) -> List[str]:
+        while not self._pending and await self._fill():
+            pass
+        if not self._pending:
+            raise ValueError("CSV vide")
+        self.header = [h.strip() for h in self._pending.pop(0)]
+        self.text_index = next(
+            (self.header.index(c) for c in self.columns if c in self.header), None
+        )
+        if self.text_index is None:
+            raise ValueError(
+                f"Le CSV doit contenir une colonne {' ou '.join(repr(c) for c in self.columns)}"
+            )
+        return self.header
+
+    def _take(self, n: int) -> List[List[str]]:
+        taken, self._pending = self._pending[:n], self._pending[n:]
+        return taken
+
+    async def batches(self) -> AsyncIterator[Tuple[List[int], List[str]]]:
+        if self.header is None:
+            await self.read_header()
+        row = 0
+        while True:
+            while len(self._pending) < self.batch_size and await self._fill():
+                pass
+            records = self._take(self.batch_size)
+            if not records:
+                return
+            idx, texts = [], []
+            for rec in records:
+                if rec:  # skip blank lines
+                    idx.append(row)
+                    texts.append(rec[self.text_index] if self.text_index < len(rec) else "")
+                    row += 1
+            if texts:
+                yield idx, texts
+
+
+def csv_lines(rows: Iterable[Sequence[object]]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue()
+
+
+class UploadStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator is still reading the request.
+
+    The default implementation listens for `http.disconnect` on `receive()`
+    while streaming (ASGI spec < 2.4), which would swallow the upload
+    chunks; here the generator is the only consumer of `receive()` and
+    sees disconnects itself through `request.stream()`.
+    """
+
+    async def listen_for_disconnect(self, receive) -> None:
+        await anyio.sleep_forever()
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def dedup_index(texts: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    Unique texts (first-seen order) and the inverse index that maps each
+    input position to its unique text: `unique[inverse[i]] == texts[i]`.
+    Score `unique`, then `scores[inverse]` restores the original order.
+    """
+    index: Dict[str, int] = {}
+    inverse = np.fromiter(
+        (index.setdefault(t, len(index)) for t in texts), dtype=np.intp, count=len(texts)
+    )
+    return list(index), inverse
+
+
+def dedup_ratio(n_total: int, n_unique: int) -> float:
+    """Share of rows that were exact duplicates of an earlier row."""
+    return round(1 - n_unique / n_total, 4) if n_total else 0.0